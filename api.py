@@ -3,22 +3,33 @@ import os
 import base64
 import subprocess
 import shutil
-import webview
 import logging
 from settings import SettingsManager
 from engine.ai import AIEngine
 from engine.latex import LatexEngine
+from engine.cancel import CancelToken, CancelledError
+from engine.deadline import Deadline, DeadlineExceeded
+from engine.tracing import tracer, traced
+from engine.usage import metered
+from engine.profiling import CallProfiler, profiling_enabled, profiling_directory, profile_methods, unprofile_methods
+from config import DEFAULT_TIME_BUDGET, DEFAULT_PROFILING_KEEP, PROFILED_BRIDGE_METHODS
 
 logger = logging.getLogger(__name__)
 
 class Bridge:
-    def __init__(self):
+    def __init__(self, work_dir=None):
         self.settings_manager = SettingsManager()
         self.ai = AIEngine()
         self.latex = LatexEngine()
+        # Build directory for pdflatex; give each Bridge its own when several run at once
+        self.work_dir = work_dir
         self.last_pdf_path = None
         self.cancelled = False
+        self.cancel_token = CancelToken()
+        self.last_cancel_latency_ms = None
         self.window = None
+        # Set while profiling is on (ATS_PROFILING=1 or the `profiling_enabled` setting)
+        self.profiler = None
         
         # Initialize AI with loaded settings
         self.apply_settings()
@@ -35,6 +46,8 @@ class Bridge:
              
         try:
             logger.info("Opening Save File Dialog...")
+            # Imported here so the Bridge can be used headless (CLI, service) without pywebview
+            import webview
             # Handle pywebview deprecation
             try:
                 dialog_type = webview.FileDialog.SAVE
@@ -59,17 +72,31 @@ class Bridge:
 
     def apply_settings(self):
         settings = self.settings_manager.get_all() if hasattr(self.settings_manager, 'get_all') else self.settings_manager.settings
-        self.ai.configure(
-            settings.get('provider', 'openai'), 
-            settings.get('apiKey', ''), 
-            settings.get('model', 'gpt-4o-mini')
-        )
+        self.ai.configure_from_settings(settings)
+        tracer.configure(settings.get('trace_file'), settings.get('otlp_endpoint'))
+        self._configure_profiling(settings)
         return settings
 
+    def _configure_profiling(self, settings):
+        """Wraps the operations in a CallProfiler, or removes the wrappers when profiling is off."""
+        enabled = profiling_enabled(settings)
+        if enabled and self.profiler is None:
+            keep = settings.get('profiling_keep')
+            self.profiler = CallProfiler(profiling_directory(settings),
+                                         keep if isinstance(keep, int) and keep > 0 else DEFAULT_PROFILING_KEEP)
+            self.profiler.start()
+            profile_methods(self, self.profiler, PROFILED_BRIDGE_METHODS)
+        elif not enabled and self.profiler is not None:
+            unprofile_methods(self, PROFILED_BRIDGE_METHODS)
+            self.profiler.stop()
+            self.profiler = None
+
     def load_settings(self):
         return self.settings_manager.load()
 
     def save_settings(self, config):
+        # The GUI only sends the fields it shows; keep settings it doesn't know about (e.g. hedging)
+        config = {**self.settings_manager.get_all(), **config}
         if self.settings_manager.save(config):
             self.apply_settings()
             return {"success": True}
@@ -77,32 +104,99 @@ class Bridge:
 
     def cancel_generation(self):
         self.cancelled = True
+        self.cancel_token.cancel()
         self.latex.kill_compilation()
         return True
 
+    def _start_operation(self, cancel_token=None):
+        """
+        Resets cancellation state and returns the token for a new operation.
+        Callers that can cancel before the operation starts (the service's job
+        queue) pass their own token, so such a cancel is not lost here.
+        """
+        self.cancel_token = cancel_token or CancelToken()
+        self.cancelled = self.cancel_token.cancelled
+        return self.cancel_token
+
+    def _new_deadline(self):
+        """
+        Overall time budget for one user action (settings key `time_budget_seconds`).
+        Operations create it only when the caller did not pass the action's deadline.
+        """
+        try:
+            budget = float(self.settings_manager.get('time_budget_seconds', DEFAULT_TIME_BUDGET))
+        except (TypeError, ValueError):
+            budget = DEFAULT_TIME_BUDGET
+        return Deadline(budget if budget > 0 else DEFAULT_TIME_BUDGET)
+
+    def _cancelled_result(self, token, error):
+        self.last_cancel_latency_ms = token.latency_ms()
+        if self.last_cancel_latency_ms is not None:
+            logger.info(f"Operation cancelled; released {self.last_cancel_latency_ms:.1f} ms after cancel request")
+        return {"success": False, "error": error}
+
+    def get_hedge_stats(self):
+        return self.ai.get_hedge_stats()
+
+    def get_replay_stats(self):
+        return self.ai.get_replay_stats()
+
+    def get_usage_stats(self):
+        return self.ai.get_usage_stats()
+
+    def get_model_status(self):
+        try:
+            return self.ai.get_model_status()
+        except Exception as e:
+            return {"provider": self.ai.provider_name, "error": str(e)}
+
+    def warm_up_model(self):
+        return {"started": self.ai.warm_up_model()}
+
+    def list_models(self):
+        try:
+            return {"success": True, "models": self.ai.list_models()}
+        except Exception as e:
+            return {"success": False, "error": str(e), "models": []}
+
     def get_default_prompt(self):
         return self.ai.get_default_prompt()
 
     def get_default_fix_prompt(self):
         return self.ai.get_default_fix_prompt()
 
-    def fix_latex(self, payload):
+    @traced("fix_latex")
+    @metered
+    def fix_latex(self, payload, cancel_token=None, deadline=None):
+        token = self._start_operation(cancel_token)
+        deadline = deadline or self._new_deadline()
         try:
-            self.cancelled = False
             source = payload.get('source')
             error = payload.get('error')
             fix_prompt = self.settings_manager.get('system_prompt_fix')
             
-            fixed_content = self.ai.fix_latex_content(source, error, system_prompt_override=fix_prompt)
+            fixed_content = self.ai.fix_latex_content(source, error, system_prompt_override=fix_prompt,
+                                                   cancel_token=token, deadline=deadline)
             
             if self.cancelled: return {"success": False, "error": "Cancelled by user"}
             return {"success": True, "fixed_content": fixed_content}
+        except CancelledError:
+            return self._cancelled_result(token, "Cancelled by user")
+        except DeadlineExceeded as e:
+            return {"success": False, "error": str(e), "stage": e.stage}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def generate_latex_source(self, payload):
+    @traced("generate_latex_source")
+    @metered
+    def generate_latex_source(self, payload, cancel_token=None, deadline=None):
+        """
+        Generates the LaTeX source for a JD. With `"compile": true` in the
+        payload the PDF is compiled too, within the same time budget.
+        """
+        token = self._start_operation(cancel_token)
+        deadline = deadline or self._new_deadline()
         try:
-            self.cancelled = False
             jd = payload.get('job_description')
             template = payload.get('template_name')
             raw_user_data = payload.get('user_data', '{}')
@@ -121,31 +215,70 @@ class Bridge:
 
             # Branch 1: Custom Template (Direct Fill)
             if template == 'custom' and custom_content:
-                tex_content = self.ai.fill_custom_latex(custom_content, jd, user_data, system_prompt_override=system_prompt)
+                tex_content = self.ai.fill_custom_latex(custom_content, jd, user_data, system_prompt_override=system_prompt,
+                                                     cancel_token=token, deadline=deadline)
                 if self.cancelled: return {"success": False, "error": "Cancelled"}
-                return {"success": True, "tex_content": tex_content}
+                result = {"success": True, "tex_content": tex_content, "prompt_tokens": self.ai.last_trim_report,
+                          "retrieval": self.ai.last_retrieval_report, "ats": self._ats_match(tex_content, jd, user_data)}
+                return self._compile_generated(result, payload, deadline)
 
             # Branch 2: Standard Template
-            optimized_content = self.ai.generate_resume_content(jd, user_data, system_prompt_override=system_prompt)
+            optimized_content = self.ai.generate_resume_content(jd, user_data, system_prompt_override=system_prompt,
+                                                             cancel_token=token, deadline=deadline)
             if self.cancelled: return {"success": False, "error": "Cancelled"}
             
+            deadline.check("template rendering")
             tex_content = self.latex.render_template(template, optimized_content)
-            return {"success": True, "tex_content": tex_content}
+            result = {"success": True, "tex_content": tex_content, "prompt_tokens": self.ai.last_trim_report,
+                      "retrieval": self.ai.last_retrieval_report, "repairs": self.ai.last_repair_report,
+                      "ats": self._ats_match(optimized_content, jd, user_data)}
+            return self._compile_generated(result, payload, deadline)
 
+        except CancelledError:
+            return self._cancelled_result(token, "Cancelled")
+        except DeadlineExceeded as e:
+            return {"success": False, "error": str(e), "stage": e.stage}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def compile_pdf(self, tex_content):
+    def _ats_match(self, resume, jd, user_data):
+        """Local keyword match of the generated resume against the JD (None if scoring fails)."""
+        try:
+            # Imported here: numpy/scipy would otherwise slow down every CLI start
+            from engine.scoring import score_resume
+            skills = user_data.get('skills') if isinstance(user_data, dict) else None
+            with tracer.span("ATS scoring"):
+                return score_resume(resume, jd or "", skills=skills if isinstance(skills, list) else ()).to_dict()
+        except Exception as e:
+            logger.warning(f"ATS scoring failed: {e}")
+            return None
+
+    def _compile_generated(self, result, payload, deadline):
+        """Adds the compiled PDF (or the compile error) to a generate result when the payload asks for it."""
+        if not payload.get('compile') or self.cancelled:
+            return result
+        compiled = self.compile_pdf(result["tex_content"], deadline=deadline)
+        if compiled["success"]:
+            result["pdf_base64"] = compiled["pdf_base64"]
+        else:
+            result["compile_error"] = {key: compiled[key] for key in ("error", "stage", "no_latex") if key in compiled}
+        return result
+
+    @traced("compile_pdf")
+    def compile_pdf(self, tex_content, deadline=None):
         try:
-            pdf_path, _ = self.latex.compile_pdf(tex_content)
+            pdf_path, _ = self.latex.compile_pdf(tex_content, deadline=deadline or self._new_deadline(),
+                                                 work_dir=self.work_dir)
             self.last_pdf_path = pdf_path
             
-            with open(pdf_path, "rb") as f:
+            with tracer.span("base64 encoding"), open(pdf_path, "rb") as f:
                 pdf_b64 = base64.b64encode(f.read()).decode("utf-8")
             return {"success": True, "pdf_base64": pdf_b64}
             
         except FileNotFoundError as e:
             return {"success": False, "error": str(e), "tex_content": tex_content, "no_latex": True}
+        except DeadlineExceeded as e:
+            return {"success": False, "error": str(e), "stage": e.stage}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
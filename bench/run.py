@@ -0,0 +1,398 @@
+"""
+Benchmark suite for the resume pipeline.
+
+    python -m bench.run                          # all scenarios, compared with bench/baseline.json
+    python -m bench.run --quick --only render bridge
+    python -m bench.run --update-baseline        # store this run as the new baseline
+
+Scenarios:
+    render   LatexEngine.render_template over many generated resume contexts
+    compile  LatexEngine.compile_pdf, first (cold) versus repeated (warm) compiles
+    bridge   Bridge.generate_latex_source with an in-process stub provider
+    batch    BatchRunner throughput against the provider simulator at several concurrency levels
+
+Results are written as JSON (--out). Every timing metric is compared with the
+baseline: a metric more than --tolerance worse (and beyond a small noise
+floor) is reported as a regression and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bench.simulator import PROFILES, resume_answer, start_simulator  # noqa: E402
+from engine.ai import AIEngine  # noqa: E402
+from engine.batch import BatchJob, BatchRunner  # noqa: E402
+from engine.latex import LatexEngine  # noqa: E402
+from engine.providers import ProviderRegistry  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUT = "bench_results.json"
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_CONCURRENCY_LEVELS = (1, 2, 4, 8)
+TEMPLATE = "modern.tex"
+# Differences smaller than this are timer noise, whatever their relative size
+NOISE_FLOOR = {"_ms": 1.0, "_s": 0.05}
+
+_ROLES = ["Backend Engineer", "Data Engineer", "Platform Engineer", "ML Engineer", "Frontend Developer",
+          "Site Reliability Engineer", "Analytics Engineer", "Security Engineer"]
+_SKILLS = ["Python", "Go", "SQL", "Kafka", "Kubernetes", "AWS", "Terraform", "React", "TypeScript", "Spark",
+           "Airflow", "PostgreSQL", "Redis", "Docker", "GraphQL", "PyTorch", "dbt", "Snowflake"]
+_VERBS = ["Built", "Designed", "Migrated", "Scaled", "Automated", "Led", "Optimized", "Shipped"]
+
+
+def sample_profile(rng, roles=4, bullets=4):
+    """A master profile with `roles` experience entries of `bullets` bullets each."""
+    experience = []
+    for index in range(roles):
+        experience.append({
+            "role": rng.choice(_ROLES),
+            "company": f"Company {index + 1}",
+            "dates": f"{2012 + 2 * index} - {2014 + 2 * index}",
+            "description": [f"{rng.choice(_VERBS)} {rng.choice(_SKILLS)} services handling "
+                            f"{rng.randint(2, 90)}k requests per second with {rng.choice(_SKILLS)} & "
+                            f"{rng.choice(_SKILLS)}; cut costs by {rng.randint(5, 60)}%"
+                            for _ in range(bullets)],
+        })
+    return {
+        "name": "Jordan Example",
+        "email": "jordan@example.com",
+        "phone": "+1 555 010 0200",
+        "title": rng.choice(_ROLES),
+        "summary": "Engineer who ships reliable systems.",
+        "skills": rng.sample(_SKILLS, 8),
+        "experience": experience,
+        "education": [{"degree": "BSc Computer Science", "institution": "State University", "dates": "2012"}],
+    }
+
+
+def sample_job_description(rng, index):
+    skills = ", ".join(rng.sample(_SKILLS, 6))
+    return (f"Posting {index}: {rng.choice(_ROLES)} at Example Corp {index}. You will own {skills} "
+            f"systems end to end, work with product teams, and mentor engineers. Requires "
+            f"{rng.randint(2, 9)}+ years of experience and strong communication skills.")
+
+
+def summarize(samples, unit="ms"):
+    """Mean, p50, p95 and max of timing samples (seconds), in `unit`."""
+    scale = 1000.0 if unit == "ms" else 1.0
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        f"mean_{unit}": round(sum(ordered) / len(ordered) * scale, 3),
+        f"p50_{unit}": round(pct(50) * scale, 3),
+        f"p95_{unit}": round(pct(95) * scale, 3),
+        f"max_{unit}": round(ordered[-1] * scale, 3),
+    }
+
+
+class StubProvider:
+    """In-process provider answering instantly (or after `latency` seconds) with valid content."""
+
+    def __init__(self, latency=0.0):
+        self.model = "bench-stub"
+        self.latency = latency
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        time.sleep(self.latency)
+        return resume_answer(prompt)
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        time.sleep(self.latency)
+        return "\\documentclass{article}\n\\begin{document}\nStub.\n\\end{document}\n"
+
+
+# --- scenarios ----------------------------------------------------------
+
+
+def bench_render(options):
+    rng = random.Random(options.seed)
+    latex = LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+    contexts = [resume_answer("USER'S RAW DATA: " + json.dumps(sample_profile(rng, rng.randint(1, 8),
+                                                                                rng.randint(2, 6))))
+                for _ in range(options.render_contexts)]
+    start = time.perf_counter()
+    latex.render_template(TEMPLATE, contexts[0])
+    first = time.perf_counter() - start
+
+    samples = []
+    for context in contexts:
+        start = time.perf_counter()
+        latex.render_template(TEMPLATE, context)
+        samples.append(time.perf_counter() - start)
+    return {"contexts": len(contexts), "first_render_ms": round(first * 1000, 3), **summarize(samples),
+            "renders_per_s": round(len(samples) / sum(samples), 1)}
+
+
+def bench_compile(options):
+    latex = LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+    if not latex.pdflatex_available():
+        return {"skipped": "pdflatex not found"}
+    tex = latex.render_template(TEMPLATE, resume_answer("USER'S RAW DATA: " + json.dumps(
+        sample_profile(random.Random(options.seed)))))
+    root = tempfile.mkdtemp(prefix="bench-compile-")
+    try:
+        # Cold: the first compile of this process, into a directory that has never been used
+        start = time.perf_counter()
+        latex.compile_pdf(tex, work_dir=os.path.join(root, "cold"))
+        cold = time.perf_counter() - start
+        warm = []
+        for index in range(options.compile_runs):
+            start = time.perf_counter()
+            latex.compile_pdf(tex, work_dir=os.path.join(root, "warm"))
+            warm.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {"cold_s": round(cold, 3), **{f"warm_{k}": v for k, v in summarize(warm, "s").items()},
+            "runs": len(warm)}
+
+
+def bench_bridge(options):
+    import api
+    rng = random.Random(options.seed)
+    bridge = api.Bridge(work_dir=tempfile.mkdtemp(prefix="bench-bridge-"))
+    # Whatever the user configured, answers come from the stub
+    bridge.ai.configure("openai-compatible", "", "bench-stub")
+    bridge.ai.configure_hedge(None)
+    bridge.ai.provider = StubProvider(options.stub_latency_ms / 1000.0)
+    payloads = [{"job_description": sample_job_description(rng, index), "template_name": TEMPLATE,
+                 "user_data": json.dumps(sample_profile(rng, rng.randint(2, 6), rng.randint(3, 6)))}
+                for index in range(options.bridge_calls)]
+
+    samples = []
+    try:
+        # Untimed: the first call also pays one-off imports (e.g. SciPy for ATS scoring)
+        bridge.generate_latex_source(payloads[0])
+        for payload in payloads:
+            start = time.perf_counter()
+            result = bridge.generate_latex_source(payload)
+            samples.append(time.perf_counter() - start)
+            if not result.get("success"):
+                raise RuntimeError(f"generate_latex_source failed: {result.get('error')}")
+    finally:
+        shutil.rmtree(bridge.work_dir, ignore_errors=True)
+    return {"calls": len(samples), "stub_latency_ms": options.stub_latency_ms, **summarize(samples),
+            "calls_per_s": round(len(samples) / sum(samples), 1)}
+
+
+def bench_batch(options):
+    rng = random.Random(options.seed)
+    profile = sample_profile(rng)
+    jobs = [BatchJob(f"jd-{index:03d}", sample_job_description(rng, index)) for index in range(options.batch_jobs)]
+    latex = LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+    server = start_simulator(options.profile, seed=options.seed)
+    results = {"jobs": len(jobs), "profile": options.profile}
+    try:
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "openai-compatible", "model": "simulated", "apiKey": "",
+                                    "compatible_base_url": server.url + "/v1"})
+        for concurrency in options.concurrency:
+            out = tempfile.mkdtemp(prefix="bench-batch-")
+            try:
+                report = BatchRunner(ai, latex, out, compile=options.batch_compile, concurrency=concurrency,
+                                     dedup_threshold=0).run(jobs, profile)
+            finally:
+                shutil.rmtree(out, ignore_errors=True)
+            results[f"c{concurrency}_wall_s"] = report["wall_time_s"]
+            results[f"c{concurrency}_jobs_per_min"] = report["throughput_per_min"]
+            results[f"c{concurrency}_failed"] = report["failed"]
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+SCENARIOS = {
+    "render": bench_render,
+    "compile": bench_compile,
+    "bridge": bench_bridge,
+    "batch": bench_batch,
+}
+# Timed against the seeded simulator, so one run is already stable
+SINGLE_RUN_SCENARIOS = ("batch",)
+
+
+def _median_metrics(runs):
+    """Per-metric median over repeated runs of a scenario (non-numeric values from the first run)."""
+    merged = {}
+    for metric, first in runs[0].items():
+        values = sorted(run[metric] for run in runs if isinstance(run.get(metric), (int, float)))
+        if isinstance(first, bool) or not isinstance(first, (int, float)) or len(values) != len(runs):
+            merged[metric] = first
+        else:
+            merged[metric] = values[len(values) // 2]
+    return merged
+
+
+# --- baseline comparison --------------------------------------------------
+
+
+def _direction(metric):
+    """
+    +1 when higher is better, -1 when lower is better, 0 for metrics that are
+    not compared: counts, settings, single samples (first, max) and
+    per-second rates (those only restate a compared mean).
+    """
+    if metric.endswith("_per_min"):
+        return 1
+    if metric.endswith("_per_s"):
+        return 0
+    if metric.endswith(("_ms", "_s")) and not metric.startswith(("stub_", "max_", "first_")):
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares each metric with the baseline. Returns a list of
+    {scenario, metric, baseline, current, change, regression} (change is the
+    relative difference, positive when worse).
+    """
+    rows = []
+    for scenario, metrics in results.get("scenarios", {}).items():
+        base_metrics = baseline.get("scenarios", {}).get(scenario) or {}
+        for metric, current in metrics.items():
+            direction = _direction(metric)
+            base = base_metrics.get(metric)
+            if not direction or not isinstance(current, (int, float)) or not isinstance(base, (int, float)) or not base:
+                continue
+            change = (base - current) / base if direction > 0 else (current - base) / base
+            floor = next((value for suffix, value in NOISE_FLOOR.items() if metric.endswith(suffix)), 0)
+            noise = direction < 0 and abs(current - base) < floor
+            rows.append({"scenario": scenario, "metric": metric, "baseline": base, "current": current,
+                         "change": round(change, 3), "regression": change > tolerance and not noise})
+    return rows
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def baseline_drift(baseline):
+    """
+    Warning text when code changed since the commit the baseline was recorded
+    at (the baseline file itself aside), so regressions may stem from other
+    changes than the one being measured; None when it matches or is unknown.
+    """
+    commit = (baseline.get("environment") or {}).get("commit")
+    if not commit:
+        return None
+    try:
+        diff = subprocess.run(["git", "diff", "--quiet", commit, "--", ".",
+                               ":(exclude)" + os.path.relpath(DEFAULT_BASELINE, PROJECT_ROOT)],
+                              cwd=PROJECT_ROOT, capture_output=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if diff.returncode == 1:
+        return f"the baseline was recorded at {commit} and the code has changed since; re-record it with --update-baseline"
+    if diff.returncode != 0:
+        return f"the baseline was recorded at {commit}, which is not in this repository"
+    return None
+
+
+def run(options):
+    scenarios = {}
+    for name in options.only or SCENARIOS:
+        repeat = 1 if name in SINGLE_RUN_SCENARIOS else max(1, options.repeat)
+        print(f"Running {name}" + (f" ({repeat} times)..." if repeat > 1 else "..."), file=sys.stderr)
+        scenarios[name] = _median_metrics([SCENARIOS[name](options) for _ in range(repeat)])
+    settings = {key: value for key, value in vars(options).items()
+                if key not in ("only", "out", "baseline", "update_baseline", "tolerance")}
+    return {"environment": _environment(), "settings": settings, "scenarios": scenarios}
+
+
+def _print_report(results, rows):
+    for scenario, metrics in results["scenarios"].items():
+        print(f"{scenario}:")
+        for metric, value in metrics.items():
+            print(f"  {metric:<24} {value}")
+    regressions = [row for row in rows if row["regression"]]
+    if rows:
+        print(f"\nCompared {len(rows)} metrics with the baseline: {len(regressions)} regression(s)")
+    for row in regressions:
+        print(f"  REGRESSION {row['scenario']}.{row['metric']}: {row['baseline']} -> {row['current']} "
+              f"({row['change']:+.0%})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Resume pipeline benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a fast smoke run")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="results JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown reported as a regression (default 0.3)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, help="runs per scenario, reporting the median (default 3; batch runs once)")
+    parser.add_argument("--render-contexts", type=int, help="resume contexts to render (default 500)")
+    parser.add_argument("--compile-runs", type=int, help="warm compiles (default 5)")
+    parser.add_argument("--bridge-calls", type=int, help="generate_latex_source calls (default 200)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="stub provider delay per call")
+    parser.add_argument("--batch-jobs", type=int, help="job descriptions per batch run (default 16)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY_LEVELS))
+    parser.add_argument("--batch-compile", action="store_true", help="compile PDFs in the batch scenario")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="simulator latency profile")
+    return parser
+
+
+def parse_args(argv=None):
+    options = build_parser().parse_args(argv)
+    defaults = {"repeat": (3, 1), "render_contexts": (500, 50), "compile_runs": (5, 2), "bridge_calls": (200, 10), "batch_jobs": (16, 8)}
+    for name, (full, quick) in defaults.items():
+        if getattr(options, name) is None:
+            setattr(options, name, quick if options.quick else full)
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    results = run(options)
+    with open(options.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    if options.update_baseline:
+        with open(options.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        _print_report(results, [])
+        print(f"\nBaseline written to {options.baseline}")
+        return 0
+
+    rows = []
+    if os.path.exists(options.baseline):
+        with open(options.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, options.tolerance)
+        drift = baseline_drift(baseline)
+        if drift:
+            print(f"warning: {drift}", file=sys.stderr)
+    results["comparison"] = rows
+    with open(options.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    _print_report(results, rows)
+    print(f"\nResults: {options.out}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,479 @@
+"""
+Local stand-in for the AI providers, so AIEngine, Bridge and batch runs can be
+exercised under realistic load without network access or spending tokens.
+
+    python -m bench.simulator --port 9900 --profile cloud --error-429 0.05
+
+One server speaks all three wire formats the app uses:
+
+    OpenAI   POST /v1/chat/completions (SSE or plain JSON), GET /v1/models
+    Ollama   POST /api/generate (NDJSON), GET /api/ps, GET /api/tags
+    Gemini   POST /v1beta/models/<model>:streamGenerateContent?alt=sse and :generateContent
+    Stats    GET /_sim/stats, POST /_sim/reset
+
+Point the app at it with the provider base URL settings, e.g. provider
+"openai-compatible" with compatible_base_url http://127.0.0.1:9900/v1,
+ollama_base_url http://127.0.0.1:9900 or gemini_base_url http://127.0.0.1:9900.
+
+Answers are schema-valid resume JSON built from the user data in the prompt
+(or LaTeX for fix/template-fill prompts). Latency follows a LatencyProfile:
+a log-normal time to first token, then chunks at a fixed token rate, with
+optional 429 and 5xx errors.
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9900
+CHARS_PER_TOKEN = 4
+
+_GEMINI_PATH_RE = re.compile(r"^/v1(?:beta|alpha)?/models/([^/:]+):(streamGenerateContent|generateContent)")
+_USER_DATA_MARKERS = ("USER'S RAW DATA", "USER DATA FOR THIS SECTION:", "USER DATA (JSON):")
+
+
+class LatencyProfile:
+    """
+    Timing and failure behaviour of the simulated provider. The time to first
+    token is log-normal with the given median and 95th percentile; the answer
+    then streams in chunks of `chunk_tokens` at `tokens_per_second`.
+    """
+
+    def __init__(self, first_token_median=0.4, first_token_p95=1.2, tokens_per_second=80.0, chunk_tokens=8,
+                 error_429=0.0, error_5xx=0.0, retry_after=1):
+        self.first_token_median = first_token_median
+        self.first_token_p95 = max(first_token_p95, first_token_median)
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, int(chunk_tokens))
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.retry_after = retry_after
+
+    def first_token_delay(self, rng):
+        if self.first_token_median <= 0:
+            return 0.0
+        sigma = math.log(self.first_token_p95 / self.first_token_median) / 1.645
+        return rng.lognormvariate(math.log(self.first_token_median), sigma)
+
+    def chunk_delay(self):
+        return self.chunk_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def draw_error(self, rng):
+        """HTTP status of an injected failure for this request, or None."""
+        roll = rng.random()
+        if roll < self.error_429:
+            return 429
+        if roll < self.error_429 + self.error_5xx:
+            return rng.choice((500, 502, 503))
+        return None
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+PROFILES = {
+    # No waiting at all: measures the app's own overhead
+    "instant": LatencyProfile(0, 0, 0, chunk_tokens=64),
+    "fast": LatencyProfile(0.05, 0.15, 400, chunk_tokens=16),
+    # Roughly a hosted API under normal load
+    "cloud": LatencyProfile(0.6, 2.5, 70),
+    # A local model on a modest GPU
+    "local": LatencyProfile(1.5, 4.0, 25),
+    "flaky": LatencyProfile(0.6, 2.5, 70, error_429=0.1, error_5xx=0.05),
+}
+
+
+def _user_data(prompt):
+    """The user's JSON data embedded in an app prompt ({} if there is none)."""
+    for marker in _USER_DATA_MARKERS:
+        start = prompt.find(marker)
+        if start < 0:
+            continue
+        brace = prompt.find("{", start)
+        if brace < 0:
+            continue
+        try:
+            data, _ = json.JSONDecoder().raw_decode(prompt[brace:])
+            return data if isinstance(data, dict) else {}
+        except ValueError:
+            continue
+    return {}
+
+
+def _jd_terms(prompt):
+    match = re.search(r"JOB DESCRIPTION:\s*(.*?)\n\s*\n", prompt, re.DOTALL)
+    words = re.findall(r"[A-Za-z][A-Za-z+#.]{3,}", match.group(1) if match else "")
+    return list(dict.fromkeys(words))[:8] or ["delivery"]
+
+
+def resume_answer(prompt):
+    """Schema-valid resume JSON (or the one section a section prompt asks for)."""
+    data = _user_data(prompt)
+    terms = _jd_terms(prompt)
+    summary = (f"{data.get('title') or 'Engineer'} with a record of delivering results in "
+               f"{', '.join(terms[:3])}. Known for clear communication and reliable execution.")
+    skills = [str(skill) for skill in data.get("skills") or []] or terms[:5]
+
+    def role(entry):
+        bullets = entry.get("description") if isinstance(entry.get("description"), list) else []
+        return {
+            "role": str(entry.get("role", "Engineer")),
+            "company": str(entry.get("company", "Company")),
+            "dates": str(entry.get("dates", "")),
+            "description": [f"Delivered {terms[i % len(terms)]} improvements: {str(bullet)}"
+                            for i, bullet in enumerate(bullets or ["Owned key projects"])],
+        }
+
+    if '{"summary"' in prompt and "Return JSON" in prompt:
+        return {"summary": summary}
+    if '{"skills"' in prompt and "Return JSON" in prompt:
+        return {"skills": skills}
+    if '"role": "..."' in prompt:
+        return role(data)
+    return {
+        "name": str(data.get("name") or "Jane Doe"),
+        "contact_info": " | ".join(str(data[key]) for key in ("phone", "email") if data.get(key)),
+        "summary": summary,
+        "skills": skills,
+        "experience": [role(entry) for entry in data.get("experience") or [] if isinstance(entry, dict)],
+        "education": [{"degree": str(edu.get("degree", "")), "institution": str(edu.get("institution", "")),
+                       "dates": str(edu.get("dates") or edu.get("year") or "")}
+                      for edu in data.get("education") or [] if isinstance(edu, dict)],
+    }
+
+
+def latex_answer(prompt):
+    """LaTeX for fix and template-fill prompts: the given source back, or a minimal document."""
+    for start_marker, end_marker in (("BROKEN LATEX SOURCE:", "ERROR LOG:"),
+                                     ("TARGET LATEX TEMPLATE:", "INSTRUCTIONS:")):
+        start = prompt.find(start_marker)
+        end = prompt.find(end_marker, start + 1)
+        if start >= 0 and end > start:
+            return prompt[start + len(start_marker):end].strip()
+    name = _user_data(prompt).get("name") or "Jane Doe"
+    return ("\\documentclass{article}\n\\begin{document}\n"
+            f"\\section*{{{name}}}\nTailored resume.\n\\end{{document}}\n")
+
+
+def answer(prompt, json_mode):
+    return json.dumps(resume_answer(prompt)) if json_mode else latex_answer(prompt)
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ProviderSimulator/1.0"
+
+    @property
+    def sim(self):
+        return self.server
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # --- plumbing -------------------------------------------------------
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        payload = data.encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _fail(self, status, api):
+        """Sends an injected error in the shape of the API being simulated."""
+        message = "Rate limit exceeded" if status == 429 else "Upstream model server error"
+        headers = {"Retry-After": str(self.sim.profile.retry_after)} if status == 429 else {}
+        if api == "openai":
+            body = {"error": {"message": message, "type": "rate_limit_error" if status == 429 else "server_error"}}
+        elif api == "gemini":
+            body = {"error": {"code": status, "message": message,
+                              "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}}
+        else:
+            body = {"error": message}
+        self._send_json(status, body, headers)
+
+    def _pieces(self, text):
+        size = self.sim.profile.chunk_tokens * CHARS_PER_TOKEN
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def _stream(self, content_type, text, frame, final=None):
+        """Streams `text` as frames after the first-token delay, one chunk per chunk_delay."""
+        self._start_stream(content_type)
+        time.sleep(self.sim.first_token_delay())
+        delay = self.sim.profile.chunk_delay()
+        for index, piece in enumerate(self._pieces(text)):
+            if index:
+                time.sleep(delay)
+            self._write_chunk(frame(piece))
+        if final:
+            self._write_chunk(final)
+        self._end_stream()
+
+    def _generate(self, api, prompt, json_mode):
+        """Counts the request and returns (text, error status or None)."""
+        status = self.sim.begin(api)
+        return answer(prompt, json_mode), status
+
+    # --- routes ---------------------------------------------------------
+
+    def do_GET(self):
+        if self.path == "/_sim/stats":
+            return self._send_json(200, self.sim.stats())
+        if self.path.rstrip("/").endswith("/models") and self.path.startswith("/v1"):
+            return self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"}
+                                                                     for m in self.sim.models]})
+        if self.path == "/api/tags":
+            return self._send_json(200, {"models": [{"name": m, "model": m} for m in self.sim.models]})
+        if self.path == "/api/ps":
+            expires = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 1800))
+            return self._send_json(200, {"models": [{"name": m, "model": m, "size_vram": 4 << 30,
+                                                     "expires_at": expires} for m in self.sim.loaded_models()]})
+        return self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        try:
+            request = self._read_json()
+        except ValueError:
+            return self._send_json(400, {"error": "Invalid JSON"})
+        if path == "/_sim/reset":
+            self.sim.reset()
+            return self._send_json(200, {"reset": True})
+        if path.endswith("/chat/completions"):
+            return self._openai(request)
+        if path == "/api/generate":
+            return self._ollama(request)
+        match = _GEMINI_PATH_RE.match(path)
+        if match:
+            return self._gemini(request, match.group(1), match.group(2) == "streamGenerateContent")
+        return self._send_json(404, {"error": "Not found"})
+
+    def _openai(self, request):
+        messages = request.get("messages") or []
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        text, status = self._generate("openai", prompt, json_mode)
+        if status:
+            return self._fail(status, "openai")
+        model = request.get("model", "simulated")
+        usage = {"prompt_tokens": len(prompt) // CHARS_PER_TOKEN, "completion_tokens": len(text) // CHARS_PER_TOKEN}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not request.get("stream"):
+            time.sleep(self.sim.first_token_delay() + self.sim.profile.chunk_delay() * (len(self._pieces(text)) - 1))
+            return self._send_json(200, {"id": "chatcmpl-sim", "object": "chat.completion", "model": model,
+                                         "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                                      "finish_reason": "stop"}],
+                                         "usage": usage})
+
+        def frame(piece):
+            event = {"id": "chatcmpl-sim", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            return f"data: {json.dumps(event)}\n\n"
+
+        final = "data: [DONE]\n\n"
+        if (request.get("stream_options") or {}).get("include_usage"):
+            # Like the OpenAI API, usage is only streamed when asked for, in a last chunk without choices
+            event = {"id": "chatcmpl-sim", "object": "chat.completion.chunk", "choices": [], "usage": usage}
+            final = f"data: {json.dumps(event)}\n\n" + final
+        self._stream("text/event-stream", text, frame, final)
+
+    def _ollama(self, request):
+        model = request.get("model", "simulated")
+        if "prompt" not in request:
+            # A prompt-less request only loads the model
+            self.sim.load(model)
+            return self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "load"})
+        prompt = f"{request.get('system', '')}\n{request['prompt']}"
+        text, status = self._generate("ollama", prompt, request.get("format") == "json")
+        if status:
+            return self._fail(status, "ollama")
+        self.sim.load(model)
+        final_fields = {"model": model, "response": "", "done": True, "done_reason": "stop",
+                        "prompt_eval_count": len(prompt) // CHARS_PER_TOKEN,
+                        "eval_count": len(text) // CHARS_PER_TOKEN}
+        if request.get("stream") is False:
+            time.sleep(self.sim.first_token_delay())
+            return self._send_json(200, {**final_fields, "response": text})
+
+        def frame(piece):
+            return json.dumps({"model": model, "response": piece, "done": False}) + "\n"
+
+        self._stream("application/x-ndjson", text, frame, json.dumps(final_fields) + "\n")
+
+    def _gemini(self, request, model, stream):
+        parts = [part.get("text", "") for content in request.get("contents") or []
+                 for part in content.get("parts") or []]
+        system = request.get("systemInstruction") or request.get("system_instruction") or {}
+        prompt = "\n".join([part.get("text", "") for part in system.get("parts") or []] + parts)
+        config = request.get("generationConfig") or request.get("generation_config") or {}
+        json_mode = (config.get("responseMimeType") or config.get("response_mime_type")) == "application/json"
+        text, status = self._generate("gemini", prompt, json_mode)
+        if status:
+            return self._fail(status, "gemini")
+        usage = {"promptTokenCount": len(prompt) // CHARS_PER_TOKEN,
+                 "candidatesTokenCount": len(text) // CHARS_PER_TOKEN}
+
+        def response(piece, finished=False):
+            candidate = {"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}
+            if finished:
+                candidate["finishReason"] = "STOP"
+            return {"candidates": [candidate], "usageMetadata": usage, "modelVersion": model}
+
+        if not stream:
+            time.sleep(self.sim.first_token_delay())
+            return self._send_json(200, response(text, finished=True))
+        pieces = self._pieces(text)
+        last = len(pieces) - 1
+        # SSE frames; the final one carries the finish reason
+        self._start_stream("text/event-stream")
+        time.sleep(self.sim.first_token_delay())
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(self.sim.profile.chunk_delay())
+            self._write_chunk(f"data: {json.dumps(response(piece, finished=index == last))}\r\n\r\n")
+        self._end_stream()
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """The HTTP server plus the profile, random source and request counters it shares with handlers."""
+
+    daemon_threads = True
+
+    def __init__(self, address, profile=None, models=("simulated",), seed=None):
+        super().__init__(address, SimulatorHandler)
+        self.profile = profile or PROFILES["fast"]
+        self.models = list(models)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loaded = set()
+        self.reset()
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections are not errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def first_token_delay(self):
+        with self._lock:
+            return self.profile.first_token_delay(self._rng)
+
+    def begin(self, api):
+        """Counts a generation request and decides whether it fails."""
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts[api] = self.counts.get(api, 0) + 1
+            status = self.profile.draw_error(self._rng)
+            if status:
+                key = "errors_429" if status == 429 else "errors_5xx"
+                self.counts[key] += 1
+            return status
+
+    def load(self, model):
+        with self._lock:
+            self._loaded.add(model)
+
+    def loaded_models(self):
+        with self._lock:
+            return sorted(self._loaded)
+
+    def reset(self):
+        with self._lock:
+            self.counts = {"requests": 0, "errors_429": 0, "errors_5xx": 0}
+            self._loaded = set()
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, "profile": self.profile.to_dict()}
+
+
+def start_simulator(profile="fast", host=DEFAULT_HOST, port=0, seed=None, models=("simulated",)):
+    """
+    Starts a simulator on a background thread and returns the server; `port=0`
+    picks a free port (see `server.url`). Stop it with server.shutdown().
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    server = SimulatorServer((host, port), profile, models=models, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True, name="provider-simulator").start()
+    return server
+
+
+def _profile_from_args(args):
+    base = PROFILES[args.profile]
+    overrides = {
+        "first_token_median": args.ttft_median, "first_token_p95": args.ttft_p95,
+        "tokens_per_second": args.tokens_per_second, "chunk_tokens": args.chunk_tokens,
+        "error_429": args.error_429, "error_5xx": args.error_5xx,
+    }
+    values = base.to_dict()
+    values.update({key: value for key, value in overrides.items() if value is not None})
+    return LatencyProfile(**values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.simulator", description="Simulated AI provider server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="cloud", help="latency/error preset")
+    parser.add_argument("--ttft-median", type=float, help="median seconds to first token")
+    parser.add_argument("--ttft-p95", type=float, help="95th percentile seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, help="streaming speed after the first token")
+    parser.add_argument("--chunk-tokens", type=int, help="tokens per streamed chunk")
+    parser.add_argument("--error-429", type=float, help="share of requests answered with 429")
+    parser.add_argument("--error-5xx", type=float, help="share of requests answered with 500/502/503")
+    parser.add_argument("--model", action="append", dest="models", help="model name to advertise (repeatable)")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible latencies and errors")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server = SimulatorServer((args.host, args.port), _profile_from_args(args),
+                             models=args.models or ("simulated",), seed=args.seed)
+    logger.info(f"Simulating providers on {server.url} with {server.profile.to_dict()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+"""
+Headless command line interface (no GUI dependencies).
+
+    python cli.py generate --jd posting.txt --profile me.json --out resume.tex
+    python cli.py render --content resume.json --template modern.tex --out resume.tex
+    python cli.py compile resume.tex --out resume.pdf
+    python cli.py fix resume.tex --out fixed.tex
+    python cli.py score --content resume.json --jd posting.txt
+    python cli.py batch --profile me.json --jds postings/ --out batch_output
+    python cli.py serve --port 8765 --workers 2
+    python cli.py --provider openai-compatible --base-url http://gpu-box:8000/v1 --model llama-3-8b batch ...
+    python cli.py --replay run.cassette.jsonl batch ...
+
+Use `-` for stdin/stdout so the steps can be piped together. Logs go to stderr.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from config import DEFAULT_TIME_BUDGET, DEFAULT_DEDUP_THRESHOLD, BASE_URL_SETTINGS
+from settings import SettingsManager
+from engine.ai import AIEngine
+from engine.providers import PROVIDER_CLASSES
+from engine.replay import REPLAY_LATENCIES
+from engine.tracing import tracer
+from engine.logs import configure_logging_from_settings
+from engine.latex import LatexEngine
+from engine.batch import BatchRunner, load_jobs
+from engine.deadline import Deadline
+import service
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("cli")
+
+
+def _build_engines(args):
+    settings = SettingsManager().get_all()
+    # Command line overrides, e.g. to point a batch at a local inference server
+    if args.provider:
+        settings["provider"] = args.provider
+    if args.model:
+        settings["model"] = args.model
+    if args.base_url:
+        settings[BASE_URL_SETTINGS.get(settings.get("provider", "openai"), "openai_base_url")] = args.base_url
+    # Record provider calls to a cassette, or replay them without network access
+    if args.record or args.replay:
+        settings["replay_mode"] = "record" if args.record else "replay"
+        settings["replay_cassette"] = args.record or args.replay
+    if args.replay_latency:
+        settings["replay_latency"] = args.replay_latency
+    ai = AIEngine()
+    ai.configure_from_settings(settings)
+    tracer.configure(settings.get('trace_file'), settings.get('otlp_endpoint'))
+    latex = LatexEngine(os.path.join(BASE_DIR, "templates"))
+    return settings, ai, latex
+
+
+def _load_profile(path):
+    if not path:
+        return {}
+    return json.loads(_read_input(path))
+
+
+def _read_input(path):
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_output(path, content):
+    if not path or path == "-":
+        sys.stdout.write(content)
+        if not content.endswith("\n"):
+            sys.stdout.write("\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    logger.info(f"Wrote {path}")
+
+
+def _new_deadline(args, settings):
+    budget = getattr(args, "time_budget", None) or settings.get('time_budget_seconds') or DEFAULT_TIME_BUDGET
+    return Deadline(float(budget))
+
+
+def cmd_generate(args):
+    settings, ai, latex = _build_engines(args)
+    jd = _read_input(args.jd)
+    user_data = _load_profile(args.profile)
+    deadline = _new_deadline(args, settings)
+    system_prompt = settings.get('system_prompt')
+
+    if args.custom_template:
+        tex_content = ai.fill_custom_latex(_read_input(args.custom_template), jd, user_data,
+                                           system_prompt_override=system_prompt, deadline=deadline)
+        _write_output(args.out, tex_content)
+        return 0
+
+    content = ai.generate_resume_content(jd, user_data, system_prompt_override=system_prompt, deadline=deadline)
+    if args.json:
+        _write_output(args.out, json.dumps(content, indent=4))
+        return 0
+    deadline.check("template rendering")
+    _write_output(args.out, latex.render_template(args.template, content))
+    return 0
+
+
+def cmd_render(args):
+    latex = LatexEngine(os.path.join(BASE_DIR, "templates"))
+    content = json.loads(_read_input(args.content))
+    _write_output(args.out, latex.render_template(args.template, content))
+    return 0
+
+
+def cmd_compile(args):
+    settings = SettingsManager().get_all()
+    latex = LatexEngine(os.path.join(BASE_DIR, "templates"))
+    tex_content = _read_input(args.tex)
+    out = args.out or (os.path.splitext(args.tex)[0] + ".pdf" if args.tex != "-" else "resume.pdf")
+
+    work_dir = tempfile.mkdtemp(prefix="resume-build-")
+    try:
+        pdf_path, _ = latex.compile_pdf(tex_content, deadline=_new_deadline(args, settings), work_dir=work_dir)
+        shutil.copy(pdf_path, out)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info(f"Wrote {out}")
+    return 0
+
+
+def _compile_error(latex, tex_content, deadline):
+    """Compiles once and returns the error text, or None if the source compiles."""
+    work_dir = tempfile.mkdtemp(prefix="resume-build-")
+    try:
+        latex.compile_pdf(tex_content, deadline=deadline, work_dir=work_dir)
+        return None
+    except RuntimeError as e:
+        return str(e)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def cmd_fix(args):
+    settings, ai, latex = _build_engines(args)
+    tex_content = _read_input(args.tex)
+    deadline = _new_deadline(args, settings)
+
+    if args.error_log:
+        error = _read_input(args.error_log)
+    else:
+        error = _compile_error(latex, tex_content, deadline)
+        if error is None:
+            logger.info("Source compiles cleanly; nothing to fix")
+            _write_output(args.out, tex_content)
+            return 0
+
+    fixed = ai.fix_latex_content(tex_content, error, system_prompt_override=settings.get('system_prompt_fix'),
+                                 deadline=deadline)
+    _write_output(args.out, fixed)
+    return 0
+
+
+def cmd_score(args):
+    # Imported here: numpy/scipy would otherwise slow down every CLI start
+    from engine.scoring import score_resume
+    text = _read_input(args.content)
+    try:
+        resume = json.loads(text)
+    except ValueError:
+        resume = text  # rendered .tex or plain text
+    skills = _load_profile(args.profile).get("skills") or ()
+    result = score_resume(resume, _read_input(args.jd), skills=skills)
+    _write_output(args.out, json.dumps(result.to_dict(), indent=4))
+    return 0
+
+
+def cmd_batch(args):
+    settings, ai, latex = _build_engines(args)
+    jobs = load_jobs(args.jds)
+    if not jobs:
+        print(f"error: no job descriptions found in {args.jds}", file=sys.stderr)
+        return 1
+
+    runner = BatchRunner(
+        ai, latex, args.out,
+        template_name=args.template,
+        concurrency=args.concurrency,
+        compile=not args.no_compile,
+        time_budget=args.time_budget or settings.get('time_budget_seconds') or DEFAULT_TIME_BUDGET,
+        system_prompt=settings.get('system_prompt'),
+        fresh=args.fresh,
+        dedup_threshold=args.dedup_threshold,
+    )
+    report = runner.run(jobs, _load_profile(args.profile))
+
+    print(f"\n{report['succeeded']}/{report['total']} succeeded in {report['wall_time_s']}s "
+          f"({report['throughput_per_min']} JDs/min, concurrency {report['concurrency']})")
+    if report["already_done"] or report["resumed"]:
+        print(f"  {report['already_done']} already done, {report['resumed']} resumed from an earlier run")
+    for stage, summary in report["stage_timings"].items():
+        if summary:
+            print(f"  {stage:<9} mean {summary['mean_s']}s  p95 {summary['p95_s']}s  max {summary['max_s']}s")
+    usage = report["usage"]
+    if usage["calls"]:
+        cost = f"${usage['cost_usd']:.4f}" + (f" ({usage['unpriced_calls']} calls unpriced)" if usage["unpriced_calls"] else "")
+        print(f"  {usage['calls']} AI calls, {usage['prompt_tokens']} prompt tokens ({usage['cached_tokens']} cached) "
+              f"+ {usage['completion_tokens']} completion tokens, {cost}")
+    if report["dedup"]["hits"]:
+        print(f"  {report['dedup']['hits']} near-duplicate JDs reused generated content "
+              f"(~{report['dedup']['tokens_saved']} tokens saved)")
+    if report["ranking"]:
+        print("  best ATS matches: " + ", ".join(f"{entry['id']} ({entry['ats_score']})"
+                                                  for entry in report["ranking"][:5]))
+    for failure in report["failures"]:
+        print(f"  FAILED {failure['id']} at {failure['stage']}: {failure['error'].splitlines()[0]}")
+    print(f"Report: {os.path.join(args.out, 'batch_report.json')}")
+    return 0 if not report["failures"] else 2
+
+
+def cmd_serve(args):
+    service.serve(host=args.host, port=args.port, workers=args.workers, queue_size=args.queue_size)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="ATS Resume Genius (headless)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+    parser.add_argument("--log-file", help="also write JSON Lines logs to this file (rotated)")
+    parser.add_argument("--provider", choices=sorted(PROVIDER_CLASSES), help="override the configured AI provider")
+    parser.add_argument("--model", help="override the configured model")
+    parser.add_argument("--base-url", help="override the provider's base URL, e.g. http://gpu-box:8000/v1")
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument("--record", metavar="CASSETTE", help="save every AI request and response to this file")
+    replay.add_argument("--replay", metavar="CASSETTE", help="answer AI requests from this file, without network")
+    parser.add_argument("--replay-latency", choices=REPLAY_LATENCIES,
+                        help="replay with the recorded response times (default) or none")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    generate = sub.add_parser("generate", help="tailor the profile to one job description")
+    generate.add_argument("--jd", required=True, help="job description file, or - for stdin")
+    generate.add_argument("--profile", help="user data JSON (the master profile)")
+    generate.add_argument("--template", default="modern.tex", help="template in templates/")
+    generate.add_argument("--custom-template", help="LaTeX file for the AI to fill directly")
+    generate.add_argument("--json", action="store_true", help="write the generated content JSON instead of .tex")
+    generate.add_argument("--out", help="output file (default: stdout)")
+    generate.add_argument("--time-budget", type=float, help="seconds allowed for the whole command")
+    generate.set_defaults(func=cmd_generate)
+
+    render = sub.add_parser("render", help="render resume content JSON into a template (no AI)")
+    render.add_argument("--content", required=True, help="content JSON file, or - for stdin")
+    render.add_argument("--template", default="modern.tex", help="template in templates/")
+    render.add_argument("--out", help="output file (default: stdout)")
+    render.set_defaults(func=cmd_render)
+
+    compile_ = sub.add_parser("compile", help="compile a .tex file to PDF with pdflatex")
+    compile_.add_argument("tex", help=".tex file, or - for stdin")
+    compile_.add_argument("--out", help="PDF path (default: next to the .tex file)")
+    compile_.add_argument("--time-budget", type=float, help="seconds allowed for the whole command")
+    compile_.set_defaults(func=cmd_compile)
+
+    fix = sub.add_parser("fix", help="ask the AI to fix a .tex file that does not compile")
+    fix.add_argument("tex", help=".tex file, or - for stdin")
+    fix.add_argument("--error-log", help="pdflatex log/error text (default: compile to get it)")
+    fix.add_argument("--out", help="output file (default: stdout)")
+    fix.add_argument("--time-budget", type=float, help="seconds allowed for the whole command")
+    fix.set_defaults(func=cmd_fix)
+
+    score = sub.add_parser("score", help="local ATS keyword match of a resume against a JD (no AI)")
+    score.add_argument("--content", required=True, help="resume content JSON, .tex or text file, or - for stdin")
+    score.add_argument("--jd", required=True, help="job description file")
+    score.add_argument("--profile", help="user data JSON; its skills count as keywords")
+    score.add_argument("--out", help="output file (default: stdout)")
+    score.set_defaults(func=cmd_score)
+
+    batch = sub.add_parser("batch", help="tailor one profile to many job descriptions")
+    batch.add_argument("--jds", required=True, help="directory of .txt/.md JDs or a .jsonl file")
+    batch.add_argument("--profile", help="user data JSON (the master profile)")
+    batch.add_argument("--out", default="batch_output", help="output directory")
+    batch.add_argument("--template", default="modern.tex", help="template in templates/")
+    batch.add_argument("--concurrency", type=int, default=4, help="JDs processed in parallel")
+    batch.add_argument("--time-budget", type=float, help="seconds allowed per JD (all stages)")
+    batch.add_argument("--no-compile", action="store_true", help="skip pdflatex, write .tex/.json only")
+    batch.add_argument("--fresh", action="store_true", help="discard progress saved by an earlier run")
+    batch.add_argument("--dedup-threshold", type=float, default=DEFAULT_DEDUP_THRESHOLD,
+                       help="Jaccard similarity above which a JD reuses a near-duplicate's content (0 disables)")
+    batch.set_defaults(func=cmd_batch)
+
+    serve = sub.add_parser("serve", help="serve generate/compile/fix over a local HTTP API")
+    serve.add_argument("--host", default=service.DEFAULT_HOST, help="interface to bind (0.0.0.0 for the LAN)")
+    serve.add_argument("--port", type=int, default=service.DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=service.DEFAULT_WORKERS, help="jobs processed in parallel")
+    serve.add_argument("--queue-size", type=int, default=service.DEFAULT_QUEUE_SIZE,
+                       help="waiting jobs before new requests get 429")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Text to stderr; JSON Lines to a file only when `log_file` is set or --log-file is given.
+    # Without -v, ATS_LOG_LEVEL and `log_level` apply, and INFO when neither is set.
+    configure_logging_from_settings(SettingsManager().get_all(), level="DEBUG" if args.verbose else None,
+                                    log_file=args.log_file, default_file=None, default="INFO")
+    try:
+        return args.func(args)
+    except Exception as e:
+        if args.verbose:
+            logger.exception(f"{args.command} failed")
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
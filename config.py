@@ -3,6 +3,134 @@
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_PROVIDER = "openai"
 
+# Settings key holding the base URL of each HTTP provider. "openai-compatible"
+# is any server speaking the OpenAI chat completions API (vLLM, llama.cpp
+# server, LM Studio, ...); it also takes `compatible_api_key` (its own key, never
+# `apiKey`), `compatible_headers` (extra HTTP headers; both are kept in
+# secrets.json) and `compatible_models` (model names offered in the GUI).
+BASE_URL_SETTINGS = {
+    "openai": "openai_base_url",
+    "openai-compatible": "compatible_base_url",
+    "ollama": "ollama_base_url",
+    "google": "gemini_base_url",
+}
+
+# Latency hedging: wait until the primary provider's p95 latency before sending
+# the same request to the secondary provider. Until enough samples are
+# collected, DEFAULT_HEDGE_DELAY (seconds) is used instead.
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 8.0
+
+# Timeouts (seconds). DEFAULT_TIME_BUDGET is the overall deadline for one user
+# action; each stage (AI call, render, pdflatex pass, fix) gets what is left of it.
+DEFAULT_TIME_BUDGET = 180
+DEFAULT_REQUEST_TIMEOUT = 120
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_COMPILE_PASS_TIMEOUT = 30
+
+# Ollama: how long the model stays loaded after a request (settings key
+# `ollama_keep_alive`), so a fix right after a generation does not reload it.
+# The model is preloaded in the background when Ollama is configured
+# (`ollama_warm_up`); loading a large model can take a while.
+# Ollama silently cuts prompts longer than its context (`ollama_num_ctx`, else
+# the server default below), so the input token budget is capped at it too.
+DEFAULT_OLLAMA_KEEP_ALIVE = "30m"
+DEFAULT_OLLAMA_NUM_CTX = 4096
+DEFAULT_OLLAMA_WARM_UP_TIMEOUT = 300
+
+# Prompt token budgeting. Context windows are matched by model-name prefix;
+# DEFAULT_OUTPUT_RESERVE tokens are always left free for the model's answer.
+# DEFAULT_INPUT_TOKEN_BUDGET caps the prompt size (settings key `input_token_budget`).
+# The JD is never truncated below MIN_JD_TOKENS: a profile that fills the budget
+# leaves the prompt over budget (with a warning) rather than without a JD.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+    "gemini": 1048576,
+    "llama3": 8192,
+    "llama3.1": 131072,
+    "llama3.2": 131072,
+    "mistral": 32768,
+    "qwen2.5": 32768,
+    "phi3": 4096,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_OUTPUT_RESERVE = 2048
+DEFAULT_INPUT_TOKEN_BUDGET = 12000
+MIN_JD_TOKENS = 300
+
+# Generation mode (settings key `generation_mode`): "single" asks for the whole
+# resume in one call, "sections" asks for the summary, the skills and each
+# experience entry in separate concurrent calls and merges the results. Sections
+# use DEFAULT_SECTION_PROMPT unless the `system_prompt_sections` setting is set.
+DEFAULT_GENERATION_MODE = "single"
+DEFAULT_SECTION_CONCURRENCY = 6
+
+# Bullet retrieval: only the DEFAULT_RETRIEVAL_TOP_K experience bullets and
+# projects most relevant to the JD (BM25) are sent to the model, plus the best
+# bullet of every role. Settings key `retrieval_top_k`; 0 sends everything.
+DEFAULT_RETRIEVAL_TOP_K = 15
+
+# Batch runs reuse the generated content of a JD whose word 3-gram Jaccard
+# similarity to an already processed JD is at least this (MinHash/LSH)
+DEFAULT_DEDUP_THRESHOLD = 0.85
+
+# Record/replay of provider calls (settings `replay_mode` = "record" or "replay",
+# `replay_cassette` = JSON Lines file). Replayed calls take their recorded time
+# ("recorded") or none ("zero"); `replay_redact` lists extra strings to mask.
+DEFAULT_REPLAY_LATENCY = "recorded"
+
+# Tracing: every Bridge call returns a per-stage timing breakdown. Settings
+# `trace_file` (JSON Lines, one span per line) and `otlp_endpoint` (an
+# OpenTelemetry collector, e.g. http://localhost:4318) also export the spans.
+DEFAULT_TRACE_SERVICE_NAME = "ats-resume-genius"
+
+# Opt-in profiling of Bridge calls (settings `profiling_enabled`, `profiling_dir`,
+# `profiling_keep`; the ATS_PROFILING=1 and ATS_PROFILING_DIR environment
+# variables override them). Each call writes a cProfile .prof file and its top
+# tracemalloc allocations; only the newest DEFAULT_PROFILING_KEEP calls are kept.
+# Only the operations in PROFILED_BRIDGE_METHODS are profiled: the GUI polls the
+# status and stats getters, and their files would rotate the operations out.
+DEFAULT_DIAGNOSTICS_DIR = "diagnostics"
+DEFAULT_PROFILING_KEEP = 20
+DEFAULT_PROFILING_TOP_ALLOCATIONS = 25
+PROFILED_BRIDGE_METHODS = ("generate_latex_source", "compile_pdf", "fix_latex", "save_pdf")
+
+# Logging: records are handed to a queue and written by a background thread
+# (console as text, file as JSON Lines with rotation), so logging I/O never
+# runs on the thread handling a request. Settings `log_level` (default DEBUG
+# from source, INFO in frozen builds; env ATS_LOG_LEVEL overrides it),
+# `log_levels` (per-module levels, e.g. {"engine.latex": "DEBUG"}) and
+# `log_file` (relative to the app folder; "" turns the file off).
+DEFAULT_LOG_FILE = "logs/ats-resume-genius.jsonl"
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 3
+DEFAULT_LOG_LEVELS = {"urllib3": "WARNING", "httpx": "WARNING", "httpcore": "WARNING"}
+
+# Token pricing in USD per million tokens, matched by longest model-name prefix.
+# "cached_input" is charged for prompt tokens served from the provider's prompt
+# cache. Settings key `model_pricing` adds or overrides entries; models without
+# a price are counted but not costed, and local Ollama models cost nothing.
+MODEL_PRICING = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "o4-mini": {"input": 1.10, "cached_input": 0.275, "output": 4.40},
+    "gemini-1.5-flash": {"input": 0.075, "cached_input": 0.01875, "output": 0.30},
+    "gemini-1.5-pro": {"input": 1.25, "cached_input": 0.3125, "output": 5.00},
+    "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+    "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.31, "output": 10.00},
+}
+
 DEFAULT_RESUME_PROMPT = r"""You are an expert Resume Writer and ATS Optimization Specialist.
 Your goal is to rewrite the user's resume content to perfectly match the Job Description (JD).
 Output MUST be valid JSON matching the structure below.
@@ -40,6 +168,16 @@ JSON Structure:
     ]
 }"""
 
+DEFAULT_SECTION_PROMPT = r"""You are an expert Resume Writer and ATS Optimization Specialist.
+You write ONE section of a resume at a time, tailored to the Job Description (JD).
+Output MUST be valid JSON with exactly the keys requested.
+
+CRITICAL INSTRUCTION FOR LATEX:
+- You are generating content for a LaTeX template.
+- You MUST escape strict LaTeX special characters in your text fields: %, &, $, #, _ become \%, \&, \$, \#, \_
+- Do not use markdown bold/italic (** or *) inside the strings; prefer plain text.
+- Never invent employers, titles, dates or degrees; only rephrase and prioritize the user's real data."""
+
 DEFAULT_FIX_PROMPT = """You are a LaTeX Debugging Expert.
 Your goal is to FIX the broken LaTeX code based on the provided error log.
 OUTPUT ONLY THE FIXED LATEX CODE. NO MARKDOWN. NO EXPLANATIONS.
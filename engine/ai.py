@@ -1,29 +1,297 @@
 import json
-from config import DEFAULT_RESUME_PROMPT, DEFAULT_FIX_PROMPT, DEFAULT_CUSTOM_FILL_PROMPT
-from engine.providers import OpenAIProvider, GoogleProvider, OllamaProvider
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DEFAULT_RESUME_PROMPT, DEFAULT_FIX_PROMPT, DEFAULT_CUSTOM_FILL_PROMPT, DEFAULT_SECTION_PROMPT,
+    DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_DELAY, DEFAULT_INPUT_TOKEN_BUDGET,
+    DEFAULT_GENERATION_MODE, DEFAULT_SECTION_CONCURRENCY, DEFAULT_RETRIEVAL_TOP_K, BASE_URL_SETTINGS,
+    DEFAULT_REPLAY_LATENCY, DEFAULT_OLLAMA_NUM_CTX
+)
+from engine.providers import default_registry, KEYLESS_PROVIDERS
+from engine.hedging import Hedger
+from engine.cancel import CancelledError
+from engine.deadline import DeadlineExceeded
+from engine.tokens import fit_inputs, input_budget
+from engine.schema import repair_resume, reask_prompt
+from engine.sections import plan_sections, merge_sections, SectionCache
+from engine.retrieval import ProfileIndex
+from engine.replay import ReplayProvider, open_cassette
+from engine.tracing import tracer, in_current_context
+from engine.usage import UsageMeter, metering, pricing
+from engine.text import term_counts
+
+logger = logging.getLogger(__name__)
 
 class AIEngine:
-    def __init__(self):
+    def __init__(self, registry=None):
+        # Provider instances are reused across configure() calls with the same settings
+        self.registry = registry or default_registry
         self.provider = None
         self.provider_name = "openai" # Default
         self.api_key = ""
         self.model = "gpt-4o-mini"
+        # Endpoint overrides; None uses the provider's default base URL
+        self.api_base = None
+        self.headers = {}
+        # Provider runtime options (Ollama keep_alive and model options)
+        self.runtime = {}
+        self.configured_models = []
+        # Optional secondary provider used for latency hedging / failover
+        self.secondary = None
+        self.hedger = Hedger(DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_DELAY)
+        # Prompt size control
+        self.input_token_budget = DEFAULT_INPUT_TOKEN_BUDGET
+        self.last_trim_report = None
+        self.tokens_saved_total = 0
+        # Local fixes applied to the last generated resume JSON
+        self.last_repair_report = None
+        # "single" (one call for the whole resume) or "sections" (concurrent per-section calls)
+        self.generation_mode = DEFAULT_GENERATION_MODE
+        self.section_concurrency = DEFAULT_SECTION_CONCURRENCY
+        # Sections mode has its own system prompt: the resume prompt asks for the whole resume JSON
+        self.section_prompt = None
+        self.last_section_timings = None
+        # Sections whose relevance signature is unchanged are reused instead of regenerated
+        self.section_cache = SectionCache()
+        self.last_section_cache = None
+        # Only the profile bullets/projects most relevant to the JD go into the prompt
+        self.retrieval_top_k = DEFAULT_RETRIEVAL_TOP_K
+        self.profile_index = ProfileIndex()
+        self.last_retrieval_report = None
+        # Record provider calls to, or replay them from, a cassette file
+        self.replay_mode = None
+        self.replay_latency = DEFAULT_REPLAY_LATENCY
+        self.cassette = None
+        # Tokens, cost and server time of every provider call this session
+        self.usage = UsageMeter()
+        # Background model preload for local (Ollama) providers
+        self.last_warm_up = None
+        self._warm_up_thread = None
+        self._stats_lock = threading.Lock()
 
-    def configure(self, provider_name, api_key, model):
+    def configure(self, provider_name, api_key, model, api_base=None, headers=None, runtime=None):
         self.provider_name = provider_name
         self.api_key = api_key
         self.model = model
+        self.api_base = api_base or None
+        self.headers = dict(headers or {})
+        self.runtime = dict(runtime or {})
         self._init_provider()
 
-    def _init_provider(self):
-        if self.provider_name == "openai":
-            self.provider = OpenAIProvider(self.api_key, self.model)
-        elif self.provider_name == "google":
-            self.provider = GoogleProvider(self.api_key, self.model)
-        elif self.provider_name == "ollama":
-            self.provider = OllamaProvider(self.api_key, self.model)
+    def configure_hedge(self, provider_name=None, api_key="", model=None, percentile=DEFAULT_HEDGE_PERCENTILE,
+                        api_base=None):
+        """Enables hedging to a secondary provider, or disables it when provider_name is empty."""
+        if not provider_name:
+            self.secondary = None
+            return
+        self.secondary = self._create_provider(provider_name, api_key, model, api_base)
+        self.hedger.percentile = float(percentile)
+
+    def configure_replay(self, mode=None, cassette_path=None, latency=DEFAULT_REPLAY_LATENCY, redact_terms=()):
+        """
+        Records every provider call to `cassette_path` ("record") or answers
+        from it without network access ("replay"); an empty mode turns it off.
+        """
+        self._set_replay(mode, cassette_path, latency, redact_terms)
+        if self.provider is not None:
+            self._init_provider()
+
+    def _set_replay(self, mode, cassette_path, latency, redact_terms):
+        if mode and not cassette_path:
+            raise ValueError(f"Replay mode '{mode}' needs a cassette file")
+        self.replay_mode = mode or None
+        self.replay_latency = latency or DEFAULT_REPLAY_LATENCY
+        self.cassette = open_cassette(cassette_path, redact_terms) if mode else None
+
+    def configure_from_settings(self, settings):
+        """Applies a settings dict (as stored by SettingsManager) to the engine."""
+        provider_name = settings.get('provider', 'openai')
+        # Replay wraps the provider that configure() creates, so the provider is built once, from the new settings
+        self._set_replay(settings.get('replay_mode'), settings.get('replay_cassette'),
+                         settings.get('replay_latency'), settings.get('replay_redact') or ())
+        self.configure(
+            provider_name,
+            # A compatible server is any endpoint: it never gets the cloud vendor's apiKey
+            settings.get('compatible_api_key', '') if provider_name == 'openai-compatible' else settings.get('apiKey', ''),
+            settings.get('model', 'gpt-4o-mini'),
+            api_base=settings.get(BASE_URL_SETTINGS.get(provider_name, '')),
+            headers=settings.get('compatible_headers') if provider_name == 'openai-compatible' else None,
+            runtime=self._ollama_runtime(settings) if provider_name == 'ollama' else None
+        )
+        self.configured_models = list(settings.get('compatible_models') or []) if provider_name == 'openai-compatible' else []
+        self.input_token_budget = settings.get('input_token_budget') or DEFAULT_INPUT_TOKEN_BUDGET
+        self.generation_mode = settings.get('generation_mode') or DEFAULT_GENERATION_MODE
+        self.section_prompt = settings.get('system_prompt_sections') or None
+        self.retrieval_top_k = settings.get('retrieval_top_k', DEFAULT_RETRIEVAL_TOP_K)
+        pricing.configure(settings.get('model_pricing'))
+        if self.provider_name == 'ollama' and settings.get('ollama_warm_up', True):
+            self.warm_up_model()
+        hedge_key = self._hedge_key(settings)
+        if settings.get('hedge_enabled') and settings.get('hedge_provider') and hedge_key is not None:
+            self.configure_hedge(
+                settings.get('hedge_provider'),
+                hedge_key,
+                settings.get('hedge_model') or settings.get('model', 'gpt-4o-mini'),
+                settings.get('hedge_percentile', DEFAULT_HEDGE_PERCENTILE),
+                api_base=settings.get('hedge_base_url')
+            )
         else:
-            self.provider = OpenAIProvider(self.api_key, self.model) # Fallback
+            self.configure_hedge(None)
+
+    def _hedge_key(self, settings):
+        """
+        API key for the hedge provider: `hedge_api_key`, or the primary key when
+        the hedge is the same provider at the same base URL. The primary key is
+        never sent to another vendor or endpoint; None means hedging is skipped.
+        """
+        hedge_provider = settings.get('hedge_provider')
+        if settings.get('hedge_api_key'):
+            return settings['hedge_api_key']
+        if hedge_provider == self.provider_name and (settings.get('hedge_base_url') or None) == self.api_base:
+            return self.api_key
+        if hedge_provider in KEYLESS_PROVIDERS:
+            return ''
+        if settings.get('hedge_enabled') and hedge_provider:
+            logger.warning(f"Hedging to {hedge_provider} is off: set hedge_api_key for it")
+        return None
+
+    @staticmethod
+    def _ollama_runtime(settings):
+        options = dict(settings.get('ollama_options') or {})
+        if settings.get('ollama_num_ctx'):
+            options['num_ctx'] = int(settings['ollama_num_ctx'])
+        return {"keep_alive": settings.get('ollama_keep_alive'), "options": options}
+
+    def warm_up_model(self):
+        """Preloads a local model on a background thread; returns False if one is already loading."""
+        provider = self.provider
+        if not hasattr(provider, 'warm_up'):
+            return False
+        if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+            return False
+
+        def run():
+            started = time.monotonic()
+            try:
+                provider.warm_up()
+                result = {"model": provider.model, "success": True}
+                logger.info(f"Ollama model {provider.model} loaded in {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                result = {"model": provider.model, "success": False, "error": str(e)}
+                logger.warning(f"Ollama warm-up of {provider.model} failed: {e}")
+            result["seconds"] = round(time.monotonic() - started, 3)
+            with self._stats_lock:
+                self.last_warm_up = result
+
+        with self._stats_lock:
+            self.last_warm_up = {"model": provider.model, "success": None}
+        self._warm_up_thread = threading.Thread(target=run, daemon=True, name="ollama-warm-up")
+        self._warm_up_thread.start()
+        return True
+
+    def get_model_status(self):
+        """Resident-model status of a local provider; cloud providers just report their name."""
+        status = {"provider": self.provider_name, "model": self.model}
+        if not hasattr(self.provider, 'status'):
+            return {**status, "local": False}
+        with self._stats_lock:
+            warm_up = self.last_warm_up
+        return {**status, **self.provider.status(), "local": True, "warm_up": warm_up}
+
+    def _init_provider(self):
+        self.provider = self._create_provider(self.provider_name, self.api_key, self.model, self.api_base, self.headers,
+                                              self.runtime)
+
+    def _create_provider(self, provider_name, api_key, model, api_base=None, headers=None, runtime=None):
+        provider = self.registry.get(provider_name, api_key, model, api_base, headers, runtime)
+        if self.replay_mode:
+            return ReplayProvider(provider, self.cassette, self.replay_mode, self.replay_latency)
+        return provider
+
+    def get_replay_stats(self):
+        if not self.cassette:
+            return None
+        return {"mode": self.replay_mode, "latency": self.replay_latency, **self.cassette.stats()}
+
+    def list_models(self):
+        """Models the configured server offers, plus the ones listed in settings."""
+        try:
+            models = self.provider.list_models()
+        except Exception:
+            if not self.configured_models:
+                raise
+            models = []
+        return sorted(set(self.configured_models) | set(models))
+
+    def get_hedge_stats(self):
+        return self.hedger.stats.snapshot()
+
+    def get_usage_stats(self):
+        """Tokens, cost and server time of this session's provider calls, overall and per model."""
+        return self.usage.summary()
+
+    def get_token_stats(self):
+        with self._stats_lock:
+            return {"tokens_saved_total": self.tokens_saved_total, "last": self.last_trim_report}
+
+    def _context_size(self):
+        """Context Ollama runs the model with; None for other providers (the model's own window applies)."""
+        if self.provider_name != 'ollama':
+            return None
+        return (self.runtime.get('options') or {}).get('num_ctx') or DEFAULT_OLLAMA_NUM_CTX
+
+    def _fit_prompt(self, job_description, user_data, fixed_text):
+        """Trims the JD and user data so the prompt stays within the input token budget."""
+        budget = input_budget(self.model, self.input_token_budget, self._context_size())
+        with tracer.span("prompt fitting", budget=budget) as span:
+            job_description, user_data, report = fit_inputs(job_description, user_data, budget, fixed_text)
+            span.set(tokens=report.final_tokens, tokens_saved=report.tokens_saved)
+        with self._stats_lock:
+            self.last_trim_report = report.to_dict()
+            self.tokens_saved_total += report.tokens_saved
+        if report.tokens_saved:
+            logger.info(f"Prompt trimmed from {report.original_tokens} to {report.final_tokens} tokens "
+                        f"({', '.join(report.steps)})")
+        return job_description, user_data
+
+    def _retrieve(self, job_description, user_data):
+        """Keeps the retrieval_top_k bullets and projects most relevant to the JD (BM25)."""
+        if not isinstance(user_data, dict):
+            return user_data
+        with tracer.span("retrieval", top_k=self.retrieval_top_k) as span:
+            selected, report = self.profile_index.select(job_description, user_data, self.retrieval_top_k)
+            span.set(items_kept=report.items_kept, items_total=report.items_total)
+        with self._stats_lock:
+            self.last_retrieval_report = report.to_dict()
+        if report.dropped:
+            logger.info(f"Retrieval kept {report.items_kept} of {report.items_total} bullets/projects")
+        return selected
+
+    def _invoke(self, method, system, prompt, cancel_token=None, timeout=None):
+        """Calls the provider, hedging to the secondary provider when one is configured."""
+        if not self.secondary:
+            return self.hedger.timed_call(self.provider, method, (system, prompt),
+                                          cancel_token=cancel_token, timeout=timeout)
+        is_valid = (lambda r: isinstance(r, dict)) if method == "generate_json" else None
+        return self.hedger.call(self.provider, self.secondary, method, system, prompt,
+                                is_valid=is_valid, cancel_token=cancel_token, timeout=timeout)
+
+    def _run_stage(self, stage, method, system, prompt, cancel_token=None, deadline=None):
+        """Runs one provider call as a pipeline stage, bounded by the remaining deadline."""
+        timeout = deadline.timeout_for(stage) if deadline else None
+        try:
+            with metering(self.usage), tracer.span(stage, provider=self.provider_name, model=self.model, method=method):
+                return self._invoke(method, system, prompt, cancel_token=cancel_token, timeout=timeout)
+        except CancelledError:
+            raise
+        except TimeoutError as e:
+            if deadline:
+                raise DeadlineExceeded(stage, deadline.budget) from e
+            raise RuntimeError(f"AI Provider Error: {str(e)}")
+        except Exception as e:
+            raise RuntimeError(f"AI Provider Error: {str(e)}")
 
     def get_default_prompt(self):
         return DEFAULT_RESUME_PROMPT
@@ -31,8 +299,15 @@ class AIEngine:
     def get_default_fix_prompt(self):
         return DEFAULT_FIX_PROMPT
 
-    def generate_resume_content(self, job_description, user_data, system_prompt_override=None):
-        if not self.api_key and self.provider_name != 'ollama':
+    def _reset_reports(self):
+        # Reports describe one generation; modes that skip a step must not return the previous call's
+        with self._stats_lock:
+            self.last_retrieval_report = None
+            self.last_repair_report = None
+
+    def generate_resume_content(self, job_description, user_data, system_prompt_override=None, cancel_token=None, deadline=None):
+        self._reset_reports()
+        if not self.api_key and self.provider_name not in KEYLESS_PROVIDERS and self.replay_mode != "replay":
              # Return dummy data if no key (for testing/demo)
              return {
                  "name": "Jane Doe",
@@ -42,24 +317,116 @@ class AIEngine:
                  "education": []
              }
              
+        if self.generation_mode == "sections":
+            return self._generate_by_section(job_description, user_data, cancel_token, deadline)
+
+        system = system_prompt_override if system_prompt_override and system_prompt_override.strip() else DEFAULT_RESUME_PROMPT
+        selected = self._retrieve(job_description, user_data)
+        job_description, selected = self._fit_prompt(job_description, selected, system)
+
         prompt = f"""
         JOB DESCRIPTION:
         {job_description}
         
         USER'S RAW DATA (Use this as base, but tailor to JD):
-        {json.dumps(user_data)}
+        {json.dumps(selected)}
         
         Generate the JSON resume content.
         """
         
-        system = system_prompt_override if system_prompt_override and system_prompt_override.strip() else DEFAULT_RESUME_PROMPT
-        
-        try:
-            return self.provider.generate_json(system, prompt)
-        except Exception as e:
-            raise RuntimeError(f"AI Provider Error: {str(e)}")
+        content = self._run_stage("AI generation", "generate_json", system, prompt, cancel_token, deadline)
+        return self._repair_content(content, selected, system, prompt, cancel_token, deadline)
+
+    def _generate_by_section(self, job_description, user_data, cancel_token=None, deadline=None):
+        """
+        Generates the summary, the skills and each experience entry in separate
+        concurrent requests and merges them, so wall-clock time follows the
+        slowest section rather than the length of the whole resume. A section
+        that fails falls back to the user's own data for it. The resume system
+        prompt asks for the whole resume, so sections use DEFAULT_SECTION_PROMPT
+        or the `system_prompt_sections` setting instead.
+        """
+        system = self.section_prompt if self.section_prompt and self.section_prompt.strip() else DEFAULT_SECTION_PROMPT
+        job_description, _ = self._fit_prompt(job_description, {}, system)
+        user_data = user_data if isinstance(user_data, dict) else {}
+        sections = plan_sections(user_data)
+        timings = {}
+        jd_terms = term_counts(job_description)
+        context = f"{self.provider_name}:{self.model}:{system}"
+        signatures = {section.key: section.signature(jd_terms, context) for section in sections}
+
+        def run(section):
+            started = time.monotonic()
+            try:
+                result = self._run_stage(f"AI section {section.key}", "generate_json", system,
+                                         section.prompt(job_description), cancel_token, deadline)
+                return section.extract(result)
+            finally:
+                timings[section.key] = round(time.monotonic() - started, 3)
 
-    def fix_latex_content(self, latex_source, error_log, system_prompt_override=None):
+        values = {}
+        for section in sections:
+            cached = self.section_cache.get(signatures[section.key])
+            if cached is not None:
+                values[section.key] = cached
+        stale = [section for section in sections if section.key not in values]
+        if stale:
+            workers = max(1, min(len(stale), self.section_concurrency))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="section") as pool:
+                futures = [(section, pool.submit(in_current_context(run), section)) for section in stale]
+                for section, future in futures:
+                    try:
+                        values[section.key] = future.result()
+                    except (CancelledError, DeadlineExceeded):
+                        raise
+                    except Exception as e:
+                        logger.error(f"Section {section.key} failed, using the original data: {e}")
+                        values[section.key] = None
+                    if values[section.key] is not None:
+                        self.section_cache.put(signatures[section.key], values[section.key])
+        logger.info(f"Sections: {len(sections) - len(stale)} reused, {len(stale)} generated")
+
+        with tracer.span("schema repair"):
+            content, report = repair_resume(merge_sections(user_data, sections, values), user_data)
+        with self._stats_lock:
+            self.last_section_timings = timings
+            self.last_section_cache = {
+                "reused": [section.key for section in sections if section not in stale],
+                "regenerated": [section.key for section in stale],
+            }
+            self.last_repair_report = {**report.to_dict(), "reasked": []}
+        return content
+
+    def _repair_content(self, content, user_data, system, prompt, cancel_token=None, deadline=None):
+        """
+        Repairs generated resume JSON locally; only fields that cannot be
+        repaired are asked for again, instead of regenerating the whole resume.
+        """
+        with tracer.span("schema repair"):
+            content, report = repair_resume(content, user_data)
+        reasked = list(report.missing)
+        if reasked:
+            logger.warning(f"Generated resume is missing {', '.join(reasked)}; asking for those fields only")
+            try:
+                patch = self._run_stage("AI field re-ask", "generate_json", system,
+                                        prompt + "\n" + reask_prompt(reasked, content), cancel_token, deadline)
+            except (CancelledError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                # The repaired content still renders; a failed re-ask shouldn't fail the generation
+                logger.error(f"Field re-ask failed: {e}")
+                patch = {}
+            if isinstance(patch, dict):
+                content.update({key: patch[key] for key in reasked if key in patch})
+            with tracer.span("schema repair"):
+                content, report = repair_resume(content, user_data)
+        if report.fixes:
+            logger.info(f"Repaired generated resume: {'; '.join(report.fixes)}")
+        with self._stats_lock:
+            self.last_repair_report = {**report.to_dict(), "reasked": reasked}
+        return content
+
+    def fix_latex_content(self, latex_source, error_log, system_prompt_override=None, cancel_token=None, deadline=None):
         prompt = f"""
         BROKEN LATEX SOURCE:
         {latex_source}
@@ -72,12 +439,14 @@ class AIEngine:
         
         system = system_prompt_override if system_prompt_override else DEFAULT_FIX_PROMPT
         
-        try:
-            return self.provider.generate_text(system, prompt)
-        except Exception as e:
-            raise RuntimeError(f"AI Provider Error: {str(e)}")
+        return self._run_stage("AI fix", "generate_text", system, prompt, cancel_token, deadline)
             
-    def fill_custom_latex(self, latex_template, job_description, user_data, system_prompt_override=None):
+    def fill_custom_latex(self, latex_template, job_description, user_data, system_prompt_override=None, cancel_token=None, deadline=None):
+        self._reset_reports()
+        system = system_prompt_override if system_prompt_override else DEFAULT_CUSTOM_FILL_PROMPT
+        user_data = self._retrieve(job_description, user_data)
+        job_description, user_data = self._fit_prompt(job_description, user_data, system + latex_template)
+
         prompt = f"""
         JOB DESCRIPTION:
         {job_description}
@@ -96,9 +465,4 @@ class AIEngine:
         5. Output ONLY the filled LaTeX code. Do not output markdown or explanations.
         """
         
-        system = system_prompt_override if system_prompt_override else DEFAULT_CUSTOM_FILL_PROMPT
-        
-        try:
-            return self.provider.generate_text(system, prompt)
-        except Exception as e:
-            raise RuntimeError(f"AI Provider Error: {str(e)}")
+        return self._run_stage("AI template fill", "generate_text", system, prompt, cancel_token, deadline)
@@ -0,0 +1,387 @@
+import os
+import re
+import json
+import time
+import hashlib
+import shutil
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import DEFAULT_TIME_BUDGET, DEFAULT_DEDUP_THRESHOLD, DEFAULT_RESUME_PROMPT
+from engine.deadline import Deadline
+from engine.tokens import estimate_tokens
+from engine.jobqueue import JobQueue, LeaseLostError
+from engine.tracing import in_current_context
+from engine.usage import metering
+
+QUEUE_FILENAME = "batch_queue.sqlite"
+
+logger = logging.getLogger(__name__)
+
+JD_FILE_EXTENSIONS = (".txt", ".md")
+STAGES = ("generate", "render", "compile")
+
+
+class BatchJob:
+    """One job description to tailor the profile to."""
+
+    def __init__(self, job_id, job_description, source=None):
+        self.job_id = job_id
+        self.job_description = job_description
+        self.source = source
+
+
+def slugify(value):
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", str(value)).strip("-.")
+    return slug[:80] or "jd"
+
+
+def load_jobs(path):
+    """
+    Reads job descriptions from a directory of .txt/.md files (one JD per file,
+    named after the file) or from a JSONL file with one object per line holding
+    `job_description` (or `jd`/`text`) and an optional `id`.
+    """
+    jobs = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith(JD_FILE_EXTENSIONS):
+                continue
+            file_path = os.path.join(path, name)
+            with open(file_path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if text:
+                jobs.append(BatchJob(slugify(os.path.splitext(name)[0]), text, file_path))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_no}: invalid JSON ({e})")
+                text = record.get("job_description") or record.get("jd") or record.get("text")
+                if not text:
+                    raise ValueError(f"{path}:{line_no}: no job_description field")
+                job_id = slugify(record.get("id") or f"jd-{line_no:04d}")
+                jobs.append(BatchJob(job_id, text, f"{path}:{line_no}"))
+
+    # Keep ids unique so outputs never overwrite each other
+    seen = {}
+    for job in jobs:
+        count = seen.get(job.job_id, 0)
+        seen[job.job_id] = count + 1
+        if count:
+            job.job_id = f"{job.job_id}-{count + 1}"
+    return jobs
+
+
+def _summarize(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_s": round(sum(ordered) / len(ordered), 3),
+        "p50_s": round(pct(50), 3),
+        "p95_s": round(pct(95), 3),
+        "max_s": round(ordered[-1], 3),
+    }
+
+
+class BatchRunner:
+    """
+    Tailors one profile to many job descriptions: AI generation -> template
+    rendering -> PDF compilation for each JD, with bounded concurrency.
+    Writes <id>.json, <id>.tex and <id>.pdf per JD plus batch_report.json.
+
+    Progress is kept in a durable JobQueue (batch_queue.sqlite in the output
+    directory), so running the same batch again resumes unfinished JDs from
+    their last completed stage instead of regenerating them.
+
+    JDs that are near-identical reposts of another JD in the queue (word
+    shingle Jaccard >= dedup_threshold) reuse that JD's generated content
+    instead of making their own AI call.
+    """
+
+    def __init__(self, ai, latex, output_dir, template_name="modern.tex", concurrency=4,
+                 compile=True, time_budget=DEFAULT_TIME_BUDGET, system_prompt=None, queue_path=None, fresh=False,
+                 dedup_threshold=DEFAULT_DEDUP_THRESHOLD):
+        self.ai = ai
+        self.latex = latex
+        self.output_dir = output_dir
+        self.template_name = template_name
+        self.concurrency = max(1, int(concurrency))
+        self.compile = compile
+        self.time_budget = time_budget
+        self.system_prompt = system_prompt
+        self.queue_path = queue_path or os.path.join(output_dir, QUEUE_FILENAME)
+        self.fresh = fresh
+        self.dedup_threshold = dedup_threshold
+        # job_id -> (original job_id, jaccard); set per run by _plan_dedup()
+        self._duplicates = {}
+        self._generated = {}
+
+    def run(self, jobs, user_data):
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.compile and not self.latex.pdflatex_available():
+            logger.warning("pdflatex not found; writing .tex/.json only")
+            self.compile = False
+
+        # A job that outlives its whole time budget (plus slack) is presumed dead
+        queue = JobQueue(self.queue_path, lease_seconds=float(self.time_budget) + 60)
+        if self.fresh:
+            queue.reset()
+        # The queue may hold jobs of earlier runs; everything below is limited to this run's
+        job_ids = [job.job_id for job in jobs]
+        fingerprint = self._fingerprint(user_data)
+        queue.add(jobs, fingerprint)
+        queue.prepare_run("compiled" if self.compile else "rendered", job_ids)
+        already_done = queue.counts(job_ids).get("done", 0)
+        self._plan_dedup(queue, job_ids, fingerprint)
+
+        started = time.time()
+        start = time.monotonic()
+        logger.info(f"Batch of {len(jobs)} JDs ({already_done} already done), concurrency {self.concurrency}")
+        owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        # Workers run in copies of this context, so their provider calls count towards the batch's usage
+        with metering() as usage, ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(in_current_context(self._work), queue, job_ids, user_data, f"{owner_prefix}:{i}")
+                       for i in range(self.concurrency)]
+            results = [result for future in futures for result in future.result()]
+        wall_time = time.monotonic() - start
+        results.sort(key=lambda r: r["id"])
+
+        report = self._report(results, started, wall_time, already_done)
+        report["usage"] = usage.summary()
+        logger.info(f"Batch usage: {usage.calls} AI calls, {report['usage']['total_tokens']} tokens "
+                    f"({report['usage']['cached_tokens']} cached), ${report['usage']['cost_usd']:.4f}")
+        report["dedup"] = self._dedup_report(results, self.dedup_threshold)
+        report["ranking"] = self._rank(queue.all(job_ids), results, user_data)
+        queue.close()
+        with open(os.path.join(self.output_dir, "batch_report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def _fingerprint(self, user_data):
+        """Hash of what a job's output depends on besides its JD: profile, template and system prompt."""
+        try:
+            template = self.latex.env.loader.get_source(self.latex.env, self.template_name)[0]
+        except Exception:
+            template = None
+        payload = json.dumps([user_data, self.template_name, template, self.system_prompt or DEFAULT_RESUME_PROMPT],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _work(self, queue, job_ids, user_data, owner):
+        results = []
+        try:
+            while True:
+                job = queue.claim(owner, job_ids)
+                if job is None:
+                    return results
+                try:
+                    result = self.process(job, user_data, queue, owner)
+                finally:
+                    self._mark_generated(job.job_id)
+                if result is not None:
+                    results.append(result)
+        finally:
+            queue.close()
+
+    def process(self, job, user_data, queue, owner):
+        """
+        Runs the remaining stages of one leased job, recording each completed
+        stage in the queue. Never raises: failures are recorded in the result.
+        Returns None if the lease was lost to another worker.
+        """
+        result = {"id": job.job_id, "source": job.source, "status": "ok", "resumed_from": job.stage,
+                  "timings": {}, "outputs": {}}
+        deadline = Deadline(self.time_budget)
+        base = os.path.join(self.output_dir, job.job_id)
+        content, tex_content = job.content, job.tex_content
+        stage = "generate"
+        try:
+            if not job.reached("generated"):
+                started = time.monotonic()
+                if job.job_id in self._duplicates:
+                    content = self._reuse_duplicate(job, queue, owner)
+                    # Waiting for the original is not this job's work: its own budget starts now
+                    deadline = Deadline(self.time_budget)
+                if content is not None:
+                    result["duplicate_of"], result["similarity"] = self._duplicates[job.job_id]
+                    # The skipped call: system prompt, JD and profile in, resume JSON out
+                    result["tokens_saved"] = sum(estimate_tokens(text) for text in (
+                        self.system_prompt or DEFAULT_RESUME_PROMPT, job.job_description,
+                        json.dumps(user_data), json.dumps(content)))
+                else:
+                    with metering() as usage:
+                        content = self.ai.generate_resume_content(job.job_description, user_data,
+                                                                  system_prompt_override=self.system_prompt,
+                                                                  deadline=deadline)
+                    if usage.calls:
+                        result["usage"] = usage.summary()
+                result["timings"]["generate"] = round(time.monotonic() - started, 3)
+                self._write(base + ".json", json.dumps(content, indent=4))
+                queue.advance(job.job_id, owner, "generated", content=content)
+                self._mark_generated(job.job_id)
+            result["outputs"]["json"] = base + ".json"
+
+            stage = "render"
+            if not job.reached("rendered"):
+                deadline.check("template rendering")
+                started = time.monotonic()
+                tex_content = self.latex.render_template(self.template_name, content)
+                result["timings"]["render"] = round(time.monotonic() - started, 3)
+                self._write(base + ".tex", tex_content)
+                queue.advance(job.job_id, owner, "rendered", tex_content=tex_content, done=not self.compile)
+            result["outputs"]["tex"] = base + ".tex"
+
+            if self.compile:
+                stage = "compile"
+                started = time.monotonic()
+                work_dir = os.path.join(self.output_dir, ".build", job.job_id)
+                pdf_path, _ = self.latex.compile_pdf(tex_content, deadline=deadline, work_dir=work_dir)
+                shutil.copy(pdf_path, base + ".pdf")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                result["timings"]["compile"] = round(time.monotonic() - started, 3)
+                queue.advance(job.job_id, owner, "compiled", done=True)
+                result["outputs"]["pdf"] = base + ".pdf"
+        except LeaseLostError:
+            logger.warning(f"[{job.job_id}] lease lost during {stage}; leaving it to the new owner")
+            return None
+        except Exception as e:
+            result["status"] = "failed"
+            result["stage"] = stage
+            result["error"] = str(e)
+            logger.error(f"[{job.job_id}] {stage} failed: {e}")
+            try:
+                queue.fail(job.job_id, owner, stage, str(e))
+            except LeaseLostError:
+                return None
+        else:
+            if job.stage != "queued":
+                logger.info(f"[{job.job_id}] resumed after {job.stage}")
+            logger.info(f"[{job.job_id}] done in {sum(result['timings'].values()):.1f}s")
+        return result
+
+    def _plan_dedup(self, queue, job_ids, fingerprint):
+        """
+        Finds the JDs of this run that repeat another JD of the run, or one
+        generated earlier from the same profile, template and prompt. Originals
+        are claimed first (lower job id, or generated in an earlier run), so a
+        duplicate only ever waits for a job that is already in progress.
+        """
+        self._duplicates, self._generated = {}, {}
+        if not self.dedup_threshold:
+            return
+        # Imported here: numpy is only needed when deduplication is on
+        from engine.dedup import find_duplicates
+        run = set(job_ids)
+        jobs = [job for job in queue.all()
+                if job.job_id in run or (job.content is not None and job.fingerprint == fingerprint)]
+        generated = [job.job_id for job in jobs if job.content is not None]
+        duplicates = find_duplicates([(job.job_id, job.job_description) for job in jobs],
+                                     self.dedup_threshold, preferred=generated)
+        self._duplicates = {job_id: match for job_id, match in duplicates.items() if job_id in run}
+        for original, _ in self._duplicates.values():
+            event = self._generated.setdefault(original, threading.Event())
+            if original in generated:
+                event.set()
+        if self._duplicates:
+            logger.info(f"{len(self._duplicates)} JDs are near-duplicates and will reuse generated content")
+
+    def _mark_generated(self, job_id):
+        event = self._generated.get(job_id)
+        if event is not None:
+            event.set()
+
+    def _reuse_duplicate(self, job, queue, owner):
+        """
+        The original's generated content for a near-duplicate `job`, or None if
+        the original fails or does not finish generating within its own time
+        budget. The job's lease is renewed after the wait.
+        """
+        original_id, similarity = self._duplicates[job.job_id]
+        ready = self._generated[original_id].wait(self.time_budget)
+        queue.renew(job.job_id, owner)
+        if not ready:
+            logger.warning(f"[{job.job_id}] original {original_id} not ready in time; generating")
+            return None
+        original = queue.get(original_id)
+        if original is None or original.content is None:
+            logger.info(f"[{job.job_id}] original {original_id} failed; generating")
+            return None
+        logger.info(f"[{job.job_id}] reusing {original_id} (Jaccard {similarity:.2f})")
+        return original.content
+
+    @staticmethod
+    def _dedup_report(results, threshold):
+        hits = [r for r in results if "duplicate_of" in r]
+        return {
+            "threshold": threshold,
+            "hits": len(hits),
+            "tokens_saved": sum(r["tokens_saved"] for r in hits),
+            "pairs": [{"id": r["id"], "duplicate_of": r["duplicate_of"], "similarity": round(r["similarity"], 3)}
+                      for r in hits],
+        }
+
+    @staticmethod
+    def _rank(jobs, results, user_data):
+        """
+        Scores every generated resume of the run's `jobs` against its JD in one
+        vectorized pass and returns them best match first; each result also
+        gets its ats_score.
+        """
+        jobs = [job for job in jobs if job.content is not None]
+        if not jobs:
+            return []
+        try:
+            # Imported here: numpy/scipy would otherwise slow down every CLI start
+            from engine.scoring import KeywordScorer
+            skills = user_data.get("skills") if isinstance(user_data, dict) else None
+            scorer = KeywordScorer(skills=skills if isinstance(skills, list) else ())
+            scores, _, coverage = scorer.score_many([job.content for job in jobs],
+                                                    [job.job_description for job in jobs])
+        except Exception as e:
+            logger.warning(f"ATS scoring failed: {e}")
+            return []
+        ranking = sorted(({"id": job.job_id, "ats_score": float(score), "coverage": round(float(cov), 3)}
+                          for job, score, cov in zip(jobs, scores, coverage)),
+                         key=lambda entry: (-entry["ats_score"], entry["id"]))
+        by_id = {entry["id"]: entry["ats_score"] for entry in ranking}
+        for result in results:
+            if result["id"] in by_id:
+                result["ats_score"] = by_id[result["id"]]
+        return ranking
+
+    @staticmethod
+    def _write(path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _report(self, results, started, wall_time, already_done=0):
+        failures = [r for r in results if r["status"] != "ok"]
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "total": len(results) + already_done,
+            "succeeded": len(results) - len(failures) + already_done,
+            "failed": len(failures),
+            "already_done": already_done,
+            "resumed": sum(1 for r in results if r["resumed_from"] != "queued"),
+            "concurrency": self.concurrency,
+            "wall_time_s": round(wall_time, 3),
+            "throughput_per_min": round(len(results) / wall_time * 60, 2) if wall_time > 0 else None,
+            "stage_timings": {
+                stage: _summarize([r["timings"][stage] for r in results if stage in r["timings"]])
+                for stage in STAGES
+            },
+            "failures": [{"id": r["id"], "stage": r["stage"], "error": r["error"]} for r in failures],
+            "jobs": results,
+        }
@@ -0,0 +1,77 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CancelledError(RuntimeError):
+    """Raised when an operation is aborted through its CancelToken."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation shared between the Bridge, AIEngine and providers.
+    Cancelling runs the registered callbacks immediately, which is how providers
+    tear down in-flight HTTP connections.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled_at = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    def add_callback(self, callback):
+        """
+        Registers `callback` to run on cancellation (right away if already cancelled).
+        Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def child(self):
+        """A new token that is cancelled together with this one (but not vice versa)."""
+        token = CancelToken()
+        remove = self.add_callback(token.cancel)
+        token.add_callback(remove)
+        return token
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise CancelledError("Cancelled by user")
+
+    def latency_ms(self):
+        """Milliseconds elapsed since cancel() was called, or None if it wasn't."""
+        if self.cancelled_at is None:
+            return None
+        return (time.monotonic() - self.cancelled_at) * 1000.0
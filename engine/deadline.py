@@ -0,0 +1,39 @@
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a pipeline stage runs out of the overall time budget."""
+
+    def __init__(self, stage, budget):
+        self.stage = stage
+        self.budget = budget
+        super().__init__(f"Time budget of {budget:.0f}s exhausted during {stage}")
+
+
+class Deadline:
+    """
+    Overall time budget for one user action (generate -> render -> compile -> fix).
+    Each stage asks for the remaining budget as its timeout and fails fast once
+    nothing is left.
+    """
+
+    def __init__(self, seconds):
+        self.budget = float(seconds)
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        if self.expired:
+            raise DeadlineExceeded(stage, self.budget)
+
+    def timeout_for(self, stage, cap=None):
+        """Remaining budget for `stage`, optionally capped; raises if none is left."""
+        self.check(stage)
+        remaining = self.remaining()
+        return min(remaining, cap) if cap else remaining
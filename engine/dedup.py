@@ -0,0 +1,115 @@
+import re
+import zlib
+import numpy as np
+
+# Hash permutations per MinHash signature
+DEFAULT_NUM_PERM = 128
+SHINGLE_SIZE = 3
+
+# Hash permutations h(x) = (a*x + b) mod p over 32-bit shingle hashes; p = 2^31 - 1
+# keeps a*x within uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of overlapping `size`-word sequences of `text`, case- and punctuation-insensitive."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(threshold, num_perm=DEFAULT_NUM_PERM):
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH cutoff (1/b)^(1/r) is
+    the highest one at or below `threshold`: candidates are then verified
+    exactly, so missing a true duplicate costs more than checking an extra pair.
+    """
+    best = (num_perm, 1)
+    best_cutoff = -1.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        cutoff = (1.0 / bands) ** (1.0 / rows)
+        if best_cutoff < cutoff <= threshold:
+            best, best_cutoff = (bands, rows), cutoff
+    return best
+
+
+class MinHasher:
+    """MinHash signatures of shingle sets; the same seed always gives the same signatures."""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)[:, None]
+        self.b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)[:, None]
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return np.full(self.num_perm, int(_PRIME), dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set)) % _PRIME
+        return ((self.a * hashes[None, :] + self.b) % _PRIME).min(axis=1)
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index of job descriptions. Only JDs that share a band with the
+    query are compared, and candidates are confirmed with the exact Jaccard
+    similarity of their shingles.
+    """
+
+    def __init__(self, threshold, num_perm=DEFAULT_NUM_PERM):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.shingles = {}
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text, shingle_set=None):
+        """(key, jaccard) of indexed JDs at or above the threshold, most similar first."""
+        shingle_set = shingles(text) if shingle_set is None else shingle_set
+        candidates = set()
+        for bucket, band in zip(self.buckets, self._band_keys(self.hasher.signature(shingle_set))):
+            candidates.update(bucket.get(band, ()))
+        matches = [(key, jaccard(shingle_set, self.shingles[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= self.threshold), key=lambda m: (-m[1], m[0]))
+
+    def add(self, key, text, shingle_set=None):
+        shingle_set = shingles(text) if shingle_set is None else shingle_set
+        self.shingles[key] = shingle_set
+        for bucket, band in zip(self.buckets, self._band_keys(self.hasher.signature(shingle_set))):
+            bucket.setdefault(band, []).append(key)
+
+
+def find_duplicates(texts, threshold, preferred=()):
+    """
+    Groups near-identical texts. `texts` is an ordered list of (key, text);
+    every key that duplicates an earlier one maps to (original key, jaccard).
+    Keys in `preferred` (e.g. already generated) are indexed first, so they
+    become the originals of their group.
+    """
+    preferred = set(preferred)
+    ordered = [item for item in texts if item[0] in preferred] + [item for item in texts if item[0] not in preferred]
+    index = DuplicateIndex(threshold)
+    duplicates = {}
+    for key, text in ordered:
+        shingle_set = shingles(text)
+        matches = index.query(text, shingle_set)
+        if matches:
+            duplicates[key] = matches[0]
+        else:
+            index.add(key, text, shingle_set)
+    return duplicates
@@ -0,0 +1,173 @@
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from engine.cancel import CancelToken
+from engine.tracing import in_current_context
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """
+    Rolling window of primary call latencies (in seconds): successful calls,
+    plus lower bounds for primaries cancelled because the hedge won.
+    """
+
+    def __init__(self, window=50):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """Nearest-rank percentile of the window, or None when empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, int(round(pct / 100.0 * len(samples))))
+        return samples[min(rank, len(samples)) - 1]
+
+    def tail_mean(self, threshold):
+        """Mean of the samples slower than `threshold`, or None if there are none."""
+        with self._lock:
+            tail = [s for s in self._samples if s > threshold]
+        return sum(tail) / len(tail) if tail else None
+
+
+class HedgeStats:
+    """Thread-safe counters describing how hedged calls were resolved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.primary_wins = 0
+        self.hedged_wins = 0
+        self.hedges_fired = 0
+        self.failovers = 0
+        self.latency_saved = 0.0
+
+    def record(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "primary_wins": self.primary_wins,
+                "hedged_wins": self.hedged_wins,
+                "hedges_fired": self.hedges_fired,
+                "failovers": self.failovers,
+                "latency_saved_s": round(self.latency_saved, 3),
+            }
+
+
+class Hedger:
+    """
+    Sends a request to the primary provider and, if it has not answered by the
+    configured latency percentile, sends the same request to a secondary one.
+    The first valid result wins; the losing request is cancelled through its
+    own CancelToken, which closes its connection.
+    """
+
+    def __init__(self, percentile=95, initial_delay=8.0, min_samples=5, window=50, max_workers=8):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.tracker = LatencyTracker(window)
+        self.stats = HedgeStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def hedge_delay(self):
+        """Seconds to wait on the primary before hedging."""
+        if len(self.tracker) < self.min_samples:
+            return self.initial_delay
+        return self.tracker.percentile(self.percentile)
+
+    def timed_call(self, provider, method, args, is_primary=True, cancel_token=None, timeout=None):
+        """Runs a provider call, recording its latency when it is the primary."""
+        start = time.monotonic()
+        result = getattr(provider, method)(*args, cancel_token=cancel_token, timeout=timeout)
+        # A cancelled primary already got its lower-bound sample when it lost
+        if is_primary and not (cancel_token is not None and cancel_token.cancelled):
+            self.tracker.record(time.monotonic() - start)
+        return result
+
+    def call(self, primary, secondary, method, *args, is_valid=None, cancel_token=None, timeout=None):
+        is_valid = is_valid or (lambda result: result is not None and result != "")
+        parent = cancel_token or CancelToken()
+        tokens = {"primary": parent.child(), "secondary": parent.child()}
+        start = time.monotonic()
+        delay = self.hedge_delay()
+        self.stats.record(calls=1)
+
+        # Copied contexts keep the calls' spans and token usage with the caller's
+        pending = {self._executor.submit(in_current_context(self.timed_call), primary, method, args, True, tokens["primary"], timeout): "primary"}
+        done, _ = wait(pending, timeout=delay)
+        parent.raise_if_cancelled()
+        failed_fast = bool(done) and not self._succeeded(next(iter(done)), is_valid)
+        if not done or failed_fast:
+            reason = "primary failed" if failed_fast else "slow primary"
+            logger.info(f"Hedging {method} to secondary provider after {time.monotonic() - start:.2f}s ({reason})")
+            if failed_fast:
+                self.stats.record(failovers=1)
+            else:
+                self.stats.record(hedges_fired=1)
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            pending[self._executor.submit(in_current_context(self.timed_call), secondary, method, args, False, tokens["secondary"], remaining)] = "secondary"
+
+        errors = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                role = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors[role] = e
+                    continue
+                if not is_valid(result):
+                    errors[role] = ValueError(f"{role} provider returned an invalid result")
+                    continue
+                elapsed = time.monotonic() - start
+                for loser, loser_role in pending.items():
+                    loser.cancel()
+                    tokens[loser_role].cancel()
+                    if loser_role == "primary":
+                        # The primary would have taken at least this long. Without
+                        # the sample, slow primaries never reach the tracker and
+                        # the hedge delay keeps falling.
+                        self.tracker.record(elapsed)
+                self._record_win(role, elapsed)
+                return result
+
+        parent.raise_if_cancelled()
+        raise errors.get("primary") or errors["secondary"]
+
+    @staticmethod
+    def _succeeded(future, is_valid):
+        try:
+            return is_valid(future.result())
+        except Exception:
+            return False
+
+    def _record_win(self, role, elapsed):
+        if role == "primary":
+            self.stats.record(primary_wins=1)
+            return
+        # The primary was cut short, so estimate what it would have taken from
+        # the observed latencies that were slower than this call.
+        expected = self.tracker.tail_mean(elapsed)
+        saved = max(0.0, expected - elapsed) if expected is not None else 0.0
+        self.stats.record(hedged_wins=1, latency_saved=saved)
+        logger.info(f"Hedged request won after {elapsed:.2f}s (est. {saved:.2f}s saved)")
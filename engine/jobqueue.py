@@ -0,0 +1,250 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in order; a job's `stage` is the last one it completed
+STAGES = ("queued", "generated", "rendered", "compiled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id          TEXT PRIMARY KEY,
+    job_description TEXT NOT NULL,
+    fingerprint     TEXT,
+    source          TEXT,
+    stage           TEXT NOT NULL DEFAULT 'queued',
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    lease_owner     TEXT,
+    lease_expires   REAL,
+    content         TEXT,
+    tex_content     TEXT,
+    error           TEXT,
+    error_stage     TEXT,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires);
+"""
+
+
+class LeaseLostError(RuntimeError):
+    """The job's lease expired and another worker took it over."""
+
+
+class QueuedJob:
+    """A row of the jobs table."""
+
+    def __init__(self, row):
+        self.job_id = row["job_id"]
+        self.job_description = row["job_description"]
+        self.fingerprint = row["fingerprint"]
+        self.source = row["source"]
+        self.stage = row["stage"]
+        self.status = row["status"]
+        self.attempts = row["attempts"]
+        self.content = json.loads(row["content"]) if row["content"] else None
+        self.tex_content = row["tex_content"]
+        self.error = row["error"]
+        self.error_stage = row["error_stage"]
+
+    def reached(self, stage):
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class JobQueue:
+    """
+    Durable job queue in SQLite (WAL mode) for batch runs. Each job records the
+    last stage it completed and the artifacts needed to continue from there, so
+    a crashed or interrupted run resumes without repeating AI calls.
+
+    Workers claim jobs with a lease; a lease that expires (the worker died or
+    hung) makes the job claimable again, up to `max_attempts` claims.
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if "fingerprint" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            # Queues written before jobs were fingerprinted
+            conn.execute("ALTER TABLE jobs ADD COLUMN fingerprint TEXT")
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def add(self, jobs, fingerprint=None):
+        """
+        Enqueues BatchJobs. Jobs already in the queue keep their progress unless
+        their job description or `fingerprint` (a hash of everything else their
+        output depends on: profile, template, prompt) changed, in which case
+        they start over.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in jobs:
+                row = conn.execute("SELECT job_description, fingerprint FROM jobs WHERE job_id = ?",
+                                   (job.job_id,)).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO jobs (job_id, job_description, fingerprint, source, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (job.job_id, job.job_description, fingerprint, job.source, now))
+                elif row["job_description"] != job.job_description or row["fingerprint"] != fingerprint:
+                    if row["job_description"] != job.job_description:
+                        logger.info(f"[{job.job_id}] job description changed; starting over")
+                    else:
+                        logger.info(f"[{job.job_id}] profile, template or prompt changed; starting over")
+                    conn.execute(
+                        "UPDATE jobs SET job_description = ?, fingerprint = ?, source = ?, stage = 'queued', "
+                        "status = 'pending', attempts = 0, lease_owner = NULL, lease_expires = NULL, content = NULL, "
+                        "tex_content = NULL, error = NULL, error_stage = NULL, updated_at = ? WHERE job_id = ?",
+                        (job.job_description, fingerprint, job.source, now, job.job_id))
+
+    @staticmethod
+    def _scope(job_ids):
+        """SQL condition (and its parameters) limiting a query to `job_ids`; None means all jobs."""
+        if job_ids is None:
+            return "1", ()
+        return "job_id IN (SELECT value FROM json_each(?))", (json.dumps(list(job_ids)),)
+
+    def prepare_run(self, final_stage, job_ids=None):
+        """
+        Makes unfinished work claimable for a new run: failed jobs and jobs that
+        have not reached `final_stage` go back to pending with fresh attempts.
+        Leases held by a crashed earlier run are dropped as well. `job_ids`
+        limits this to the jobs of the run.
+        """
+        stages = [s for s in STAGES if STAGES.index(s) < STAGES.index(final_stage)]
+        placeholders = ",".join("?" * len(stages))
+        scope, scope_params = self._scope(job_ids)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"UPDATE jobs SET status = 'pending', attempts = 0, lease_owner = NULL, lease_expires = NULL, "
+                f"updated_at = ? WHERE stage IN ({placeholders}) AND {scope}",
+                (time.time(), *stages, *scope_params))
+            conn.execute(
+                f"UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL "
+                f"WHERE stage NOT IN ({placeholders}) AND {scope}",
+                (*stages, *scope_params))
+
+    def claim(self, owner, job_ids=None):
+        """
+        Leases the next pending (or lease-expired) job to `owner`, among
+        `job_ids` if given; None when nothing is left.
+        """
+        now = time.time()
+        scope, scope_params = self._scope(job_ids)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                f"SELECT job_id FROM jobs WHERE status = 'leased' AND lease_expires < ? AND attempts >= ? AND {scope}",
+                (now, self.max_attempts, *scope_params)).fetchall()
+            for row in expired:
+                logger.warning(f"[{row['job_id']}] lease expired {self.max_attempts} times; giving up")
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, error_stage = 'lease', lease_owner = NULL, "
+                    "lease_expires = NULL, updated_at = ? WHERE job_id = ?",
+                    (f"Worker lease expired {self.max_attempts} times", now, row["job_id"]))
+
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                f"AND {scope} ORDER BY job_id LIMIT 1",
+                (now, *scope_params)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "leased":
+                logger.warning(f"[{row['job_id']}] lease of {row['lease_owner']} expired; retrying")
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE job_id = ?",
+                (owner, now + self.lease_seconds, now, row["job_id"]))
+            return QueuedJob(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+
+    def advance(self, job_id, owner, stage, content=None, tex_content=None, done=False):
+        """
+        Records that the leased job completed `stage` (with its artifact) and
+        renews the lease. Raises LeaseLostError if `owner` no longer holds it.
+        """
+        now = time.time()
+        fields = ["stage = ?", "lease_expires = ?", "updated_at = ?", "error = NULL", "error_stage = NULL"]
+        values = [stage, now + self.lease_seconds, now]
+        if content is not None:
+            fields.append("content = ?")
+            values.append(json.dumps(content))
+        if tex_content is not None:
+            fields.append("tex_content = ?")
+            values.append(tex_content)
+        if done:
+            fields += ["status = 'done'", "lease_owner = NULL", "lease_expires = NULL"]
+        self._update_leased(job_id, owner, fields, values)
+
+    def renew(self, job_id, owner):
+        """Extends the lease on a job; raises LeaseLostError if `owner` no longer holds it."""
+        now = time.time()
+        self._update_leased(job_id, owner, ["lease_expires = ?", "updated_at = ?"], [now + self.lease_seconds, now])
+
+    def fail(self, job_id, owner, stage, error):
+        """Marks the leased job failed at `stage`; its completed stages are kept for the next run."""
+        self._update_leased(
+            job_id, owner,
+            ["status = 'failed'", "error = ?", "error_stage = ?", "lease_owner = NULL", "lease_expires = NULL",
+             "updated_at = ?"],
+            [error, stage, time.time()])
+
+    def _update_leased(self, job_id, owner, fields, values):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {', '.join(fields)} WHERE job_id = ? AND lease_owner = ? AND status = 'leased'",
+                (*values, job_id, owner))
+        if cursor.rowcount != 1:
+            raise LeaseLostError(f"Lease on {job_id} lost")
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return QueuedJob(row) if row else None
+
+    def all(self, job_ids=None):
+        scope, scope_params = self._scope(job_ids)
+        return [QueuedJob(row) for row in
+                self._conn().execute(f"SELECT * FROM jobs WHERE {scope} ORDER BY job_id", scope_params)]
+
+    def counts(self, job_ids=None):
+        scope, scope_params = self._scope(job_ids)
+        rows = self._conn().execute(f"SELECT status, COUNT(*) AS n FROM jobs WHERE {scope} GROUP BY status",
+                                    scope_params).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def reset(self):
+        """Forgets all jobs and their progress."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM jobs")
@@ -4,8 +4,13 @@ import shutil
 import platform
 import jinja2
 import base64
+import getpass
 import tempfile
 import logging
+import threading
+from config import DEFAULT_COMPILE_PASS_TIMEOUT
+from engine.deadline import DeadlineExceeded
+from engine.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +30,9 @@ except ImportError:
 class LatexEngine:
     def __init__(self, template_dir="templates"):
         self.template_dir = resource_path(template_dir)
-        self.current_process = None
+        # Running pdflatex processes (several when compiling concurrently)
+        self.processes = set()
+        self._process_lock = threading.Lock()
         # Configure Jinja2 for LaTeX
         self.env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(self.template_dir),
@@ -42,27 +49,30 @@ class LatexEngine:
         )
 
     def kill_compilation(self):
-        if self.current_process:
+        with self._process_lock:
+            running = list(self.processes)
+        for process in running:
             try:
-                self.current_process.terminate()
+                process.terminate()
             except:
                 pass
-            return True
-        return False
+        return bool(running)
 
     def render_template(self, template_name, context):
         """Renders the Jinja2 template with context data."""
         try:
-            template = self.env.get_template(template_name)
-            return template.render(**context)
+            with tracer.span("template rendering", template=template_name):
+                template = self.env.get_template(template_name)
+                return template.render(**context)
         except Exception as e:
             raise RuntimeError(f"Template rendering failed: {e}")
 
     def render_from_string(self, template_content, context):
         """Renders a template from a raw string."""
         try:
-            template = self.env.from_string(template_content)
-            return template.render(**context)
+            with tracer.span("template rendering", template="custom"):
+                template = self.env.from_string(template_content)
+                return template.render(**context)
         except Exception as e:
             raise RuntimeError(f"Custom template rendering failed: {e}")
 
@@ -71,7 +81,8 @@ class LatexEngine:
         if shutil.which("pdflatex"):
             return True
             
-        username = os.environ.get('USERNAME') or os.getlogin()
+        # getpass, unlike os.getlogin(), also works without a controlling terminal (CI, services)
+        username = os.environ.get('USERNAME') or getpass.getuser()
         
         # Common Paths to check
         common_paths = [
@@ -98,8 +109,19 @@ class LatexEngine:
                 
         return False
 
-    def compile_pdf(self, tex_content, output_dir=None):
-        """Compiles TeX content to PDF using pdflatex. Returns path to PDF."""
+    def pdflatex_available(self):
+        return self._ensure_pdflatex_path()
+
+    def compile_pdf(self, tex_content, output_dir=None, deadline=None, work_dir=None):
+        """
+        Compiles TeX content to PDF using pdflatex. Returns path to PDF.
+        With a Deadline, each pdflatex pass is limited to the remaining budget.
+        Pass a distinct `work_dir` per call to compile several documents concurrently.
+        """
+        with tracer.span("PDF compilation"):
+            return self._compile_pdf(tex_content, output_dir, deadline, work_dir)
+
+    def _compile_pdf(self, tex_content, output_dir=None, deadline=None, work_dir=None):
         logger.info("Starting PDF Compilation...")
 
         # Ensure pdflatex exists
@@ -111,11 +133,8 @@ class LatexEngine:
             )
 
         # Use local work directory to avoid temp permission/path issues
-        base_work_dir = os.path.join(os.getcwd(), "work_output")
-        if not os.path.exists(base_work_dir):
-            os.makedirs(base_work_dir)
-            
-        work_dir = os.path.join(base_work_dir, "build")
+        if not work_dir:
+            work_dir = os.path.join(os.getcwd(), "work_output", "build")
         if os.path.exists(work_dir):
             try:
                 shutil.rmtree(work_dir)
@@ -144,28 +163,38 @@ class LatexEngine:
         
         def run_compilation():
             # Run twice for references
-            for _ in range(2):
-                 self.current_process = subprocess.Popen(
-                    cmd,
-                    cwd=work_dir,
-                    env=env,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                 try:
-                     stdout, stderr = self.current_process.communicate(timeout=30)
-                 except subprocess.TimeoutExpired:
-                     logger.error("Compilation timed out!")
-                     self.current_process.terminate()
-                     raise RuntimeError("Compilation timed out (30s)")
-                 except Exception as e:
-                     logger.error(f"Compilation Process Error: {e}")
-                     raise e
-                 finally:
+            for compile_pass in (1, 2):
+                 stage = f"PDF compilation (pass {compile_pass})"
+                 with tracer.span(stage):
+                     timeout = deadline.timeout_for(stage, DEFAULT_COMPILE_PASS_TIMEOUT) if deadline else DEFAULT_COMPILE_PASS_TIMEOUT
+                     process = subprocess.Popen(
+                        cmd,
+                        cwd=work_dir,
+                        env=env,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True
+                    )
+                     with self._process_lock:
+                         self.processes.add(process)
+                     try:
+                         stdout, stderr = process.communicate(timeout=timeout)
+                     except subprocess.TimeoutExpired:
+                         logger.error("Compilation timed out!")
+                         process.kill()
+                         process.communicate()
+                         if deadline and deadline.expired:
+                             raise DeadlineExceeded(stage, deadline.budget)
+                         raise RuntimeError(f"Compilation timed out ({timeout:.0f}s)")
+                     except Exception as e:
+                         logger.error(f"Compilation Process Error: {e}")
+                         raise e
+                     finally:
+                         with self._process_lock:
+                             self.processes.discard(process)
+
                      # Check return code
-                     rc = self.current_process.returncode if self.current_process else -1
-                     self.current_process = None
+                     rc = process.returncode
                      if rc != 0:
                          logger.error(f"pdflatex returned code {rc}")
                          raise subprocess.CalledProcessError(rc, cmd, output=stdout, stderr=stderr)
@@ -179,8 +208,15 @@ class LatexEngine:
                 # 'initexmf' is the MiKTeX configuration utility
                 if shutil.which("initexmf"):
                     logger.warning("Compilation failed. Attempting MiKTeX DB refresh...")
-                    subprocess.run(["initexmf", "--update-fndb"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    subprocess.run(["initexmf", "--mkmaps"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    with tracer.span("MiKTeX refresh"):
+                        for command in (["initexmf", "--update-fndb"], ["initexmf", "--mkmaps"]):
+                            # Each command gets what is left of the budget when it starts
+                            stage = f"MiKTeX refresh ({command[1]})"
+                            refresh_timeout = deadline.timeout_for(stage) if deadline else None
+                            try:
+                                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=refresh_timeout)
+                            except subprocess.TimeoutExpired:
+                                raise DeadlineExceeded(stage, deadline.budget)
                     # Retry once
                     run_compilation()
                 else:
@@ -234,13 +270,15 @@ class LatexEngine:
             full_error = "LaTeX Compilation Failed:\n" + "\n".join(error_details)
             raise RuntimeError(full_error)
 
-    def generate_pdf_base64(self, template_name, context):
+    def generate_pdf_base64(self, template_name, context, deadline=None):
         """High level: render -> compile -> return base64"""
+        if deadline:
+            deadline.check("template rendering")
         tex_content = self.render_template(template_name, context)
-        pdf_path, work_dir = self.compile_pdf(tex_content)
+        pdf_path, work_dir = self.compile_pdf(tex_content, deadline=deadline)
         
         try:
-            with open(pdf_path, "rb") as f:
+            with tracer.span("base64 encoding"), open(pdf_path, "rb") as f:
                 b64 = base64.b64encode(f.read()).decode("utf-8")
             return b64, pdf_path
         finally:
@@ -0,0 +1,161 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from utils import app_path
+from config import DEFAULT_LOG_FILE, DEFAULT_LOG_MAX_BYTES, DEFAULT_LOG_BACKUPS, DEFAULT_LOG_LEVELS
+from engine.tracing import current_span
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+ENV_LEVEL = "ATS_LOG_LEVEL"
+
+# The running pipeline: the root logger's queue handler and the thread that empties the queue
+_handler = None
+_listener = None
+_atexit_registered = False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the trace of the operation that logged it."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+            entry["span"] = record.span
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them; only what depends on the
+    calling thread is resolved here: the message, the traceback and the
+    current tracing span.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            # Rendered now so the queued record does not keep the failed frames alive
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        span = current_span()
+        if span is not None:
+            record.trace_id = span.trace.trace_id
+            record.span = span.name
+        return record
+
+
+def default_level():
+    """ATS_LOG_LEVEL if set, else INFO in frozen builds and DEBUG from source."""
+    return os.getenv(ENV_LEVEL) or ("INFO" if getattr(sys, 'frozen', False) else "DEBUG")
+
+
+def _level(value):
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {value}")
+    return level
+
+
+def configure_logging(level=None, module_levels=None, log_file=None, console=True,
+                      max_bytes=DEFAULT_LOG_MAX_BYTES, backups=DEFAULT_LOG_BACKUPS):
+    """
+    Routes all logging through a queue to a background listener thread that
+    writes text to stderr and JSON Lines to a rotating `log_file`. A logging
+    call only copies the record into the queue, so slow disks or consoles
+    never delay the caller. Calling it again replaces the previous pipeline.
+    """
+    global _handler, _listener, _atexit_registered
+    # Resolved first, so an unknown level leaves the current pipeline in place
+    root_level = _level(level or default_level())
+    levels = {name: _level(value) for name, value in {**DEFAULT_LOG_LEVELS, **(module_levels or {})}.items()}
+    shutdown_logging()
+
+    handlers = []
+    # A windowed frozen build has no stderr
+    if console and sys.stderr is not None:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream)
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        rotating = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups,
+                                                        encoding="utf-8", delay=True)
+        rotating.setFormatter(JsonFormatter())
+        handlers.append(rotating)
+
+    log_queue = queue.SimpleQueue()
+    _handler = _QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(root_level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    if not _atexit_registered:
+        # Writes out what is still queued when the process exits
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+    return _listener
+
+
+def configure_logging_from_settings(settings, level=None, log_file=None, default_file=DEFAULT_LOG_FILE, console=True,
+                                    default=None):
+    """
+    Applies the `log_level`, `log_levels` and `log_file` settings. An explicit
+    `level` or `log_file` (e.g. from the command line) and ATS_LOG_LEVEL take
+    precedence over the settings; `default_file` is used when none is set, and
+    `default` (else default_level()) when no level is set anywhere.
+    """
+    level = level or os.getenv(ENV_LEVEL) or settings.get('log_level') or default
+    module_levels = settings.get('log_levels')
+    if log_file is None:
+        log_file = settings.get('log_file', default_file)
+    if not isinstance(log_file, str):
+        log_file = default_file
+    if log_file and not os.path.isabs(log_file):
+        log_file = app_path(log_file)
+    try:
+        return configure_logging(level if isinstance(level, (str, int)) else None,
+                                 module_levels if isinstance(module_levels, dict) else None,
+                                 log_file, console)
+    except ValueError as e:
+        # A typo in a level must not keep the app from starting
+        listener = configure_logging(None, None, log_file, console)
+        logging.getLogger(__name__).warning(f"Ignoring log level settings: {e}")
+        return listener
+
+
+def shutdown_logging():
+    """Stops the listener after it has written every queued record, and detaches the pipeline."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
@@ -0,0 +1,173 @@
+import os
+import time
+import types
+import cProfile
+import logging
+import itertools
+import threading
+import functools
+import tracemalloc
+from utils import app_path
+from config import DEFAULT_DIAGNOSTICS_DIR, DEFAULT_PROFILING_KEEP, DEFAULT_PROFILING_TOP_ALLOCATIONS
+
+logger = logging.getLogger(__name__)
+
+ENV_FLAG = "ATS_PROFILING"
+ENV_DIR = "ATS_PROFILING_DIR"
+
+PROFILE_SUFFIXES = (".prof", ".mem.txt")
+
+# tracemalloc is process-wide; it runs while at least one profiler needs it
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _truthy(value):
+    # Only real flags count: a missing or mocked setting must not switch profiling on
+    return value is True or (isinstance(value, str) and value.strip().lower() in ("1", "true", "yes", "on"))
+
+
+def profiling_enabled(settings):
+    """Whether profiling is on: the ATS_PROFILING environment variable wins over the setting."""
+    if os.getenv(ENV_FLAG) is not None:
+        return _truthy(os.getenv(ENV_FLAG))
+    return _truthy(settings.get('profiling_enabled'))
+
+
+def profiling_directory(settings):
+    directory = os.getenv(ENV_DIR) or settings.get('profiling_dir')
+    if isinstance(directory, str) and directory:
+        return directory
+    return app_path(DEFAULT_DIAGNOSTICS_DIR)
+
+
+class CallProfiler:
+    """
+    Profiles calls into a diagnostics directory: per call, a cProfile .prof
+    file (open it with snakeviz or `python -m pstats`) and a .mem.txt with the
+    allocations that grew most during the call (tracemalloc). Only the newest
+    `keep` calls are kept.
+
+    cProfile sees the calling thread only, so a provider request shows up as
+    time spent waiting for its helper thread. Memory is traced in all threads.
+    """
+
+    def __init__(self, directory, keep=DEFAULT_PROFILING_KEEP, top=DEFAULT_PROFILING_TOP_ALLOCATIONS, frames=10):
+        self.directory = directory
+        self.keep = max(1, int(keep))
+        self.top = top
+        self.frames = frames
+        self.calls = 0
+        self._sequence = itertools.count(1)
+        # One cProfile at a time: concurrent calls (e.g. a cancel during a
+        # generation) are still timed and memory-traced, but not CPU-profiled
+        self._cpu_lock = threading.Lock()
+        self._tracing = False
+
+    def start(self):
+        global _tracemalloc_users
+        if self._tracing:
+            return
+        with _tracemalloc_lock:
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            _tracemalloc_users += 1
+        self._tracing = True
+        logger.info(f"Profiling enabled, writing diagnostics to {self.directory}")
+
+    def stop(self):
+        global _tracemalloc_users
+        if not self._tracing:
+            return
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
+        self._tracing = False
+
+    def profile(self, name, fn, *args, **kwargs):
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence):04d}-{name}"
+        before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        profiler = cProfile.Profile() if self._cpu_lock.acquire(blocking=False) else None
+        started = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profiler:
+                    profiler.disable()
+        finally:
+            if profiler:
+                self._cpu_lock.release()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            try:
+                self._write(stem, name, profiler, before, elapsed_ms)
+            except Exception as e:
+                logger.warning(f"Could not write profile of {name}: {e}")
+
+    @staticmethod
+    def _without_profiler_frames(snapshot):
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def _write(self, stem, name, profiler, before, elapsed_ms):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, stem)
+        if profiler:
+            profiler.dump_stats(base + ".prof")
+        if before is not None and tracemalloc.is_tracing():
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            growth = self._without_profiler_frames(after).compare_to(self._without_profiler_frames(before), "lineno")
+            lines = [f"{name}: {elapsed_ms:.1f} ms, traced memory {current / 2**20:.1f} MiB "
+                     f"(peak {peak / 2**20:.1f} MiB since profiling started)",
+                     f"Top {self.top} allocations by growth during the call:"]
+            lines += [str(stat) for stat in growth[:self.top]]
+            with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        self.calls += 1
+        logger.info(f"Profiled {name} in {elapsed_ms:.1f} ms -> {base}")
+        self._rotate()
+
+    def _rotate(self):
+        """Deletes the files of all but the newest `keep` calls."""
+        calls = {}
+        for filename in os.listdir(self.directory):
+            for suffix in PROFILE_SUFFIXES:
+                if filename.endswith(suffix):
+                    path = os.path.join(self.directory, filename)
+                    stem = filename[:-len(suffix)]
+                    calls[stem] = max(calls.get(stem, 0), os.path.getmtime(path))
+        for stem in sorted(calls, key=lambda s: (calls[s], s))[:-self.keep]:
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.remove(os.path.join(self.directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def profile_methods(obj, profiler, names):
+    """
+    Shadows the methods `names` of `obj` with profiled ones. Only the instance
+    changes, and unprofile_methods() restores the class methods, so there is
+    no wrapper at all while profiling is off.
+    """
+    for name in names:
+        setattr(obj, name, types.MethodType(_profiled(profiler, name, getattr(type(obj), name)), obj))
+
+
+def _profiled(profiler, name, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return profiler.profile(name, method, self, *args, **kwargs)
+    return wrapper
+
+
+def unprofile_methods(obj, names):
+    for name in names:
+        obj.__dict__.pop(name, None)
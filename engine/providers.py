@@ -1,29 +1,153 @@
 import requests
 import json
-import google.generativeai as genai
+import socket
+import hashlib
+import threading
+from collections import OrderedDict
 from abc import ABC, abstractmethod
+from config import DEFAULT_REQUEST_TIMEOUT, DEFAULT_CONNECT_TIMEOUT, DEFAULT_OLLAMA_KEEP_ALIVE, DEFAULT_OLLAMA_WARM_UP_TIMEOUT
+from engine.cancel import CancelToken, CancelledError
+from engine.schema import parse_json
+from engine.usage import report_usage, openai_usage, ollama_usage, gemini_usage
+
+def _abort_response(response):
+    """Shuts down the socket behind a streaming response so a blocked read returns at once."""
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
 
 class AIProvider(ABC):
-    def __init__(self, api_key, model, api_base=None):
+    def __init__(self, api_key, model, api_base=None, headers=None):
         self.api_key = api_key
         self.model = model
         self.api_base = api_base
+        # Extra HTTP headers sent with every request (e.g. a gateway's auth header)
+        self.headers = dict(headers or {})
+        # Keeps connections (TCP + TLS) to the API warm between requests
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     @abstractmethod
-    def generate_text(self, system, prompt):
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
         pass
 
     @abstractmethod
-    def generate_json(self, system, prompt):
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
         pass
 
+    def list_models(self, timeout=DEFAULT_CONNECT_TIMEOUT):
+        """Model names the server offers; empty when the provider cannot list them."""
+        return []
+
+    def _run_call(self, fn, cancel_token=None, timeout=None):
+        """
+        Runs fn(token) on a helper thread so the caller is released as soon as
+        the request is cancelled or runs past `timeout` seconds, even while it
+        is still connecting. On timeout the request's own token is cancelled,
+        which closes its connection.
+        """
+        timeout = DEFAULT_REQUEST_TIMEOUT if timeout is None else timeout
+        token = cancel_token.child() if cancel_token is not None else CancelToken()
+        token.raise_if_cancelled()
+
+        outcome = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                outcome["result"] = fn(token)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        remove = token.add_callback(done.set)
+        threading.Thread(target=run, daemon=True, name=f"{type(self).__name__}-call").start()
+        try:
+            finished = done.wait(timeout)
+        finally:
+            remove()
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if not finished:
+            token.cancel()
+            raise TimeoutError(f"{type(self).__name__} did not answer within {timeout:.0f}s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _stream_post(self, url, extract, cancel_token, timeout=None, meta=None, **kwargs):
+        """
+        POSTs a streaming request and joins the text pieces that `extract` pulls
+        out of each line; `extract` returns None at the end-of-stream marker.
+        `extract` also gets `meta`, where it keeps usage data sent in the stream;
+        the response headers are stored there too.
+        Cancelling the token closes the connection, which stops generation server-side.
+        """
+        timeout = DEFAULT_REQUEST_TIMEOUT if timeout is None else timeout
+        meta = {} if meta is None else meta
+        response = self.session.post(url, stream=True, timeout=(min(DEFAULT_CONNECT_TIMEOUT, timeout), timeout), **kwargs)
+        remove = cancel_token.add_callback(lambda: _abort_response(response))
+        try:
+            response.raise_for_status()
+            meta["headers"] = response.headers
+            parts = []
+            for line in response.iter_lines():
+                if cancel_token.cancelled:
+                    break
+                if not line:
+                    continue
+                piece = extract(line.decode("utf-8"), meta)
+                if piece is None:
+                    break
+                parts.append(piece)
+        except Exception:
+            if cancel_token.cancelled:
+                raise CancelledError("Cancelled by user") from None
+            raise
+        finally:
+            remove()
+            response.close()
+
+        cancel_token.raise_if_cancelled()
+        return "".join(parts)
+
 class OpenAIProvider(AIProvider):
-    def __init__(self, api_key, model, api_base="https://api.openai.com/v1"):
-        super().__init__(api_key, model, api_base)
+    def __init__(self, api_key, model, api_base="https://api.openai.com/v1", headers=None):
+        super().__init__(api_key, model, api_base.rstrip("/"), headers)
+
+    def _auth_headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def list_models(self, timeout=DEFAULT_CONNECT_TIMEOUT):
+        response = self.session.get(f"{self.api_base}/models", headers=self._auth_headers(), timeout=timeout)
+        response.raise_for_status()
+        return sorted(model["id"] for model in response.json().get("data") or [] if model.get("id"))
+
+    @staticmethod
+    def _extract(line, meta):
+        # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+        if not line.startswith("data:"):
+            return ""
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return None
+        event = json.loads(payload)
+        if event.get("usage"):
+            # Sent in a last chunk without choices, because of stream_options.include_usage
+            meta["usage"] = event["usage"]
+        choices = event.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or ""
 
-    def _call(self, system, prompt, json_mode=False):
+    def _call(self, system, prompt, json_mode=False, cancel_token=None, timeout=None):
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
+            **self._auth_headers(),
             "Content-Type": "application/json"
         }
         data = {
@@ -31,64 +155,293 @@ class OpenAIProvider(AIProvider):
             "messages": [
                 {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            "stream": True,
+            "stream_options": {"include_usage": True}
         }
         if json_mode:
             data["response_format"] = {"type": "json_object"}
 
-        response = requests.post(f"{self.api_base}/chat/completions", headers=headers, json=data)
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
-        return json.loads(content) if json_mode else content
+        meta = {}
+        content = self._run_call(
+            lambda token: self._stream_post(f"{self.api_base}/chat/completions", self._extract, token, timeout,
+                                            meta, headers=headers, json=data),
+            cancel_token, timeout
+        )
+        if meta.get("usage"):
+            report_usage(self.model, openai_usage(meta["usage"], meta["headers"].get("openai-processing-ms")))
+        return parse_json(content) if json_mode else content
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=False, cancel_token=cancel_token, timeout=timeout)
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=True, cancel_token=cancel_token, timeout=timeout)
+
+class OpenAICompatibleProvider(OpenAIProvider):
+    """
+    Any server that speaks the OpenAI chat completions API (vLLM, llama.cpp
+    server, LM Studio, LiteLLM, ...). The API key is optional.
+    """
 
-    def generate_text(self, system, prompt):
-        return self._call(system, prompt, json_mode=False)
+    def __init__(self, api_key, model, api_base="http://localhost:8000/v1", headers=None):
+        super().__init__(api_key, model, api_base, headers)
+
+    def _auth_headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+_GEMINI_CLIENTS = {}
+_GEMINI_CLIENTS_LOCK = threading.Lock()
+# Cancel token of the Gemini call running on this thread, and the callbacks registered on it
+_gemini_call = threading.local()
+
+def _gemini_response_hook(response):
+    """
+    httpx response hook of the Gemini clients. It runs on the thread that sent
+    the request once the headers are in, so a cancel of that thread's call can
+    close the stream instead of waiting for the next chunk.
+    """
+    token = getattr(_gemini_call, "token", None)
+    if token is not None:
+        _gemini_call.removers.append(token.add_callback(lambda: _abort_httpx_response(response)))
+
+def _abort_httpx_response(response):
+    """Shuts down the socket behind a streaming httpx response so a blocked read returns at once."""
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
 
-    def generate_json(self, system, prompt):
-        return self._call(system, prompt, json_mode=True)
+def _gemini_client(api_key, model, api_base=None):
+    """One google-genai Client per (api_key, model, api_base), shared by all GoogleProvider instances."""
+    key = (api_key, model, api_base)
+    with _GEMINI_CLIENTS_LOCK:
+        client = _GEMINI_CLIENTS.get(key)
+        if client is None:
+            # Imported lazily: the Gemini SDK is slow to import and only needed for this provider
+            from google import genai
+            # A Client holds its own key and connection pool, so unlike genai.configure()
+            # it sets no process-global state and is safe to use from several threads
+            http_options = {"client_args": {"event_hooks": {"response": [_gemini_response_hook]}}}
+            if api_base:
+                http_options["base_url"] = api_base
+            client = genai.Client(api_key=api_key, http_options=http_options)
+            _GEMINI_CLIENTS[key] = client
+        return client
 
 class GoogleProvider(AIProvider):
-    def __init__(self, api_key, model):
-        super().__init__(api_key, model)
-        genai.configure(api_key=api_key)
+    def __init__(self, api_key, model, api_base=None, headers=None):
+        # The SDK uses its own endpoint unless api_base is set (e.g. a proxy); headers are not used
+        super().__init__(api_key, model, api_base.rstrip("/") if api_base else None)
+        from google.genai import types
+        self.types = types
+        self.client = _gemini_client(api_key, model, self.api_base)
 
-    def _call(self, system, prompt, json_mode=False):
-        model = genai.GenerativeModel(self.model)
-        full_prompt = f"{system}\n\n{prompt}"
-        config = {"response_mime_type": "application/json"} if json_mode else None
-        
-        response = model.generate_content(full_prompt, generation_config=config)
-        return json.loads(response.text) if json_mode else response.text
+    def _call(self, system, prompt, json_mode=False, cancel_token=None, timeout=None):
+        request_timeout = DEFAULT_REQUEST_TIMEOUT if timeout is None else timeout
+        # The system prompt goes in its own field rather than in front of the prompt,
+        # so the identical prefix of repeated calls can be served from Gemini's cache
+        config = self.types.GenerateContentConfig(
+            system_instruction=system,
+            response_mime_type="application/json" if json_mode else None,
+            http_options=self.types.HttpOptions(timeout=int(request_timeout * 1000)),
+        )
 
-    def generate_text(self, system, prompt):
-        return self._call(system, prompt, json_mode=False)
+        meta = {}
 
-    def generate_json(self, system, prompt):
-        return self._call(system, prompt, json_mode=True)
+        def run(token):
+            # Stream so a cancelled call stops consuming chunks right away; the
+            # response hook lets a cancel close the connection, like _stream_post
+            _gemini_call.token, _gemini_call.removers = token, []
+            try:
+                stream = self.client.models.generate_content_stream(model=self.model, contents=prompt, config=config)
+                parts = []
+                for chunk in stream:
+                    if token.cancelled:
+                        break
+                    if chunk.text:
+                        parts.append(chunk.text)
+                    # Counts are cumulative: the last chunk has the totals
+                    if getattr(chunk, "usage_metadata", None) is not None:
+                        meta["usage"] = chunk.usage_metadata
+                return "".join(parts)
+            finally:
+                for remove in _gemini_call.removers:
+                    remove()
+                _gemini_call.token, _gemini_call.removers = None, []
+
+        content = self._run_call(run, cancel_token, timeout)
+        if meta.get("usage") is not None:
+            report_usage(self.model, gemini_usage(meta["usage"]))
+        return parse_json(content) if json_mode else content
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=False, cancel_token=cancel_token, timeout=timeout)
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=True, cancel_token=cancel_token, timeout=timeout)
 
 class OllamaProvider(AIProvider):
-    def __init__(self, api_key, model, api_base="http://localhost:11434"):
-        super().__init__(api_key, model, api_base)
+    def __init__(self, api_key, model, api_base="http://localhost:11434", headers=None):
+        super().__init__(api_key, model, api_base.rstrip("/"), headers)
+        # How long Ollama keeps the model in memory after each request ("30m", seconds, -1 = forever)
+        self.keep_alive = DEFAULT_OLLAMA_KEEP_ALIVE
+        # Model options passed through as-is, e.g. {"num_ctx": 8192, "temperature": 0.2}
+        self.options = {}
+
+    def configure_runtime(self, keep_alive=None, options=None):
+        if keep_alive in (None, ""):
+            keep_alive = DEFAULT_OLLAMA_KEEP_ALIVE
+        elif isinstance(keep_alive, str) and keep_alive.lstrip("-").isdigit():
+            # Ollama reads a bare number as seconds, but only when it is sent as a number
+            keep_alive = int(keep_alive)
+        self.keep_alive = keep_alive
+        self.options = dict(options or {})
+
+    @staticmethod
+    def _extract(line, meta):
+        # Newline-delimited JSON objects, the last one has "done": true and the counters
+        chunk = json.loads(line)
+        if chunk.get("done"):
+            meta["usage"] = chunk
+            return chunk.get("response") or None
+        return chunk.get("response", "")
+
+    def _runtime_fields(self):
+        # Requests must all carry the same options: a different num_ctx makes Ollama reload the model
+        fields = {"keep_alive": self.keep_alive}
+        if self.options:
+            fields["options"] = self.options
+        return fields
 
-    def _call(self, system, prompt, json_mode=False):
+    def _call(self, system, prompt, json_mode=False, cancel_token=None, timeout=None):
         url = f"{self.api_base}/api/generate"
         data = {
             "model": self.model,
             "system": system,
             "prompt": prompt,
-            "stream": False
+            "stream": True,
+            **self._runtime_fields()
         }
         if json_mode:
             data["format"] = "json"
-            
-        response = requests.post(url, json=data)
+
+        meta = {}
+        content = self._run_call(
+            lambda token: self._stream_post(url, self._extract, token, timeout, meta, json=data),
+            cancel_token, timeout
+        )
+        if meta.get("usage"):
+            # The model runs locally, so its tokens cost nothing
+            report_usage(self.model, ollama_usage(meta["usage"]), free=True)
+        return parse_json(content) if json_mode else content
+
+    def warm_up(self, timeout=DEFAULT_OLLAMA_WARM_UP_TIMEOUT):
+        """
+        Loads the model into memory without generating anything (a request with
+        no prompt), so the first real generation does not pay the load time.
+        """
+        response = self.session.post(f"{self.api_base}/api/generate",
+                                     json={"model": self.model, **self._runtime_fields()},
+                                     timeout=(min(DEFAULT_CONNECT_TIMEOUT, timeout), timeout))
         response.raise_for_status()
-        
-        content = response.json()['response']
-        return json.loads(content) if json_mode else content
+        return response.json()
+
+    def list_models(self, timeout=DEFAULT_CONNECT_TIMEOUT):
+        response = self.session.get(f"{self.api_base}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        return sorted(model["name"] for model in response.json().get("models") or [] if model.get("name"))
+
+    def status(self, timeout=DEFAULT_CONNECT_TIMEOUT):
+        """Whether the server is reachable and the configured model is loaded (from /api/ps)."""
+        try:
+            response = self.session.get(f"{self.api_base}/api/ps", timeout=timeout)
+            response.raise_for_status()
+            models = response.json().get("models") or []
+        except (requests.RequestException, ValueError) as e:
+            return {"reachable": False, "loaded": False, "model": self.model, "error": str(e)}
+        names = {self.model, self.model if ":" in self.model else f"{self.model}:latest"}
+        loaded = next((m for m in models if m.get("name") in names or m.get("model") in names), None)
+        result = {"reachable": True, "loaded": loaded is not None, "model": self.model,
+                  "keep_alive": self.keep_alive, "resident": [m.get("name") for m in models]}
+        if loaded:
+            result["expires_at"] = loaded.get("expires_at")
+            result["size_vram"] = loaded.get("size_vram")
+        return result
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=False, cancel_token=cancel_token, timeout=timeout)
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call(system, prompt, json_mode=True, cancel_token=cancel_token, timeout=timeout)
+
+PROVIDER_CLASSES = {
+    "openai": OpenAIProvider,
+    "google": GoogleProvider,
+    "ollama": OllamaProvider,
+    "openai-compatible": OpenAICompatibleProvider,
+}
+
+# Providers that run without an API key
+KEYLESS_PROVIDERS = ("ollama", "openai-compatible")
+
+def _key_hash(api_key):
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+def _headers_hash(headers):
+    # Headers may carry credentials too, so only their hash is kept in the key
+    return _key_hash(json.dumps(headers, sort_keys=True)) if headers else None
+
+class ProviderRegistry:
+    """
+    Live provider instances keyed by (provider, key hash, model, base URL,
+    headers hash, runtime options), so re-applying unchanged settings, or
+    switching back to an earlier provider, reuses the existing instance and its
+    warm connections. Least recently used entries are dropped beyond `max_size`.
+    """
+
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self.providers = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, provider_name, api_key, model, api_base=None, headers=None, runtime=None):
+        """`runtime` is passed to configure_runtime() (e.g. Ollama's keep_alive and options) when creating."""
+        cls = PROVIDER_CLASSES.get(provider_name, OpenAIProvider) # Fallback
+        # Runtime options are part of the key: instances are shared, so they must never be changed in place
+        key = (cls.__name__, _key_hash(api_key), model, api_base or None, _headers_hash(headers),
+               json.dumps(runtime, sort_keys=True, default=str) if runtime else None)
+        with self._lock:
+            provider = self.providers.get(key)
+            if provider is not None:
+                self.providers.move_to_end(key)
+                self.hits += 1
+                return provider
+            self.misses += 1
+            kwargs = {"api_base": api_base} if api_base else {}
+            provider = cls(api_key, model, headers=headers, **kwargs)
+            if runtime:
+                provider.configure_runtime(**runtime)
+            self.providers[key] = provider
+            while len(self.providers) > self.max_size:
+                # Not closed: another engine may still be using it
+                self.providers.popitem(last=False)
+            return provider
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self.providers), "hits": self.hits, "misses": self.misses}
 
-    def generate_text(self, system, prompt):
-        return self._call(system, prompt, json_mode=False)
+    def clear(self):
+        with self._lock:
+            self.providers.clear()
 
-    def generate_json(self, system, prompt):
-        return self._call(system, prompt, json_mode=True)
+# Shared by every AIEngine in the process (GUI, CLI, service workers)
+default_registry = ProviderRegistry()
@@ -0,0 +1,259 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from engine.cancel import CancelledError
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ("record", "replay")
+REPLAY_LATENCIES = ("recorded", "zero")
+
+# Masked wherever a cassette stores text. Lookups use a hash of the
+# unredacted request, so redaction never affects which response is replayed.
+_REDACTIONS = [
+    (re.compile(r"\b(?:sk|pk|rk)-[A-Za-z0-9_-]{16,}"), "[REDACTED_KEY]"),
+    (re.compile(r"\bAIza[0-9A-Za-z_-]{30,}"), "[REDACTED_KEY]"),
+    (re.compile(r"(?i)(?<=Bearer )[A-Za-z0-9._~+/=-]{8,}"), "[REDACTED_KEY]"),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "[REDACTED_EMAIL]"),
+    (re.compile(r"(?<![\w-])\+?\d[\d ().-]{7,}\d(?![\w-])"), "[REDACTED_PHONE]"),
+]
+# Fewer digits than this is a date range or an ID rather than a phone number
+_MIN_PHONE_DIGITS = 10
+# A response value copied from the prompt is stored as a reference to its
+# position there and restored from the live prompt on replay
+_PROMPT_REF_RE = re.compile(r"\[\[prompt:(\d+):(\d+)\]\]")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _sensitive_spans(text, extra_terms=()):
+    """Non-overlapping (start, end, label) of the secrets and personal data in `text`."""
+    spans = []
+    for term in extra_terms:
+        if term:
+            spans += [(m.start(), m.end(), "[REDACTED]") for m in re.finditer(re.escape(term), text)]
+    for pattern, label in _REDACTIONS:
+        for match in pattern.finditer(text):
+            if label == "[REDACTED_PHONE]" and sum(c.isdigit() for c in match.group()) < _MIN_PHONE_DIGITS:
+                continue
+            spans.append((match.start(), match.end(), label))
+    kept, end = [], -1
+    for span in sorted(spans, key=lambda span: (span[0], -span[1])):
+        if span[0] >= end:
+            kept.append(span)
+            end = span[1]
+    return kept
+
+
+def redact(text, extra_terms=()):
+    """`text` with API keys, emails, phone numbers and `extra_terms` (e.g. the user's name) masked."""
+    if not isinstance(text, str):
+        return text
+    for start, end, label in reversed(_sensitive_spans(text, extra_terms)):
+        text = text[:start] + label + text[end:]
+    return text
+
+
+def _mask_response(value, prompt, extra_terms=()):
+    """
+    Redacts a response. Sensitive values that also occur in the prompt (the
+    user's email, phone, name, ...) become references to where they occur
+    there, so replay restores them exactly; anything else is masked.
+    """
+    if isinstance(value, dict):
+        return {key: _mask_response(item, prompt, extra_terms) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_mask_response(item, prompt, extra_terms) for item in value]
+    if not isinstance(value, str):
+        return value
+    found = {}
+    for start, end, _ in _sensitive_spans(prompt, extra_terms):
+        found.setdefault(prompt[start:end], f"[[prompt:{start}:{end}]]")
+    for secret in sorted(found, key=len, reverse=True):
+        value = value.replace(secret, found[secret])
+    return redact(value, extra_terms)
+
+
+def _unmask_response(value, prompt):
+    if isinstance(value, dict):
+        return {key: _unmask_response(item, prompt) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unmask_response(item, prompt) for item in value]
+    if not isinstance(value, str):
+        return value
+    return _PROMPT_REF_RE.sub(lambda m: prompt[int(m.group(1)):int(m.group(2))], value)
+
+
+def request_key(provider, model, method, system, prompt):
+    """Identity of a provider request: the same call always maps to the same recording."""
+    payload = json.dumps([provider, model, method, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded provider calls in a JSON Lines file, one call per line. Recording
+    appends and flushes each call, so an interrupted run keeps what it has.
+    Requests made several times are replayed in recorded order, the last
+    recording repeating once they run out.
+    """
+
+    def __init__(self, path, redact_terms=()):
+        self.path = path
+        self.redact_terms = [term for term in redact_terms if term]
+        self.entries = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable line {number} of cassette {self.path}")
+                    continue
+                self.entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self.entries.values())
+
+    def record(self, key, provider, model, method, system, prompt, seconds, response=None, error=None):
+        entry = {
+            "key": key,
+            "provider": provider,
+            "model": model,
+            "method": method,
+            "system": redact(system, self.redact_terms),
+            "prompt": redact(prompt, self.redact_terms),
+            "seconds": round(seconds, 4),
+        }
+        if error is not None:
+            entry["error"] = redact(str(error), self.redact_terms)
+        else:
+            entry["response"] = _mask_response(response, prompt, self.redact_terms)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries.setdefault(key, []).append(entry)
+            self.recorded += 1
+
+    def lookup(self, key):
+        """The next recorded call for `key`; raises CassetteMiss when there is none."""
+        with self._lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for this request in {self.path}")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            self.replayed += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "entries": sum(len(e) for e in self.entries.values()),
+                    "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+
+_CASSETTES = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def open_cassette(path, redact_terms=()):
+    """One Cassette per file in the process, so service workers and engines share it."""
+    path = os.path.abspath(path)
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get(path)
+        if cassette is None:
+            cassette = Cassette(path, redact_terms)
+            _CASSETTES[path] = cassette
+        elif redact_terms:
+            cassette.redact_terms = [term for term in redact_terms if term]
+        return cassette
+
+
+class ReplayProvider:
+    """
+    Wraps a provider to record its calls to a cassette ("record") or to answer
+    from the cassette without touching the network ("replay"). Replayed calls
+    take as long as the recording ("recorded") or return at once ("zero").
+    Anything else (status, list_models, configure_runtime, ...) goes to the
+    wrapped provider.
+    """
+
+    def __init__(self, provider, cassette, mode, latency="recorded"):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if latency not in REPLAY_LATENCIES:
+            raise ValueError(f"Unknown replay latency: {latency}")
+        self.provider = provider
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.provider, name)
+        if name == "warm_up" and self.mode == "replay":
+            # Nothing to load when answers come from the cassette
+            return lambda *args, **kwargs: None
+        return attr
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call("generate_text", system, prompt, cancel_token, timeout)
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        return self._call("generate_json", system, prompt, cancel_token, timeout)
+
+    def _call(self, method, system, prompt, cancel_token, timeout):
+        provider_name = type(self.provider).__name__
+        key = request_key(provider_name, self.provider.model, method, system, prompt)
+        if self.mode == "replay":
+            return self._replay(self.cassette.lookup(key), prompt, cancel_token, timeout)
+
+        start = time.monotonic()
+        try:
+            response = getattr(self.provider, method)(system, prompt, cancel_token=cancel_token, timeout=timeout)
+        except (CancelledError, TimeoutError):
+            # Not properties of the response: replaying them would make runs flaky
+            raise
+        except Exception as e:
+            self.cassette.record(key, provider_name, self.provider.model, method, system, prompt,
+                                 time.monotonic() - start, error=e)
+            raise
+        self.cassette.record(key, provider_name, self.provider.model, method, system, prompt,
+                             time.monotonic() - start, response=response)
+        return response
+
+    def _replay(self, entry, prompt, cancel_token, timeout):
+        if self.latency == "recorded":
+            seconds = entry.get("seconds", 0)
+            wait = seconds if timeout is None else min(seconds, timeout)
+            if cancel_token is not None and cancel_token.wait(wait):
+                raise CancelledError("Cancelled by user")
+            if cancel_token is None:
+                time.sleep(wait)
+            if timeout is not None and seconds > timeout:
+                raise TimeoutError(f"Recorded call took {seconds:.0f}s, longer than the {timeout:.0f}s allowed")
+        elif cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        # A new object each time: callers repair and edit the returned JSON in place
+        return _unmask_response(entry.get("response"), prompt)
@@ -0,0 +1,164 @@
+import copy
+import math
+import hashlib
+import logging
+import threading
+from collections import Counter
+from engine.text import tokenize, flatten_text
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (the usual Okapi defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+class ProfileItem:
+    """One retrievable piece of the profile: an experience bullet or a project."""
+
+    def __init__(self, key, kind, text, role=None):
+        self.key = key
+        self.kind = kind
+        self.text = text
+        self.role = role
+        self.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def profile_items(user_data):
+    """
+    The bullets of every experience entry (keyed "experience[i].description[j]")
+    and the entries of `projects` (keyed "projects[i]"). Roles whose description
+    is a single string are not split up.
+    """
+    items = []
+    for i, role in enumerate(user_data.get("experience") or []):
+        if not isinstance(role, dict) or not isinstance(role.get("description"), list):
+            continue
+        for j, bullet in enumerate(role["description"]):
+            text = flatten_text(bullet)
+            if text.strip():
+                items.append(ProfileItem(f"experience[{i}].description[{j}]", "bullet", text, role=i))
+    projects = user_data.get("projects")
+    if isinstance(projects, list):
+        for i, project in enumerate(projects):
+            text = flatten_text(project)
+            if text.strip():
+                items.append(ProfileItem(f"projects[{i}]", "project", text))
+    return items
+
+
+class RetrievalReport:
+    """What select() kept from the profile for one JD."""
+
+    def __init__(self, items_total, items_kept, dropped, scores):
+        self.items_total = items_total
+        self.items_kept = items_kept
+        self.dropped = dropped
+        self.scores = scores
+
+    def to_dict(self):
+        return {
+            "items_total": self.items_total,
+            "items_kept": self.items_kept,
+            "dropped": list(self.dropped),
+        }
+
+
+class ProfileIndex:
+    """
+    BM25 index over the bullets and projects of a profile. update() tokenizes
+    only items whose text is new, so editing, adding or reordering a few
+    bullets does not re-process the whole profile.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.items = {}
+        self.terms = {}
+        self.df = Counter()
+        self.total_length = 0
+        self.last_update = {"tokenized": 0, "reused": 0}
+        self._lock = threading.Lock()
+
+    def update(self, user_data):
+        """Syncs the index with `user_data`; returns the profile's items in order."""
+        items = profile_items(user_data if isinstance(user_data, dict) else {})
+        with self._lock:
+            self._update(items)
+        return items
+
+    def scores(self, job_description):
+        """BM25 score of every indexed item against the JD's terms."""
+        query = set(tokenize(job_description))
+        with self._lock:
+            return self._scores(query)
+
+    def _update(self, items):
+        known = {item.digest: self.terms[key] for key, item in self.items.items()}
+        self.items, self.terms, self.df, self.total_length = {}, {}, Counter(), 0
+        tokenized = 0
+        for item in items:
+            terms = known.get(item.digest)
+            if terms is None:
+                terms = Counter(tokenize(item.text))
+                tokenized += 1
+            self.items[item.key] = item
+            self.terms[item.key] = terms
+            self.df.update(terms.keys())
+            self.total_length += sum(terms.values())
+        self.last_update = {"tokenized": tokenized, "reused": len(items) - tokenized}
+
+    def _scores(self, query):
+        n = len(self.items)
+        if not n or not query:
+            return {key: 0.0 for key in self.items}
+        avg_length = self.total_length / n or 1
+        idf = {term: math.log(1 + (n - self.df[term] + 0.5) / (self.df[term] + 0.5))
+               for term in query if self.df[term] > 0}
+        results = {}
+        for key, terms in self.terms.items():
+            length = sum(terms.values())
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            results[key] = sum(weight * terms[term] * (self.k1 + 1) / (terms[term] + norm)
+                               for term, weight in idf.items() if term in terms)
+        return results
+
+    def select(self, job_description, user_data, top_k):
+        """
+        Copy of `user_data` holding only the `top_k` bullets and projects most
+        relevant to the JD, in their original order. Every role keeps its
+        header and at least its best bullet, so no employment history is lost.
+        Returns (user_data, RetrievalReport).
+        """
+        items = profile_items(user_data if isinstance(user_data, dict) else {})
+        selecting = bool(top_k) and len(items) > top_k
+        query = set(tokenize(job_description)) if selecting else set()
+        # Indexed and scored under one lock: another select() re-indexing a different
+        # profile in between would leave scores without this profile's items
+        with self._lock:
+            self._update(items)
+            scores = self._scores(query) if selecting else None
+        if not selecting:
+            return user_data, RetrievalReport(len(items), len(items), [], {})
+
+        # Ties keep profile order, so recent roles (listed first) win
+        ranked = sorted(items, key=lambda item: -scores[item.key])
+        keep = {item.key for item in ranked[:top_k]}
+        best_per_role = {}
+        for item in ranked:
+            if item.kind == "bullet":
+                best_per_role.setdefault(item.role, item.key)
+        keep.update(best_per_role.values())
+
+        data = copy.deepcopy(user_data)
+        for i, role in enumerate(data.get("experience") or []):
+            if isinstance(role, dict) and isinstance(role.get("description"), list):
+                role["description"] = [bullet for j, bullet in enumerate(role["description"])
+                                       if f"experience[{i}].description[{j}]" in keep
+                                       or not flatten_text(bullet).strip()]
+        if isinstance(data.get("projects"), list):
+            data["projects"] = [project for i, project in enumerate(data["projects"])
+                                if f"projects[{i}]" in keep or not flatten_text(project).strip()]
+        dropped = [item.key for item in items if item.key not in keep]
+        return data, RetrievalReport(len(items), len(items) - len(dropped), dropped, scores)
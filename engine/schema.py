@@ -0,0 +1,298 @@
+import copy
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# JSON Schema of the resume content described in DEFAULT_RESUME_PROMPT and used by the templates
+RESUME_SCHEMA = {
+    "type": "object",
+    "required": ["name", "summary", "skills", "experience", "education"],
+    "properties": {
+        "name": {"type": "string"},
+        "title": {"type": "string"},
+        "email": {"type": "string"},
+        "phone": {"type": "string"},
+        "contact_info": {"type": "string"},
+        "summary": {"type": "string", "minLength": 1},
+        "skills": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+        "experience": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["role", "company", "dates", "description"],
+                "properties": {
+                    "role": {"type": "string"},
+                    "company": {"type": "string"},
+                    "dates": {"type": "string"},
+                    "description": {"type": "array", "items": {"type": "string"}},
+                },
+            },
+        },
+        "education": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["degree", "institution", "dates"],
+                "properties": {
+                    "degree": {"type": "string"},
+                    "institution": {"type": "string"},
+                    "dates": {"type": "string"},
+                    "year": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+# Top-level fields only the model can fill in; when they are empty after repair they are re-asked
+CONTENT_FIELDS = ("summary", "skills", "experience")
+
+_TYPES = {"string": str, "array": list, "object": dict}
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+class SchemaIssue:
+    """One schema violation, located by a path such as experience[0].description."""
+
+    def __init__(self, path, message):
+        self.path = path
+        self.message = message
+
+    @property
+    def field(self):
+        return re.split(r"[.\[]", self.path, maxsplit=1)[0]
+
+    def __repr__(self):
+        return f"{self.path}: {self.message}"
+
+
+def validate(data, schema=RESUME_SCHEMA, path=""):
+    """Returns the list of SchemaIssues for `data` (empty when valid)."""
+    expected = schema.get("type")
+    if expected and not isinstance(data, _TYPES[expected]):
+        return [SchemaIssue(path or "$", f"expected {expected}, got {type(data).__name__}")]
+
+    issues = []
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                issues.append(SchemaIssue(_join(path, key), "missing"))
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in data:
+                issues += validate(data[key], sub_schema, _join(path, key))
+    elif expected == "array":
+        if len(data) < schema.get("minItems", 0):
+            issues.append(SchemaIssue(path, "empty"))
+        for index, item in enumerate(data):
+            issues += validate(item, schema.get("items", {}), f"{path}[{index}]")
+    elif expected == "string":
+        if len(data.strip()) < schema.get("minLength", 0):
+            issues.append(SchemaIssue(path, "empty"))
+    return issues
+
+
+def _join(path, key):
+    return f"{path}.{key}" if path else key
+
+
+def complete_json(text):
+    """
+    Closes a JSON document that was cut off mid-stream (e.g. at the output
+    token limit): drops the unfinished trailing member or item, then closes
+    the arrays and objects that are still open.
+    """
+    stack = []
+    in_string = escaped = after_colon = False
+    # Where the document can be cut cleanly, and what is open at that point
+    safe_end, safe_stack = 0, []
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                # A string is a complete value inside an array or after "key":
+                if stack and (stack[-1] == "[" or after_colon):
+                    safe_end, safe_stack = index + 1, list(stack)
+            continue
+        if char == '"':
+            in_string = True
+        elif char == ":":
+            after_colon = True
+        elif char in "{[":
+            stack.append(char)
+            after_colon = False
+            safe_end, safe_stack = index + 1, list(stack)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            safe_end, safe_stack = index + 1, list(stack)
+        elif char == ",":
+            after_colon = False
+            safe_end, safe_stack = index, list(stack)
+    if not stack and not in_string:
+        return text
+    closers = {"{": "}", "[": "]"}
+    return text[:safe_end] + "".join(closers[c] for c in reversed(safe_stack))
+
+
+def parse_json(text):
+    """
+    Parses model output as JSON, tolerating markdown code fences, text around
+    the JSON object and output that was truncated before the closing brackets.
+    """
+    if isinstance(text, (dict, list)):
+        return text
+    cleaned = text.strip()
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", cleaned, re.DOTALL)
+    if fence:
+        cleaned = fence.group(1)
+    try:
+        return json.loads(cleaned)
+    except ValueError as original:
+        start = cleaned.find("{")
+        if start < 0:
+            raise
+        candidate = cleaned[start:]
+        end = candidate.rfind("}")
+        for attempt in (candidate[:end + 1] if end >= 0 else None, complete_json(candidate)):
+            if not attempt:
+                continue
+            try:
+                result = json.loads(attempt)
+            except ValueError:
+                continue
+            logger.warning("Recovered malformed JSON from the model output")
+            return result
+        raise original
+
+
+def _as_text(value, separator=", "):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return separator.join(_as_text(item) for item in value if _as_text(item))
+    if isinstance(value, dict):
+        return separator.join(_as_text(item) for item in value.values() if _as_text(item))
+    return str(value)
+
+
+def _as_list(value, split_commas=False):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [text for text in (_as_text(item) for item in value) if text]
+    if isinstance(value, dict):
+        return [text for text in (_as_text(item) for item in value.values()) if text]
+    text = _as_text(value)
+    parts = [_BULLET_RE.sub("", line).strip() for line in text.splitlines()]
+    if split_commas and len([p for p in parts if p]) <= 1:
+        parts = re.split(r"\s*[,;]\s*", text)
+    return [part for part in parts if part]
+
+
+def _as_records(value):
+    if isinstance(value, dict):
+        return [value]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    return []
+
+
+class RepairReport:
+    """What repair_resume changed and which fields still need the model."""
+
+    def __init__(self):
+        self.fixes = []
+        self.missing = []
+
+    def to_dict(self):
+        return {"fixes": list(self.fixes), "missing": list(self.missing)}
+
+
+def repair_resume(content, user_data=None):
+    """
+    Coerces model output into RESUME_SCHEMA locally: wrong types are converted
+    (a comma string becomes a skills list, a bare object becomes a one-item
+    list, numbers become strings), missing fields get defaults, and the name
+    falls back to the user's data. Returns (content, RepairReport); the report
+    lists the CONTENT_FIELDS that are still empty and must come from the model.
+    """
+    report = RepairReport()
+    user_data = user_data if isinstance(user_data, dict) else {}
+    if isinstance(content, list) and len(content) == 1 and isinstance(content[0], dict):
+        content = content[0]
+        report.fixes.append("$: unwrapped list")
+    if not isinstance(content, dict):
+        report.fixes.append(f"$: discarded {type(content).__name__}")
+        content = {}
+    data = copy.deepcopy(content)
+
+    def fix(path, value, coerced):
+        if coerced != value:
+            report.fixes.append(f"{path}: coerced {type(value).__name__}" if value is not None else f"{path}: defaulted")
+        return coerced
+
+    for key in ("name", "title", "email", "phone", "contact_info", "summary"):
+        if key in data or key in ("name", "summary"):
+            data[key] = fix(key, data.get(key), _as_text(data.get(key), " " if key == "summary" else ", "))
+    if not data["name"] and user_data.get("name"):
+        data["name"] = _as_text(user_data["name"])
+        report.fixes.append("name: taken from user data")
+
+    data["skills"] = fix("skills", data.get("skills"), _as_list(data.get("skills"), split_commas=True))
+
+    experience = []
+    for index, job in enumerate(_as_records(data.get("experience"))):
+        path = f"experience[{index}]"
+        job = dict(job)
+        for key in ("role", "company", "dates"):
+            job[key] = fix(f"{path}.{key}", job.get(key), _as_text(job.get(key)))
+        job["description"] = fix(f"{path}.description", job.get("description"), _as_list(job.get("description")))
+        experience.append(job)
+    data["experience"] = fix("experience", data.get("experience"), experience)
+
+    education = []
+    for index, edu in enumerate(_as_records(data.get("education"))):
+        path = f"education[{index}]"
+        edu = dict(edu)
+        for key in ("degree", "institution"):
+            edu[key] = fix(f"{path}.{key}", edu.get(key), _as_text(edu.get(key)))
+        if edu.get("year") is not None:
+            edu["year"] = _as_text(edu["year"])
+        if not _as_text(edu.get("dates")) and edu.get("year"):
+            # The prompt asks for "year" but the templates print "dates"
+            edu["dates"] = edu["year"]
+        else:
+            edu["dates"] = fix(f"{path}.dates", edu.get("dates"), _as_text(edu.get("dates")))
+        education.append(edu)
+    data["education"] = fix("education", data.get("education"), education)
+
+    for issue in validate(data):
+        if issue.field in CONTENT_FIELDS and issue.field not in report.missing:
+            # An empty experience list is fine when the user has no experience either
+            if issue.field == "experience" and not user_data.get("experience"):
+                continue
+            report.missing.append(issue.field)
+    if not data["experience"] and user_data.get("experience") and "experience" not in report.missing:
+        report.missing.append("experience")
+    return data, report
+
+
+def reask_prompt(fields, content):
+    """Prompt asking the model for just `fields`, given the rest of the resume it already produced."""
+    schema = {key: RESUME_SCHEMA["properties"][key] for key in fields}
+    partial = {key: value for key, value in content.items() if key not in fields}
+    return (
+        f"Your previous answer was missing or had invalid values for: {', '.join(fields)}.\n"
+        f"Return a JSON object with ONLY these keys, matching this JSON schema:\n{json.dumps(schema)}\n\n"
+        f"The rest of the resume, for consistency:\n{json.dumps(partial)}"
+    )
@@ -0,0 +1,194 @@
+import re
+from collections import Counter
+from itertools import repeat
+import numpy as np
+import scipy.sparse as sp
+from engine.text import TOKEN_PATTERN, STOPWORDS, flatten_text, unescape_latex, latex_to_text, is_latex
+
+# Common hard skills recognized in job descriptions, on top of the user's own skills list
+SKILL_LEXICON = frozenset("""
+python java javascript typescript go golang rust c c++ c# ruby php scala kotlin swift r matlab sql nosql
+bash powershell html css react angular vue node.js django flask fastapi spring .net graphql rest grpc
+aws azure gcp docker kubernetes terraform ansible jenkins ci/cd git linux unix
+postgresql mysql mongodb redis elasticsearch kafka rabbitmq spark hadoop airflow snowflake dbt bigquery
+pandas numpy pytorch tensorflow scikit-learn keras llm nlp etl tableau excel jira agile scrum
+microservices devops mlops security testing selenium
+""".split())
+
+# Weight of keyword coverage vs. TF-IDF cosine similarity in the overall score
+COVERAGE_WEIGHT = 0.7
+DEFAULT_TOP_K = 30
+
+# Terms plus the punctuation that ends a clause, so bigrams can stop there
+_TERM_RE = re.compile(TOKEN_PATTERN + r"|[;:!?()\n\u2022|]|[.,](?=\s|$)")
+_BOUNDARY = "|"
+
+
+def terms(text):
+    """
+    Unigrams plus adjacent-word bigrams ("machine learning") of `text`. Bigrams
+    never span a sentence or list boundary.
+    """
+    sequence = [term if len(term) > 1 or term.isalnum() else _BOUNDARY
+                for term in _TERM_RE.findall((text or "").lower())
+                if term not in STOPWORDS and not term.isdigit()]
+    unigrams = [term for term in sequence if term != _BOUNDARY]
+    bigrams = [f"{a} {b}" for a, b in zip(sequence, sequence[1:]) if a != _BOUNDARY and b != _BOUNDARY]
+    return unigrams + bigrams
+
+
+def resume_text(content):
+    """
+    Plain text of generated resume JSON or of rendered/raw text. Generated
+    content is LaTeX-escaped ("C\\#"), and .tex sources lose their commands,
+    so terms compare equal to the JD's.
+    """
+    if not isinstance(content, str):
+        return unescape_latex(flatten_text(content))
+    return latex_to_text(content) if is_latex(content) else unescape_latex(content)
+
+
+class MatchResult:
+    """How well one resume covers one JD's keywords."""
+
+    def __init__(self, score, similarity, coverage, matched, missing, skills_matched, skills_missing):
+        self.score = score
+        self.similarity = similarity
+        self.coverage = coverage
+        self.matched = matched
+        self.missing = missing
+        self.skills_matched = skills_matched
+        self.skills_missing = skills_missing
+
+    def to_dict(self):
+        return {
+            "score": self.score,
+            "similarity": self.similarity,
+            "coverage": self.coverage,
+            "matched": self.matched,
+            "missing": self.missing,
+            "skills_matched": self.skills_matched,
+            "skills_missing": self.skills_missing,
+        }
+
+
+class KeywordScorer:
+    """
+    TF-IDF keyword scoring of resumes against job descriptions with sparse
+    matrices. IDF comes from the JDs passed to fit(), so terms every posting
+    shares ("communication") weigh less than the ones that set a JD apart.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, skills=()):
+        self.top_k = top_k
+        self.skills = SKILL_LEXICON.union(str(term).lower() for term in skills or ())
+        self.vocabulary = {}
+        self.idf = np.ones(0)
+
+    def fit(self, job_descriptions):
+        return self._fit_terms([terms(jd) for jd in job_descriptions])
+
+    def _fit_terms(self, doc_terms):
+        vocabulary = {}
+        df = Counter()
+        for doc in doc_terms:
+            unique = set(doc)
+            df.update(unique)
+            for term in unique:
+                vocabulary.setdefault(term, len(vocabulary))
+        n = len(doc_terms)
+        self.vocabulary = vocabulary
+        df_array = np.array([df[term] for term in vocabulary], dtype=float)
+        boost = np.array([2.0 if term in self.skills else 1.0 for term in vocabulary])
+        self.idf = (np.log((1 + n) / (1 + df_array)) + 1) * boost
+        return self
+
+    def _counts(self, doc_terms):
+        """Sparse term-count matrix (documents x vocabulary); unknown terms are ignored."""
+        lookup = self.vocabulary.get
+        ids = [np.fromiter(map(lookup, doc, repeat(-1)), dtype=np.int64, count=len(doc)) for doc in doc_terms]
+        rows = np.repeat(np.arange(len(ids)), [len(doc) for doc in ids])
+        cols = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        known = cols >= 0
+        matrix = sp.csr_matrix((np.ones(known.sum()), (rows[known], cols[known])),
+                               shape=(len(doc_terms), len(self.vocabulary)))
+        matrix.sum_duplicates()
+        return matrix
+
+    def _tfidf(self, counts):
+        """L2-normalized sublinear TF-IDF vectors from a count matrix."""
+        matrix = counts.copy()
+        matrix.data = 1 + np.log(matrix.data)
+        matrix = matrix.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sp.diags(1 / norms) @ matrix
+
+    def transform(self, texts):
+        """L2-normalized sublinear TF-IDF vectors as a CSR matrix."""
+        return self._tfidf(self._counts([terms(text) for text in texts]))
+
+    def _keyword_mask(self, jd_vectors):
+        """Binary matrix with each JD's top_k heaviest terms."""
+        jd_vectors = jd_vectors.tocsr()
+        rows, cols = [], []
+        for row in range(jd_vectors.shape[0]):
+            start, end = jd_vectors.indptr[row], jd_vectors.indptr[row + 1]
+            order = np.argsort(-jd_vectors.data[start:end], kind="stable")[:self.top_k]
+            cols.extend(jd_vectors.indices[start:end][order])
+            rows.extend([row] * len(order))
+        return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=jd_vectors.shape)
+
+    def score_many(self, resumes, job_descriptions):
+        """
+        Scores resumes[i] against job_descriptions[i] for all i at once.
+        Returns (scores 0-100, cosine similarities, keyword coverages) as arrays.
+        """
+        jd_terms = [terms(jd) for jd in job_descriptions]
+        resume_terms = [terms(resume_text(resume)) for resume in resumes]
+        if not self.vocabulary:
+            self._fit_terms(jd_terms)
+        jd_vectors = self._tfidf(self._counts(jd_terms))
+        resume_counts = self._counts(resume_terms)
+        resume_vectors = self._tfidf(resume_counts)
+        similarity = np.asarray(jd_vectors.multiply(resume_vectors).sum(axis=1)).ravel()
+
+        # Coverage: share of each JD's keyword weight that appears in its resume
+        weights = self._keyword_mask(jd_vectors).multiply(jd_vectors)
+        present = (resume_counts > 0).astype(float)
+        total = np.asarray(weights.sum(axis=1)).ravel()
+        covered = np.asarray(weights.multiply(present).sum(axis=1)).ravel()
+        coverage = np.divide(covered, total, out=np.zeros_like(covered), where=total > 0)
+
+        scores = 100 * (COVERAGE_WEIGHT * coverage + (1 - COVERAGE_WEIGHT) * similarity)
+        return np.round(scores, 1), similarity, coverage
+
+    def keywords(self, job_description):
+        """The JD's top_k terms by TF-IDF weight, heaviest first."""
+        vector = self.transform([job_description]).tocsr()
+        order = np.argsort(-vector.data, kind="stable")[:self.top_k]
+        inverse = {col: term for term, col in self.vocabulary.items()}
+        return [inverse[col] for col in vector.indices[order]]
+
+    def match(self, resume, job_description):
+        """Score plus the matched and missing keywords and skills for one pair."""
+        if not self.vocabulary:
+            self.fit([job_description])
+        scores, similarity, coverage = self.score_many([resume], [job_description])
+        present = set(terms(resume_text(resume)))
+        keywords = self.keywords(job_description)
+        jd_skills = sorted({term for term in terms(job_description) if term in self.skills})
+        return MatchResult(
+            score=float(scores[0]),
+            similarity=round(float(similarity[0]), 3),
+            coverage=round(float(coverage[0]), 3),
+            matched=[term for term in keywords if term in present],
+            missing=[term for term in keywords if term not in present],
+            skills_matched=[skill for skill in jd_skills if skill in present],
+            skills_missing=[skill for skill in jd_skills if skill not in present],
+        )
+
+
+def score_resume(resume, job_description, skills=()):
+    """Convenience wrapper: MatchResult for one generated resume (JSON or text) and one JD."""
+    return KeywordScorer(skills=skills).match(resume, job_description)
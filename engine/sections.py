@@ -0,0 +1,171 @@
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from engine.text import tokenize, flatten_text, escape_latex
+
+logger = logging.getLogger(__name__)
+
+# Contact fields copied from the user's data as-is; the model never rewrites them
+CONTACT_FIELDS = ("name", "title", "email", "phone", "contact_info")
+
+# The summary is written around the JD's most frequent terms
+SUMMARY_TERMS = 25
+
+
+class Section:
+    """
+    One independently generated part of the resume. `inputs` is the slice of
+    user data the section depends on; `fallback` is used if generation fails.
+    """
+
+    def __init__(self, key, kind, inputs, fallback, index=None):
+        self.key = key
+        self.kind = kind
+        self.inputs = inputs
+        self.fallback = fallback
+        self.index = index
+
+    def prompt(self, job_description):
+        if self.kind == "summary":
+            task = ('Write a 3-5 sentence professional summary optimized for the JD keywords.\n'
+                    'Return JSON: {"summary": "..."}')
+        elif self.kind == "skills":
+            task = ('List the user\'s skills most relevant to the JD, most relevant first. '
+                    'Only include skills supported by the user\'s data.\n'
+                    'Return JSON: {"skills": ["Skill 1", "Skill 2"]}')
+        else:
+            task = ('Rewrite this ONE job entry\'s bullets with action verbs and JD keywords. '
+                    'Keep role, company and dates unchanged.\n'
+                    'Return JSON: {"role": "...", "company": "...", "dates": "...", '
+                    '"description": ["Bullet 1", "Bullet 2"]}')
+        return f"""
+        JOB DESCRIPTION:
+        {job_description}
+
+        USER DATA FOR THIS SECTION:
+        {json.dumps(self.inputs)}
+
+        TASK:
+        {task}
+        """
+
+    def relevant_terms(self, jd_terms):
+        """
+        The JD features this section depends on: the JD's top terms for the
+        summary, otherwise the JD terms that also occur in the section's data.
+        """
+        if self.kind == "summary":
+            ranked = sorted(jd_terms.items(), key=lambda item: (-item[1], item[0]))
+            return sorted(term for term, _ in ranked[:SUMMARY_TERMS])
+        vocabulary = set(tokenize(flatten_text(self.inputs)))
+        return sorted(vocabulary.intersection(jd_terms))
+
+    def signature(self, jd_terms, context=""):
+        """
+        Relevance signature: changes only when the section's own data, the JD
+        features it depends on, or `context` (prompt/model) change.
+        """
+        payload = json.dumps([self.kind, self.inputs, self.relevant_terms(jd_terms), context], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def extract(self, result):
+        """The section's value from the model's JSON answer (None when unusable)."""
+        if not isinstance(result, dict):
+            return None
+        if self.kind in ("summary", "skills"):
+            return result.get(self.kind) or None
+        entry = dict(self.inputs)
+        if result.get("description"):
+            entry["description"] = result["description"]
+        return entry
+
+
+def _role_line(entry):
+    return " at ".join(str(part) for part in (entry.get("role"), entry.get("company")) if part)
+
+
+def plan_sections(user_data):
+    """Splits resume generation into summary, skills and one section per experience entry."""
+    experience = [entry for entry in (user_data.get("experience") or []) if isinstance(entry, dict)]
+    profile = {key: user_data[key] for key in ("title",) if user_data.get(key)}
+    sections = [
+        Section("summary", "summary",
+                {**profile, "summary": user_data.get("summary", ""), "skills": user_data.get("skills", []),
+                 "roles": [_role_line(entry) for entry in experience]},
+                user_data.get("summary", "")),
+        Section("skills", "skills",
+                {"skills": user_data.get("skills", []), "roles": [_role_line(entry) for entry in experience]},
+                user_data.get("skills", [])),
+    ]
+    for index, entry in enumerate(experience):
+        sections.append(Section(f"experience[{index}]", "experience", entry, entry, index))
+    return sections
+
+
+def _escaped(value):
+    if isinstance(value, str):
+        return escape_latex(value)
+    if isinstance(value, dict):
+        return {key: _escaped(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_escaped(item) for item in value]
+    return value
+
+
+def merge_sections(user_data, sections, values):
+    """
+    Assembles section results into the structure the templates expect.
+    `values` maps section keys to generated values (None -> the section's fallback).
+    LaTeX special characters that are not escaped yet, e.g. in text copied
+    from the user's data, are escaped like the generated text.
+    """
+    content = {key: user_data[key] for key in CONTACT_FIELDS if user_data.get(key)}
+    experience = []
+    for section in sections:
+        value = values.get(section.key)
+        if value is None:
+            value = section.fallback
+        if section.kind == "experience":
+            experience.append(value)
+        else:
+            content[section.kind] = value
+    content["experience"] = experience
+    content["education"] = user_data.get("education") or []
+    return _escaped(content)
+
+
+class SectionCache:
+    """Generated section values keyed by relevance signature (least recently used evicted)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, signature):
+        with self._lock:
+            if signature in self.entries:
+                self.entries.move_to_end(signature)
+                self.hits += 1
+                return self.entries[signature]
+            self.misses += 1
+            return None
+
+    def put(self, signature, value):
+        with self._lock:
+            self.entries[signature] = value
+            self.entries.move_to_end(signature)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
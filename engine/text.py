@@ -0,0 +1,83 @@
+import re
+from collections import Counter
+
+# Words that carry no signal when matching a profile against a job description
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be because been being both but by can could did do does
+doing during each etc for from further had has have having he her here hers him his how i if in into is it
+its itself just may me more most must my no nor not of off on once only or other our ours out over own per
+same she should so some such than that the their theirs them then there these they this those through to
+too under until up upon us very via was we were what when where which while who whom why will with within
+without would you your yours
+ability able across candidate candidates company day days experience including job join looking new role
+strong team teams well work working years year plus preferred required requirements responsibilities
+""".split())
+
+# A term: letters/digits, with +#./- allowed inside (c++, c#, node.js, ci/cd) and a
+# leading dot at the start of a word (.net), but not after another dot ("...and")
+TOKEN_PATTERN = r"(?:(?<![\w.])\.(?=[a-z]))?[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+# Characters the prompts tell the model to escape in generated LaTeX content
+_LATEX_ESCAPE_RE = re.compile(r"\\([#&%_$])")
+_LATEX_SPECIAL_RE = re.compile(r"(?<!\\)([#&%_$])")
+_LATEX_COMMENT_RE = re.compile(r"(?<!\\)%.*")
+# Commands whose arguments are markup, not text (\begin{itemize}, \vspace{2pt})
+_LATEX_MARKUP_RE = re.compile(r"\\(?:begin|end|documentclass|usepackage|pagestyle|thispagestyle|setlength|"
+                              r"addtolength|vspace|hspace|newcommand|renewcommand|definecolor|color)\*?"
+                              r"\s*(?:\[[^\]]*\])?(?:\{[^}]*\})*")
+_LATEX_COMMAND_RE = re.compile(r"\\[a-zA-Z]+\*?(?:\[[^\]]*\])?")
+
+
+def tokenize(text):
+    """Lower-cased terms of `text` without stopwords; keeps tech names like c++, c#, node.js, ci/cd."""
+    return [term for term in _TOKEN_RE.findall((text or "").lower())
+            if term not in STOPWORDS and not term.isdigit()]
+
+
+def escape_latex(text):
+    """Escapes # & % _ $ that are not escaped yet, as the prompts ask the model to."""
+    return _LATEX_SPECIAL_RE.sub(r"\\\1", text)
+
+
+def unescape_latex(text):
+    """Undoes the escaping of # & % _ $ in generated content, so "C\\#" reads as "C#"."""
+    return _LATEX_ESCAPE_RE.sub(r"\1", text or "")
+
+
+def latex_to_text(source):
+    """
+    Rough plain text of a LaTeX document: the preamble, comments, markup
+    commands and braces are dropped, and the text arguments of formatting
+    commands (\\textbf{Python}) are kept.
+    """
+    start = source.find("\\begin{document}")
+    if start != -1:
+        source = source[start:]
+    source = _LATEX_COMMENT_RE.sub("", source)
+    source = _LATEX_MARKUP_RE.sub(" ", source)
+    source = source.replace("\\\\", " ")
+    source = _LATEX_COMMAND_RE.sub(" ", source)
+    source = re.sub(r"(?<!\\)[{}~]", " ", source)
+    return unescape_latex(source)
+
+
+def is_latex(text):
+    return bool(_LATEX_COMMAND_RE.search(text or ""))
+
+
+def term_counts(text):
+    return Counter(tokenize(text))
+
+
+def flatten_text(value):
+    """All string content of a JSON-like value, joined with newlines."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(flatten_text(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return "\n".join(flatten_text(item) for item in value)
+    if value is None:
+        return ""
+    return str(value)
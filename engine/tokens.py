@@ -0,0 +1,196 @@
+import copy
+import json
+import math
+import re
+import logging
+from config import MODEL_CONTEXT_WINDOWS, DEFAULT_CONTEXT_WINDOW, DEFAULT_OUTPUT_RESERVE, MIN_JD_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# tiktoken gives exact counts for OpenAI models; fall back to a heuristic without it
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Lines in a job description that carry no signal for tailoring a resume
+BOILERPLATE_PATTERNS = [
+    r"equal (employment )?opportunity",
+    r"\beeo\b",
+    r"without regard to (race|color|religion|sex|gender|age)",
+    r"reasonable accommodation",
+    r"affirmative action",
+    r"e-?verify",
+    r"background check",
+    r"privacy (policy|notice)",
+    r"(we|you) (offer|will enjoy|get)\b.*\b(benefits|perks|pto|401\(?k\)?|insurance)",
+    r"^(benefits|perks|what we offer|about us|about the company|who we are)\s*:?\s*$",
+    r"(dental|vision|medical) (insurance|coverage)",
+    r"paid (time off|parental leave|holidays)",
+    r"follow us on",
+    r"click apply|apply now|to apply,",
+]
+_BOILERPLATE_RE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Token count for `text` (exact with tiktoken, otherwise ~4 characters per token)."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def context_window(model):
+    """Context window of `model`, matched by longest known name prefix."""
+    name = (model or "").lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def input_budget(model, configured_budget=None, context=None):
+    """
+    Tokens a prompt may use: the configured budget, never more than the model
+    can take. `context` overrides the model's window, e.g. Ollama's num_ctx.
+    """
+    window = context or context_window(model)
+    # A small context still leaves room for the prompt
+    limit = window - min(DEFAULT_OUTPUT_RESERVE, window // 2)
+    if configured_budget:
+        return min(int(configured_budget), limit)
+    return limit
+
+
+def strip_boilerplate(job_description):
+    """Drops EEO statements, benefits lists and similar lines from a job description."""
+    kept = [line for line in job_description.splitlines() if not _BOILERPLATE_RE.search(line)]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def cap_bullets(user_data, max_bullets):
+    """Copy of user_data with at most `max_bullets` description bullets per role."""
+    data = copy.deepcopy(user_data)
+    for role in data.get("experience") or []:
+        if isinstance(role, dict) and isinstance(role.get("description"), list):
+            role["description"] = role["description"][:max_bullets]
+    return data
+
+
+def summarize_old_roles(user_data, keep_recent):
+    """
+    Copy of user_data where every role after the `keep_recent` most recent ones
+    (listed first, as in a resume) is reduced to a one-line summary.
+    """
+    data = copy.deepcopy(user_data)
+    for role in (data.get("experience") or [])[keep_recent:]:
+        if not isinstance(role, dict):
+            continue
+        bullets = role.get("description")
+        if isinstance(bullets, list) and bullets:
+            first = str(bullets[0])
+            role["description"] = [first if len(first) <= 160 else first[:157].rstrip() + "..."]
+    return data
+
+
+def _token_offset(text, max_tokens):
+    """Character offset where token number `max_tokens` of `text` starts."""
+    max_tokens = max(0, max_tokens)
+    if _ENCODING is not None:
+        encoded = _ENCODING.encode(text, disallowed_special=())
+        if len(encoded) <= max_tokens:
+            return len(text)
+        _, offsets = _ENCODING.decode_with_offsets(encoded)
+        return offsets[max_tokens]
+    return max_tokens * 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts `text` down to at most `max_tokens`, preferring a line boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:_token_offset(text, max_tokens)]
+    boundary = cut.rfind("\n")
+    return cut[:boundary] if boundary > len(cut) // 2 else cut
+
+
+class TrimReport:
+    """What the trimmer did to one prompt."""
+
+    def __init__(self, budget, original_tokens):
+        self.budget = budget
+        self.original_tokens = original_tokens
+        self.final_tokens = original_tokens
+        self.steps = []
+
+    @property
+    def tokens_saved(self):
+        return max(0, self.original_tokens - self.final_tokens)
+
+    @property
+    def within_budget(self):
+        return self.final_tokens <= self.budget
+
+    def to_dict(self):
+        return {
+            "budget": self.budget,
+            "original_tokens": self.original_tokens,
+            "final_tokens": self.final_tokens,
+            "tokens_saved": self.tokens_saved,
+            "steps": list(self.steps),
+        }
+
+
+def fit_inputs(job_description, user_data, budget, fixed_text=""):
+    """
+    Shrinks the job description and user data until the prompt fits `budget`
+    tokens. `fixed_text` is everything else that is sent (system prompt,
+    template, instructions) and is counted but never trimmed.
+
+    Steps, cheapest first: drop JD boilerplate, cap bullets per role, summarize
+    old roles, then truncate the JD as a last resort, never below MIN_JD_TOKENS.
+    Returns (job_description, user_data, TrimReport).
+    """
+    job_description = job_description or ""
+    user_data = user_data or {}
+    fixed = estimate_tokens(fixed_text)
+
+    def size(jd, data):
+        return fixed + estimate_tokens(jd) + estimate_tokens(json.dumps(data))
+
+    report = TrimReport(budget, size(job_description, user_data))
+
+    cleaned = strip_boilerplate(job_description)
+    if cleaned != job_description:
+        job_description = cleaned
+        report.steps.append("strip_jd_boilerplate")
+
+    candidates = [
+        ("cap_bullets_6", lambda data: cap_bullets(data, 6)),
+        ("summarize_old_roles", lambda data: summarize_old_roles(data, 3)),
+        ("cap_bullets_4", lambda data: cap_bullets(data, 4)),
+        ("summarize_roles_after_2", lambda data: summarize_old_roles(data, 2)),
+        ("cap_bullets_3", lambda data: cap_bullets(data, 3)),
+    ]
+    for name, step in candidates:
+        if size(job_description, user_data) <= budget:
+            break
+        trimmed = step(user_data)
+        if trimmed != user_data:
+            user_data = trimmed
+            report.steps.append(name)
+
+    over = size(job_description, user_data) - budget
+    if over > 0 and job_description:
+        truncated = truncate_to_tokens(job_description, max(estimate_tokens(job_description) - over, MIN_JD_TOKENS))
+        if truncated != job_description:
+            job_description = truncated
+            report.steps.append("truncate_jd")
+
+    report.final_tokens = size(job_description, user_data)
+    if not report.within_budget:
+        logger.warning(f"Prompt still over budget after trimming ({report.final_tokens} > {budget} tokens)")
+    return job_description, user_data, report
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import queue
+import logging
+import secrets
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from config import DEFAULT_TRACE_SERVICE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Span of the stage running on this thread (or in this copied context)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """All spans of one root operation, e.g. one Bridge call."""
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Timing breakdown for a response: spans by start time, with offsets from the root."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        if not spans:
+            return None
+        root = spans[0]
+        depths = {}
+        rows = []
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1 if span.parent_id else 0
+            depths[span.span_id] = depth
+            row = {"name": span.name, "start_ms": round((span.start - root.start) * 1000, 1),
+                   "duration_ms": span.duration_ms, "depth": depth}
+            if span.error:
+                row["error"] = span.error
+            rows.append(row)
+        return {"trace_id": self.trace_id, "total_ms": root.duration_ms, "spans": rows}
+
+
+class Span:
+    """One timed stage. Attributes are small JSON-serializable values (provider, model, ...)."""
+
+    def __init__(self, name, trace, parent=None, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return round((end - self.start) * 1000, 1)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": self.duration_ms,
+            "thread": self.thread,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class JsonlExporter:
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+
+class OtlpExporter:
+    """Posts spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, endpoint, service_name=DEFAULT_TRACE_SERVICE_NAME, timeout=5):
+        endpoint = endpoint.rstrip("/")
+        self.endpoint = endpoint if endpoint.endswith("/v1/traces") else endpoint + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self._session = None
+
+    @staticmethod
+    def _attribute(key, value):
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        return {"key": key, "value": typed}
+
+    def payload(self, spans):
+        otlp_spans = []
+        for span in spans:
+            start = int(span["start"] * 1e9)
+            otlp_span = {
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(start + int(span["duration_ms"] * 1e6)),
+                "attributes": [self._attribute(k, v) for k, v in span["attributes"].items()]
+                              + [self._attribute("thread.name", span["thread"])],
+                "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+            }
+            if span["parent_id"]:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            otlp_spans.append(otlp_span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "engine.tracing"}, "spans": otlp_spans}],
+        }]}
+
+    def export(self, spans):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        response = self._session.post(self.endpoint, json=self.payload(spans), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Creates spans and hands finished traces to the exporters on a background
+    thread, so writing a file or reaching a collector never delays the traced
+    operation. Without exporters, spans are only kept for the response breakdown.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.exporters = []
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def configure(self, trace_file=None, otlp_endpoint=None, service_name=DEFAULT_TRACE_SERVICE_NAME):
+        exporters = []
+        # Anything but a non-empty string (e.g. null in settings.json) leaves that exporter off
+        if isinstance(trace_file, str) and trace_file:
+            exporters.append(JsonlExporter(trace_file))
+        if isinstance(otlp_endpoint, str) and otlp_endpoint:
+            exporters.append(OtlpExporter(otlp_endpoint, service_name))
+        self.exporters = exporters
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = _current_span.get()
+        trace = parent.trace if parent else Trace()
+        span = Span(name, trace, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            trace.add(span)
+            if parent is None:
+                self._export(trace)
+
+    def _export(self, trace):
+        if not self.exporters:
+            return
+        try:
+            self._queue.put_nowait([span.to_dict() for span in trace.spans])
+        except queue.Full:
+            self.dropped += 1
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True, name="trace-export")
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                for exporter in list(self.exporters):
+                    try:
+                        exporter.export(spans)
+                    except Exception as e:
+                        logger.debug(f"Trace export to {type(exporter).__name__} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=5):
+        """Waits until queued traces are exported (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+# Shared by the Bridge, AIEngine and LatexEngine of the process
+tracer = Tracer()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def traced(name):
+    """
+    Runs the decorated Bridge method as a root span. A dict result gets the
+    operation's timing breakdown under "trace".
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name) as span:
+                result = fn(*args, **kwargs)
+            if span.parent_id is None and isinstance(result, dict):
+                result["trace"] = span.trace.summary()
+            return result
+        return wrapper
+    return decorator
+
+
+def in_current_context(fn):
+    """
+    Wraps fn so that, run on another thread, its spans nest under the current
+    span. Wrap once per submitted task: a context cannot run on two threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
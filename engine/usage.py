@@ -0,0 +1,213 @@
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from config import MODEL_PRICING
+from engine.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens")
+
+# Meters that the provider calls made in this thread (or copied context) count towards
+_meters = contextvars.ContextVar("usage_meters", default=())
+
+
+def _field(obj, name):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _ms(nanoseconds):
+    return round(nanoseconds / 1e6, 1) if nanoseconds else None
+
+
+def openai_usage(usage, processing_ms=None):
+    """
+    Normalizes the `usage` of an OpenAI chat completion (sent in the last
+    stream chunk); `processing_ms` is the openai-processing-ms response header.
+    """
+    prompt = int(_field(usage, "prompt_tokens") or 0)
+    completion = int(_field(usage, "completion_tokens") or 0)
+    details = _field(usage, "prompt_tokens_details") or {}
+    result = {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": int(_field(details, "cached_tokens") or 0),
+        "total_tokens": int(_field(usage, "total_tokens") or prompt + completion),
+    }
+    try:
+        result["server_ms"] = float(processing_ms) if processing_ms is not None else None
+    except (TypeError, ValueError):
+        result["server_ms"] = None
+    return result
+
+
+def ollama_usage(chunk):
+    """
+    Normalizes the counters of Ollama's final ("done") chunk. Durations are in
+    nanoseconds. Ollama does not report cached tokens: a reused prompt prefix
+    shows up as a lower prompt_eval_count.
+    """
+    prompt = int(chunk.get("prompt_eval_count") or 0)
+    completion = int(chunk.get("eval_count") or 0)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": 0,
+        "total_tokens": prompt + completion,
+        "server_ms": _ms(chunk.get("total_duration")),
+        "load_ms": _ms(chunk.get("load_duration")),
+        "prompt_eval_ms": _ms(chunk.get("prompt_eval_duration")),
+        "eval_ms": _ms(chunk.get("eval_duration")),
+    }
+
+
+def gemini_usage(metadata):
+    """Normalizes Gemini's usage_metadata; thinking tokens are billed as output."""
+    prompt = int(_field(metadata, "prompt_token_count") or 0)
+    completion = int(_field(metadata, "candidates_token_count") or 0) + int(_field(metadata, "thoughts_token_count") or 0)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": int(_field(metadata, "cached_content_token_count") or 0),
+        "total_tokens": int(_field(metadata, "total_token_count") or prompt + completion),
+        "server_ms": None,
+    }
+
+
+class Pricing:
+    """Per-model token prices (USD per million tokens), matched by longest model-name prefix."""
+
+    def __init__(self):
+        self.prices = dict(MODEL_PRICING)
+
+    def configure(self, overrides=None):
+        # Anything but a dict (e.g. null in settings.json) keeps the built-in prices
+        self.prices = {**MODEL_PRICING, **(overrides if isinstance(overrides, dict) else {})}
+
+    def price(self, model):
+        name = (model or "").lower()
+        matches = [prefix for prefix in self.prices if name.startswith(prefix.lower())]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def cost(self, model, usage):
+        """Cost of one call in USD, or None if the model has no price."""
+        price = self.price(model)
+        if not isinstance(price, dict):
+            return None
+        prompt = usage.get("prompt_tokens") or 0
+        cached = min(usage.get("cached_tokens") or 0, prompt)
+        input_price = float(price.get("input") or 0)
+        cached_price = float(price.get("cached_input", input_price) or 0)
+        total = ((prompt - cached) * input_price + cached * cached_price
+                 + (usage.get("completion_tokens") or 0) * float(price.get("output") or 0))
+        return total / 1e6
+
+
+# Shared by all providers of the process, configured from the `model_pricing` setting
+pricing = Pricing()
+
+
+class UsageMeter:
+    """Running totals of tokens, cost and server time, overall and per model. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    @staticmethod
+    def _empty():
+        return {"calls": 0, **{field: 0 for field in TOKEN_FIELDS}, "server_ms": 0.0,
+                "cost_usd": 0.0, "unpriced_calls": 0}
+
+    def reset(self):
+        with self._lock:
+            self._totals = self._empty()
+            self._models = {}
+
+    @property
+    def calls(self):
+        return self._totals["calls"]
+
+    def add(self, model, usage):
+        with self._lock:
+            for totals in (self._totals, self._models.setdefault(model, self._empty())):
+                totals["calls"] += 1
+                for field in TOKEN_FIELDS:
+                    totals[field] += usage.get(field) or 0
+                totals["server_ms"] += usage.get("server_ms") or 0
+                if usage.get("cost_usd") is None:
+                    totals["unpriced_calls"] += 1
+                else:
+                    totals["cost_usd"] += usage["cost_usd"]
+
+    @staticmethod
+    def _rounded(totals):
+        totals = dict(totals)
+        totals["server_ms"] = round(totals["server_ms"], 1)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        totals["cache_hit_rate"] = (round(totals["cached_tokens"] / totals["prompt_tokens"], 3)
+                                    if totals["prompt_tokens"] else 0.0)
+        return totals
+
+    def summary(self):
+        with self._lock:
+            summary = self._rounded(self._totals)
+            summary["models"] = {model: self._rounded(totals) for model, totals in self._models.items()}
+        return summary
+
+
+@contextmanager
+def metering(meter=None):
+    """Counts the provider calls made inside the block (and in contexts copied from it) on `meter`."""
+    meter = meter or UsageMeter()
+    active = _meters.get()
+    token = _meters.set(active if meter in active else active + (meter,))
+    try:
+        yield meter
+    finally:
+        _meters.reset(token)
+
+
+def describe(model, usage):
+    text = f"{model}: {usage['prompt_tokens']} prompt"
+    if usage.get("cached_tokens"):
+        text += f" ({usage['cached_tokens']} cached)"
+    text += f" + {usage['completion_tokens']} completion tokens"
+    if usage.get("cost_usd") is not None:
+        text += f", ${usage['cost_usd']:.6f}"
+    if usage.get("server_ms"):
+        text += f", {usage['server_ms']:.0f} ms server time"
+    return text
+
+
+def report_usage(model, usage, free=False):
+    """
+    Records one completed provider call: prices it, adds it to every active
+    meter and to the current span, and logs it. Providers call this on the
+    caller's thread; `free` marks local models.
+    """
+    usage = dict(usage)
+    usage["cost_usd"] = 0.0 if free else pricing.cost(model, usage)
+    for meter in _meters.get():
+        meter.add(model, usage)
+    span = current_span()
+    if span is not None:
+        span.set(**{key: value for key, value in usage.items() if value is not None})
+    logger.info(f"Usage {describe(model, usage)}")
+    return usage
+
+
+def metered(fn):
+    """Bridge method decorator: a dict result gets the usage of the provider calls it made under "usage"."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with metering() as meter:
+            result = fn(*args, **kwargs)
+        if isinstance(result, dict) and meter.calls:
+            result["usage"] = meter.summary()
+        return result
+    return wrapper
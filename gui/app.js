@@ -12,25 +12,57 @@ function navigate(viewId) {
     document.querySelectorAll('.nav-item')[navIndex].classList.add('active');
 }
 
+// Settings key holding each provider's base URL (see BASE_URL_SETTINGS in config.py)
+const BASE_URL_KEYS = {
+    'openai': 'openai_base_url',
+    'openai-compatible': 'compatible_base_url',
+    'ollama': 'ollama_base_url',
+    'google': 'gemini_base_url'
+};
+let loadedSettings = {};
+
 // Settings Toggle
 function toggleAiSettings() {
     const provider = document.getElementById('ai-provider').value;
     const isLocal = provider === 'ollama';
     const isGoogle = provider === 'google';
+    const isCompatible = provider === 'openai-compatible';
 
     // Toggle API Key visibility
     document.getElementById('group-api-key').style.display = isLocal ? 'none' : 'block';
+    document.getElementById('api-key').placeholder = isCompatible ? 'Optional' : 'sk-...';
+    document.getElementById('api-key').value = (isCompatible ? loadedSettings.compatible_api_key : loadedSettings.apiKey) || '';
+    document.querySelectorAll('.ollama-only').forEach(el => el.style.display = isLocal ? 'block' : 'none');
+    document.querySelectorAll('.compatible-only').forEach(el => el.style.display = isCompatible ? 'block' : 'none');
+    document.getElementById('group-base-url').style.display = BASE_URL_KEYS[provider] ? 'block' : 'none';
+    document.getElementById('base-url').value = loadedSettings[BASE_URL_KEYS[provider]] || '';
 
     // Adjust logic for model inputs/placeholders
     if (isLocal) {
         document.getElementById('model-name').value = "llama3:latest";
     } else if (isGoogle) {
         document.getElementById('model-name').value = "gemini-3-flash-preview";
+    } else if (isCompatible) {
+        document.getElementById('model-name').value = (loadedSettings.compatible_models || [])[0] || "";
     } else {
         document.getElementById('model-name').value = "gpt-4o-mini";
     }
 }
 
+async function refreshModels() {
+    const list = document.getElementById('model-options');
+    const result = await pywebview.api.list_models();
+    list.innerHTML = '';
+    (result.models || []).forEach(name => {
+        const option = document.createElement('option');
+        option.value = name;
+        list.appendChild(option);
+    });
+    document.getElementById('status-text').textContent = result.success
+        ? result.models.length + ' models available (save settings first to list another server)'
+        : 'Could not list models: ' + result.error;
+}
+
 function toggleTemplateEditor() {
     const val = document.getElementById('template-select').value;
     const isCustom = val === 'custom';
@@ -103,23 +135,80 @@ async function resetDefaultPrompt(type) {
 
 // Save Settings
 async function saveSettings() {
+    const provider = document.getElementById('ai-provider').value;
+    let headers = {};
+    const headersText = document.getElementById('compatible-headers').value.trim();
+    if (headersText) {
+        try {
+            headers = JSON.parse(headersText);
+        } catch (e) {
+            alert("Extra Headers must be a JSON object: " + e);
+            return;
+        }
+    }
     const config = {
-        provider: document.getElementById('ai-provider').value,
-        apiKey: document.getElementById('api-key').value,
+        provider: provider,
         model: document.getElementById('model-name').value,
         system_prompt: document.getElementById('system-prompt').value,
-        system_prompt_fix: document.getElementById('system-prompt-fix').value
+        system_prompt_fix: document.getElementById('system-prompt-fix').value,
+        ollama_keep_alive: document.getElementById('ollama-keep-alive').value.trim() || null,
+        ollama_num_ctx: parseInt(document.getElementById('ollama-num-ctx').value, 10) || null
     };
+    // The compatible server has its own key; the cloud apiKey is never sent to it
+    config[provider === 'openai-compatible' ? 'compatible_api_key' : 'apiKey'] = document.getElementById('api-key').value;
+    if (BASE_URL_KEYS[provider]) {
+        config[BASE_URL_KEYS[provider]] = document.getElementById('base-url').value.trim() || null;
+    }
+    if (provider === 'openai-compatible') {
+        config.compatible_headers = headers;
+        config.compatible_models = document.getElementById('compatible-models').value
+            .split(',').map(name => name.trim()).filter(name => name);
+    }
 
     try {
         const response = await pywebview.api.save_settings(config);
+        loadedSettings = { ...loadedSettings, ...config };
         document.getElementById('status-text').textContent = 'Settings saved';
+        refreshModelStatus();
         alert("Configuration Saved!");
     } catch (e) {
         alert("Error saving settings: " + e);
     }
 }
 
+// Local model status (Ollama): is the model loaded, and until when
+async function refreshModelStatus() {
+    const badge = document.getElementById('model-status');
+    const detail = document.getElementById('model-status-detail');
+    try {
+        const status = await pywebview.api.get_model_status();
+        if (!status.local) {
+            badge.textContent = '';
+            return;
+        }
+        let text;
+        if (!status.reachable) {
+            text = 'Ollama not reachable';
+        } else if (status.loaded) {
+            const until = status.expires_at ? new Date(status.expires_at) : null;
+            text = status.model + ' loaded' + (until && !isNaN(until) ? ' until ' + until.toLocaleTimeString() : '');
+        } else if (status.warm_up && status.warm_up.success === null) {
+            text = 'Loading ' + status.model + '...';
+        } else {
+            text = status.model + ' not loaded';
+        }
+        badge.textContent = (status.loaded ? '\u25CF ' : '\u25CB ') + text;
+        detail.textContent = text;
+    } catch (e) {
+        console.log("Model status err", e);
+    }
+}
+
+async function warmUpModel() {
+    await pywebview.api.warm_up_model();
+    refreshModelStatus();
+}
+
 // --- STOP LOGIC ---
 let currentTaskToken = null;
 
@@ -177,6 +266,61 @@ function resetUI(type) {
     }
 }
 
+// Timing Panel: where the time of the last operation went, stage by stage
+function showTimings(trace) {
+    const total = document.getElementById('timing-total');
+    const panel = document.getElementById('timing-panel');
+    if (!trace || !trace.spans || !trace.spans.length) return;
+
+    total.textContent = '\u23F1 ' + formatMs(trace.total_ms);
+    panel.innerHTML = '';
+    const scale = trace.total_ms > 0 ? 100 / trace.total_ms : 0;
+    trace.spans.forEach(span => {
+        const row = document.createElement('div');
+        row.className = 'timing-row' + (span.error ? ' failed' : '');
+        if (span.error) row.title = span.error;
+
+        const name = document.createElement('span');
+        name.textContent = span.name;
+        name.style.paddingLeft = (span.depth * 10) + 'px';
+
+        const track = document.createElement('div');
+        track.className = 'timing-track';
+        const bar = document.createElement('div');
+        bar.className = 'timing-bar';
+        bar.style.left = (span.start_ms * scale) + '%';
+        bar.style.width = (span.duration_ms * scale) + '%';
+        track.appendChild(bar);
+
+        const duration = document.createElement('span');
+        duration.textContent = formatMs(span.duration_ms);
+        duration.style.textAlign = 'right';
+
+        row.append(name, track, duration);
+        panel.appendChild(row);
+    });
+}
+
+// Tokens and cost of the last AI operation
+function showUsage(usage) {
+    const el = document.getElementById('usage-total');
+    if (!usage) return;
+    let text = usage.total_tokens.toLocaleString() + ' tokens';
+    if (usage.cached_tokens) text += ' (' + usage.cached_tokens.toLocaleString() + ' cached)';
+    if (usage.calls > usage.unpriced_calls) text += ' \u00B7 $' + usage.cost_usd.toFixed(4);
+    el.textContent = text;
+}
+
+function formatMs(ms) {
+    return ms >= 1000 ? (ms / 1000).toFixed(1) + ' s' : Math.round(ms) + ' ms';
+}
+
+function toggleTimingPanel() {
+    const panel = document.getElementById('timing-panel');
+    if (!panel.hasChildNodes()) return;
+    panel.style.display = panel.style.display === 'block' ? 'none' : 'block';
+}
+
 // Generate LaTeX Source (Step 1)
 async function generateLatexSource() {
     // Reset UI state first
@@ -210,6 +354,8 @@ async function generateLatexSource() {
             console.log("Task ignored (cancelled)");
             return;
         }
+        showTimings(result.trace);
+        showUsage(result.usage);
 
         if (result.success) {
             document.getElementById('generated-latex').value = result.tex_content;
@@ -254,6 +400,7 @@ async function compilePdf() {
         const result = await pywebview.api.compile_pdf(texContent);
 
         if (currentTaskToken !== myToken) return;
+        showTimings(result.trace);
 
         if (result.success) {
             const pdfData = "data:application/pdf;base64," + result.pdf_base64;
@@ -311,6 +458,8 @@ async function fixWithAI(event) {
         const result = await pywebview.api.fix_latex(payload);
 
         if (currentTaskToken !== myToken) return; // Cancelled
+        showTimings(result.trace);
+        showUsage(result.usage);
 
         if (result.success) {
             document.getElementById('generated-latex').value = result.fixed_content;
@@ -358,13 +507,21 @@ window.addEventListener('pywebviewready', async function () {
     switchRightTab('source');
     const settings = await pywebview.api.load_settings();
     if (settings) {
+        loadedSettings = settings;
         document.getElementById('ai-provider').value = settings.provider || 'openai';
         document.getElementById('api-key').value = settings.apiKey || '';
         document.getElementById('model-name').value = settings.model || 'gpt-4o-mini';
         document.getElementById('system-prompt').value = settings.system_prompt || '';
         document.getElementById('system-prompt-fix').value = settings.system_prompt_fix || '';
+        document.getElementById('ollama-keep-alive').value = settings.ollama_keep_alive || '';
+        document.getElementById('ollama-num-ctx').value = settings.ollama_num_ctx || '';
+        const headers = settings.compatible_headers || {};
+        document.getElementById('compatible-headers').value = Object.keys(headers).length ? JSON.stringify(headers, null, 2) : '';
+        document.getElementById('compatible-models').value = (settings.compatible_models || []).join(', ');
         toggleAiSettings();
     }
+    refreshModelStatus();
+    setInterval(refreshModelStatus, 15000);
     if (!document.getElementById('system-prompt').value) resetDefaultPrompt('resume');
     if (!document.getElementById('system-prompt-fix').value) resetDefaultPrompt('fix');
 });
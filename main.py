@@ -1,14 +1,15 @@
 import webview
 import os
-import logging
 from api import Bridge
 import sys
 from utils import resource_path
-
-# Configure Logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from settings import SettingsManager
+from engine.logs import configure_logging_from_settings
 
 def main():
+    # Configure Logging: written by a background thread, so it never delays a GUI request
+    configure_logging_from_settings(SettingsManager().get_all())
+
     api = Bridge()
     
     # Path to HTML
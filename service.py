@@ -0,0 +1,309 @@
+"""
+Local HTTP service: the generate, compile and fix operations of the desktop app
+behind a small REST API, so one install can be shared by a team.
+
+    python cli.py serve --host 127.0.0.1 --port 8765 --workers 2
+
+    POST   /jobs/generate   {"job_description", "template_name", "user_data", "compile", ...}
+    POST   /jobs/compile    {"tex_content"}
+    POST   /jobs/fix        {"source", "error"}
+        -> 202 {"job_id", "status", "poll"}; 429 when the queue is full
+    GET    /jobs/<id>       job status, plus the Bridge result once finished
+    DELETE /jobs/<id>       cancel a queued or running job
+    GET    /health          queue depth and worker counts
+
+Every worker owns a Bridge (with its own pdflatex build directory), so jobs run
+through exactly the code the GUI uses. A generate job with "compile": true also
+compiles the PDF, and both share the job's time budget.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from api import Bridge
+from engine.cancel import CancelToken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+# Finished jobs are kept this long for polling, then forgotten
+DEFAULT_JOB_TTL = 3600
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+OPERATIONS = ("generate", "compile", "fix")
+JOB_PATH_RE = re.compile(r"^/jobs/([0-9a-f]{32})$")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    """One queued operation and, once finished, its Bridge result."""
+
+    def __init__(self, operation, payload):
+        self.job_id = uuid.uuid4().hex
+        self.operation = operation
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        # Created with the job, so a cancel before the Bridge starts the operation still reaches it
+        self.cancel_token = CancelToken()
+        self.bridge = None
+
+    @property
+    def finished(self):
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def to_dict(self):
+        data = {
+            "job_id": self.job_id,
+            "operation": self.operation,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.started_at:
+            end = self.finished_at or time.time()
+            data["run_time_s"] = round(end - self.started_at, 3)
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+def run_operation(bridge, operation, payload, cancel_token=None):
+    """Dispatches one job to the Bridge method the GUI calls for the same action."""
+    if cancel_token is not None and cancel_token.cancelled:
+        return {"success": False, "error": "Cancelled"}
+    if operation == "generate":
+        payload = dict(payload)
+        # The GUI sends user data as the raw JSON text of its editor
+        if isinstance(payload.get("user_data"), (dict, list)):
+            payload["user_data"] = json.dumps(payload["user_data"])
+        return bridge.generate_latex_source(payload, cancel_token=cancel_token)
+    if operation == "compile":
+        return bridge.compile_pdf(payload.get("tex_content", ""))
+    if operation == "fix":
+        return bridge.fix_latex(payload, cancel_token=cancel_token)
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+class JobService:
+    """
+    A bounded queue in front of a pool of worker threads. submit() never blocks:
+    when the queue is full it raises QueueFullError so callers can push back.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, job_ttl=DEFAULT_JOB_TTL,
+                 work_root=None, bridge_factory=Bridge):
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.job_ttl = job_ttl
+        self.work_root = work_root or os.path.join(os.getcwd(), "work_output", "service")
+        self.bridge_factory = bridge_factory
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._busy = 0
+
+    def start(self):
+        for index in range(self.workers):
+            bridge = self.bridge_factory(work_dir=os.path.join(self.work_root, f"worker-{index}"))
+            thread = threading.Thread(target=self._worker, args=(bridge,), name=f"service-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job service started with {self.workers} workers, queue size {self.queue.maxsize}")
+
+    def stop(self, timeout=5):
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, operation, payload):
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+        job = Job(operation, payload or {})
+        self._prune()
+        with self._lock:
+            self.jobs[job.job_id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.jobs.pop(job.job_id, None)
+            raise QueueFullError(f"Queue is full ({self.queue.maxsize} jobs waiting)")
+        logger.info(f"Queued {operation} job {job.job_id}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested = True
+            job.cancel_token.cancel()
+            if job.status == "queued":
+                # The worker skips it when it comes off the queue
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                job.result = {"success": False, "error": "Cancelled"}
+            elif job.bridge is not None:
+                # Also stops a running pdflatex. Under the lock so a worker
+                # that already moved on is never cancelled by mistake
+                job.bridge.cancel_generation()
+        return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            busy = self._busy
+        return {
+            "workers": self.workers,
+            "busy_workers": busy,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "jobs": counts,
+        }
+
+    def _worker(self, bridge):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                job.bridge = bridge
+                self._busy += 1
+            try:
+                result = run_operation(bridge, job.operation, job.payload, job.cancel_token)
+            except Exception as e:
+                logger.error(f"Job {job.job_id} crashed: {e}", exc_info=True)
+                result = {"success": False, "error": str(e)}
+            with self._lock:
+                self._busy -= 1
+                job.bridge = None
+                job.result = result
+                job.finished_at = time.time()
+                if result.get("success"):
+                    job.status = "succeeded"
+                elif job.cancel_requested:
+                    job.status = "cancelled"
+                else:
+                    job.status = "failed"
+            logger.info(f"Job {job.job_id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            for job_id in [j.job_id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+                del self.jobs[job_id]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "ResumeService/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        raw = self.rfile.read(length) if length else b"{}"
+        payload = json.loads(raw.decode("utf-8") or "{}")
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._send(200, self.service.stats())
+        match = JOB_PATH_RE.match(self.path)
+        job = self.service.get(match.group(1)) if match else None
+        if job is None:
+            return self._send(404, {"error": "Not found"})
+        return self._send(200, job.to_dict())
+
+    def do_POST(self):
+        operation = self.path[len("/jobs/"):] if self.path.startswith("/jobs/") else None
+        if operation not in OPERATIONS:
+            return self._send(404, {"error": "Not found"})
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            return self._send(400, {"error": f"Invalid request: {e}"})
+        try:
+            job = self.service.submit(operation, payload)
+        except QueueFullError as e:
+            return self._send(429, {"error": str(e)}, {"Retry-After": "5"})
+        return self._send(202, {"job_id": job.job_id, "status": job.status, "poll": f"/jobs/{job.job_id}"},
+                          {"Location": f"/jobs/{job.job_id}"})
+
+    def do_DELETE(self):
+        match = JOB_PATH_RE.match(self.path)
+        job = self.service.cancel(match.group(1)) if match else None
+        if job is None:
+            return self._send(404, {"error": "Not found"})
+        return self._send(202, job.to_dict())
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    """Builds (but does not start) the HTTP server; `server.service` is the JobService."""
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service or JobService()
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    service = JobService(workers=workers, queue_size=queue_size)
+    server = create_server(host, port, service)
+    service.start()
+    if host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning(f"Listening on {host}: anyone who can reach this port can use the configured API key")
+    logger.info(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -2,6 +2,11 @@ import json
 import os
 import sys
 
+# Saved to secrets.json; settings.json only keeps a placeholder for them.
+# compatible_headers usually carry a gateway's auth headers.
+SECRET_SETTINGS = ('apiKey', 'hedge_api_key', 'compatible_api_key', 'compatible_headers')
+API_KEY_PLACEHOLDER = 'YOUR_API_KEY_HERE'
+
 class SettingsManager:
     def __init__(self, filename="settings.json", secrets_filename="secrets.json"):
         # Resolve path relative to executable or script
@@ -34,6 +39,11 @@ class SettingsManager:
                     self.settings.update(secrets)
             except Exception as e:
                 print(f"Error loading secrets: {e}")
+
+        # A placeholder left without its secret is no key at all (apiKey keeps it, the UI shows it)
+        for key in SECRET_SETTINGS:
+            if key != 'apiKey' and self.settings.get(key) == API_KEY_PLACEHOLDER:
+                del self.settings[key]
         
         # Override with environment variables if present (highest priority)
         # Support for common API key environment variable names
@@ -55,18 +65,19 @@ class SettingsManager:
         """Save settings. By default, API keys are saved to secrets.json separately."""
         self.settings = config
         
-        # Separate API key from other settings if requested
+        # Separate API keys from other settings if requested
         settings_to_save = config.copy()
-        api_key = settings_to_save.get('apiKey', '')
+        secrets = {key: settings_to_save[key] for key in SECRET_SETTINGS
+                   if settings_to_save.get(key) and settings_to_save[key] != API_KEY_PLACEHOLDER}
         
-        if save_api_key_to_secrets and api_key and api_key != 'YOUR_API_KEY_HERE':
-            # Save API key to secrets file
+        if save_api_key_to_secrets and secrets:
+            # Save API keys to secrets file
             try:
-                secrets = {'apiKey': api_key}
                 with open(self.secrets_file, 'w') as f:
                     json.dump(secrets, f, indent=4)
-                # Remove API key from main settings file
-                settings_to_save['apiKey'] = 'YOUR_API_KEY_HERE'
+                # Remove API keys from main settings file
+                for key in secrets:
+                    settings_to_save[key] = API_KEY_PLACEHOLDER
             except Exception as e:
                 print(f"Error saving secrets: {e}")
                 return False
@@ -113,3 +113,41 @@ class TestBridge:
         
         assert result['success'] is False
         assert "Compilation failed" in result['error']
+
+    def test_generate_latex_source_cancelled(self, bridge):
+        """Test that a cancelled provider call is reported as cancelled."""
+        from engine.cancel import CancelledError
+
+        def cancelled_call(*args, **kwargs):
+            bridge.cancel_generation()
+            raise CancelledError("Cancelled by user")
+
+        bridge.ai.generate_resume_content.side_effect = cancelled_call
+        result = bridge.generate_latex_source({"job_description": "JD", "template_name": "modern"})
+
+        assert result.pop("trace")["spans"][0]["name"] == "generate_latex_source"
+        assert result == {"success": False, "error": "Cancelled"}
+        assert bridge.cancel_token.cancelled
+        assert bridge.last_cancel_latency_ms is not None
+        assert bridge.ai.generate_resume_content.call_args.kwargs['cancel_token'] is bridge.cancel_token
+
+    def test_fix_latex_cancelled(self, bridge):
+        """Test that cancelling a fix returns the message app.js expects."""
+        from engine.cancel import CancelledError
+        bridge.ai.fix_latex_content.side_effect = CancelledError("Cancelled by user")
+
+        result = bridge.fix_latex({"source": "x", "error": "y"})
+        result.pop("trace")
+        assert result == {"success": False, "error": "Cancelled by user"}
+
+    def test_generate_latex_source_deadline(self, bridge):
+        """Test that an exhausted time budget reports the stage that ran out."""
+        from engine.deadline import DeadlineExceeded
+        bridge.ai.generate_resume_content.side_effect = DeadlineExceeded("AI generation", 180)
+
+        result = bridge.generate_latex_source({"job_description": "JD", "template_name": "modern"})
+
+        assert result['success'] is False
+        assert result['stage'] == "AI generation"
+        assert "AI generation" in result['error']
+        assert bridge.ai.generate_resume_content.call_args.kwargs['deadline'] is not None
@@ -280,6 +280,46 @@ class TestApiKeySavesSeparately:
         assert secrets_data.get('apiKey') == 'my_secret_key', \
             "secrets.json should contain the real API key"
     
+    def test_save_moves_hedge_api_key_to_secrets(self, temp_dir, monkeypatch):
+        """The hedge provider's key is a secret too."""
+        monkeypatch.delenv('API_KEY', raising=False)
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        monkeypatch.delenv('GOOGLE_API_KEY', raising=False)
+        settings_path = os.path.join(temp_dir, 'hedge_settings.json')
+        secrets_path = os.path.join(temp_dir, 'hedge_secrets.json')
+
+        sm = SettingsManager(settings_path, secrets_path)
+        sm.save({'provider': 'openai', 'apiKey': 'sk-primary', 'hedge_api_key': 'hedge_secret'})
+
+        with open(settings_path, 'r') as f:
+            assert 'hedge_secret' not in f.read()
+        with open(secrets_path, 'r') as f:
+            assert json.load(f) == {'apiKey': 'sk-primary', 'hedge_api_key': 'hedge_secret'}
+        assert SettingsManager(settings_path, secrets_path).get('hedge_api_key') == 'hedge_secret'
+
+        # Without its secret, the masked key is not used as a key
+        os.remove(secrets_path)
+        assert SettingsManager(settings_path, secrets_path).get('hedge_api_key') is None
+
+    def test_save_moves_compatible_credentials_to_secrets(self, temp_dir, monkeypatch):
+        """The compatible server's key and headers (gateway auth) stay out of settings.json."""
+        monkeypatch.delenv('API_KEY', raising=False)
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        monkeypatch.delenv('GOOGLE_API_KEY', raising=False)
+        settings_path = os.path.join(temp_dir, 'compatible_settings.json')
+        secrets_path = os.path.join(temp_dir, 'compatible_secrets.json')
+        headers = {'X-Gateway-Token': 'gateway_secret'}
+
+        sm = SettingsManager(settings_path, secrets_path)
+        sm.save({'provider': 'openai-compatible', 'compatible_api_key': 'compat_secret', 'compatible_headers': headers})
+
+        with open(settings_path, 'r') as f:
+            stored = f.read()
+        assert 'compat_secret' not in stored and 'gateway_secret' not in stored
+        loaded = SettingsManager(settings_path, secrets_path)
+        assert loaded.get('compatible_api_key') == 'compat_secret'
+        assert loaded.get('compatible_headers') == headers
+
     def test_placeholder_key_not_saved_to_secrets(self, temp_dir, monkeypatch):
         """Placeholder API key should not be saved to secrets.json."""
         monkeypatch.delenv('API_KEY', raising=False)
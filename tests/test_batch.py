@@ -0,0 +1,172 @@
+"""
+Tests for multi-JD batch generation.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.batch import BatchRunner, load_jobs
+from engine.latex import LatexEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTENT = {
+    "name": "Jane Doe",
+    "summary": "Engineer.",
+    "skills": ["Python"],
+    "experience": [{"role": "Dev", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+    "education": [],
+}
+
+
+class TestLoadJobs:
+    """Tests for reading job descriptions."""
+
+    def test_load_directory(self, tmp_path):
+        (tmp_path / "acme backend.txt").write_text("Python role")
+        (tmp_path / "beta.md").write_text("Go role")
+        (tmp_path / "notes.pdf").write_text("ignored")
+        (tmp_path / "empty.txt").write_text("  ")
+
+        jobs = load_jobs(str(tmp_path))
+        assert [job.job_id for job in jobs] == ["acme-backend", "beta"]
+        assert jobs[0].job_description == "Python role"
+
+    def test_load_jsonl(self, tmp_path):
+        path = tmp_path / "jds.jsonl"
+        path.write_text(
+            json.dumps({"id": "a", "job_description": "one"}) + "\n\n"
+            + json.dumps({"jd": "two"}) + "\n"
+            + json.dumps({"id": "a", "text": "three"}) + "\n"
+        )
+        jobs = load_jobs(str(path))
+        assert [job.job_id for job in jobs] == ["a", "jd-0003", "a-2"]
+        assert [job.job_description for job in jobs] == ["one", "two", "three"]
+
+    def test_jsonl_without_text_fails(self, tmp_path):
+        path = tmp_path / "jds.jsonl"
+        path.write_text(json.dumps({"id": "a"}) + "\n")
+        with pytest.raises(ValueError, match="no job_description"):
+            load_jobs(str(path))
+
+
+class TestBatchRunner:
+    """Tests for the batch pipeline."""
+
+    @pytest.fixture
+    def latex(self):
+        return LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+
+    def make_jobs(self, tmp_path, count):
+        jd_dir = tmp_path / "jds"
+        jd_dir.mkdir()
+        for i in range(count):
+            (jd_dir / f"jd{i:02d}.txt").write_text(f"Job {i}")
+        return load_jobs(str(jd_dir))
+
+    def test_writes_outputs_and_report(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = tmp_path / "out"
+
+        report = BatchRunner(ai, latex, str(out), compile=False).run(self.make_jobs(tmp_path, 3), {"name": "Jane"})
+
+        assert report["total"] == 3
+        assert report["succeeded"] == 3
+        assert report["stage_timings"]["generate"]["count"] == 3
+        assert report["stage_timings"]["compile"] is None
+        for i in range(3):
+            assert json.loads((out / f"jd{i:02d}.json").read_text()) == CONTENT
+            assert "Jane Doe" in (out / f"jd{i:02d}.tex").read_text()
+        assert json.loads((out / "batch_report.json").read_text())["succeeded"] == 3
+
+    def test_failures_are_recorded_per_stage(self, tmp_path, latex):
+        def generate(jd, *args, **kwargs):
+            if jd == "Job 1":
+                raise RuntimeError("AI down")
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False).run(self.make_jobs(tmp_path, 3), {})
+
+        assert report["succeeded"] == 2
+        assert report["failures"] == [{"id": "jd01", "stage": "generate", "error": "AI down"}]
+
+    def test_concurrency_is_bounded(self, tmp_path, latex):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_generate(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = slow_generate
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), concurrency=3, compile=False).run(
+            self.make_jobs(tmp_path, 9), {})
+
+        assert report["succeeded"] == 9
+        assert peak[0] == 3
+
+    def test_compile_uses_separate_work_dirs(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        work_dirs = []
+
+        def fake_compile(tex, deadline=None, work_dir=None):
+            work_dirs.append(work_dir)
+            os.makedirs(work_dir, exist_ok=True)
+            pdf = os.path.join(work_dir, "resume.pdf")
+            with open(pdf, "wb") as f:
+                f.write(b"%PDF")
+            return pdf, work_dir
+
+        out = tmp_path / "out"
+        with patch.object(latex, "pdflatex_available", return_value=True), \
+             patch.object(latex, "compile_pdf", side_effect=fake_compile):
+            report = BatchRunner(ai, latex, str(out)).run(self.make_jobs(tmp_path, 2), {})
+
+        assert report["succeeded"] == 2
+        assert len(set(work_dirs)) == 2
+        assert (out / "jd00.pdf").read_bytes() == b"%PDF"
+
+    def test_missing_pdflatex_skips_compile(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        with patch.object(latex, "pdflatex_available", return_value=False):
+            report = BatchRunner(ai, latex, str(tmp_path / "out")).run(self.make_jobs(tmp_path, 1), {})
+        assert report["succeeded"] == 1
+        assert "pdf" not in report["jobs"][0]["outputs"]
+
+
+class TestBatchCli:
+    """Tests for the batch subcommand."""
+
+    def test_cli_batch(self, tmp_path):
+        import cli
+        (tmp_path / "jds").mkdir()
+        (tmp_path / "jds" / "role.txt").write_text("Python role")
+        profile = tmp_path / "me.json"
+        profile.write_text(json.dumps({"name": "Jane"}))
+
+        with patch.object(cli, "SettingsManager") as settings, \
+             patch("engine.ai.AIEngine.generate_resume_content", return_value=CONTENT):
+            settings.return_value.get_all.return_value = {}
+            code = cli.main(["batch", "--jds", str(tmp_path / "jds"), "--profile", str(profile),
+                             "--out", str(tmp_path / "out"), "--no-compile"])
+
+        assert code == 0
+        assert (tmp_path / "out" / "role.tex").exists()
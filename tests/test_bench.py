@@ -0,0 +1,89 @@
+"""
+Tests for the benchmark suite (bench/run.py).
+"""
+import os
+import sys
+import json
+import subprocess
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import run as bench
+
+
+def results(**scenarios):
+    return {"scenarios": scenarios}
+
+
+class TestCompare:
+    """Tests for flagging regressions against a baseline."""
+
+    def test_slower_timing_is_a_regression(self):
+        rows = bench.compare(results(bridge={"mean_ms": 14.0, "calls": 50}),
+                             results(bridge={"mean_ms": 10.0, "calls": 50}), tolerance=0.25)
+        assert [(row["metric"], row["regression"]) for row in rows] == [("mean_ms", True)]
+        assert rows[0]["change"] == pytest.approx(0.4)
+
+    def test_lower_throughput_is_a_regression(self):
+        rows = bench.compare(results(batch={"c4_jobs_per_min": 60.0}), results(batch={"c4_jobs_per_min": 100.0}))
+        assert rows[0]["regression"] is True
+        rows = bench.compare(results(batch={"c4_jobs_per_min": 140.0}), results(batch={"c4_jobs_per_min": 100.0}))
+        assert rows[0]["regression"] is False
+
+    def test_noise_floor_and_ignored_metrics(self):
+        current = {"mean_ms": 0.09, "max_ms": 50.0, "renders_per_s": 10.0, "first_render_ms": 90.0}
+        baseline = {"mean_ms": 0.05, "max_ms": 1.0, "renders_per_s": 1000.0, "first_render_ms": 5.0}
+        rows = bench.compare(results(render=current), results(render=baseline))
+        # Only the mean is compared, and 0.04 ms is below the noise floor
+        assert [(row["metric"], row["regression"]) for row in rows] == [("mean_ms", False)]
+
+    def test_skipped_scenarios_are_not_compared(self):
+        assert bench.compare(results(compile={"skipped": "pdflatex not found"}),
+                             results(compile={"cold_s": 1.0})) == []
+
+    def test_baseline_from_another_commit_is_flagged(self):
+        assert bench.baseline_drift({"environment": {}}) is None
+        assert "not in this repository" in bench.baseline_drift({"environment": {"commit": "0000000"}})
+        older = subprocess.run(["git", "rev-parse", "--short", "HEAD~5"], cwd=bench.PROJECT_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        if not older:
+            pytest.skip("needs a git checkout with history")
+        assert "changed since" in bench.baseline_drift({"environment": {"commit": older}})
+
+    def test_median_over_repeats(self):
+        runs = [{"mean_ms": 3.0, "calls": 5}, {"mean_ms": 1.0, "calls": 5}, {"mean_ms": 2.0, "calls": 5}]
+        assert bench._median_metrics(runs) == {"mean_ms": 2.0, "calls": 5}
+
+
+class TestRun:
+    """Tests for running scenarios end to end."""
+
+    def test_render_results_and_baseline(self, tmp_path):
+        out, baseline = str(tmp_path / "results.json"), str(tmp_path / "baseline.json")
+        args = ["--only", "render", "--render-contexts", "5", "--repeat", "1", "--out", out, "--baseline", baseline]
+
+        assert bench.main(args + ["--update-baseline"]) == 0
+        stored = json.load(open(baseline))
+        assert stored["scenarios"]["render"]["contexts"] == 5
+        assert stored["environment"]["python"]
+
+        assert bench.main(args) == 0
+        assert {row["metric"] for row in json.load(open(out))["comparison"]} >= {"mean_ms", "p50_ms"}
+
+    def test_regression_sets_exit_status(self, tmp_path, monkeypatch):
+        timings = iter([10.0, 20.0])
+        monkeypatch.setitem(bench.SCENARIOS, "render", lambda options: {"mean_ms": next(timings)})
+        args = ["--only", "render", "--repeat", "1", "--out", str(tmp_path / "r.json"),
+                "--baseline", str(tmp_path / "baseline.json")]
+
+        assert bench.main(args + ["--update-baseline"]) == 0
+        assert bench.main(args) == 1
+        assert json.load(open(tmp_path / "r.json"))["comparison"][0]["regression"] is True
+
+    def test_batch_concurrency_levels(self, tmp_path):
+        options = bench.parse_args(["--only", "batch", "--batch-jobs", "4", "--concurrency", "1", "4",
+                                    "--profile", "instant", "--out", str(tmp_path / "r.json")])
+        metrics = bench.run(options)["scenarios"]["batch"]
+        assert metrics["c1_failed"] == 0 and metrics["c4_failed"] == 0
+        assert metrics["c1_jobs_per_min"] > 0 and metrics["c4_jobs_per_min"] > 0
@@ -0,0 +1,198 @@
+"""
+Tests for cancelling in-flight provider requests.
+A local HTTP server streams a response slowly; cancelling the token must
+release the caller within milliseconds and close the connection.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.cancel import CancelToken, CancelledError
+from engine.providers import OpenAIProvider, OllamaProvider, GoogleProvider
+
+# Upper bound for "released promptly"; typical values are a few milliseconds
+MAX_CANCEL_LATENCY_MS = 250
+
+
+class SlowStreamHandler(BaseHTTPRequestHandler):
+    """Streams one chunk every `interval` seconds for a long time, or stalls before headers."""
+    protocol_version = "HTTP/1.1"
+    stall_before_headers = False
+    interval = 0.2
+    disconnected = None
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.stall_before_headers:
+            time.sleep(3)
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.path.endswith("/chat/completions"):
+            line = b'data: {"choices": [{"delta": {"content": "word "}}]}\n\n'
+        elif "streamGenerateContent" in self.path:
+            line = b'data: {"candidates": [{"content": {"parts": [{"text": "word "}]}}]}\n\n'
+        else:
+            line = json.dumps({"response": "word ", "done": False}).encode() + b"\n"
+        try:
+            for _ in range(50):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(self.interval)
+        except OSError:
+            type(self).disconnected.set()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    SlowStreamHandler.stall_before_headers = False
+    SlowStreamHandler.interval = 0.2
+    SlowStreamHandler.disconnected = threading.Event()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowStreamHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def cancel_after(token, delay):
+    timer = threading.Timer(delay, token.cancel)
+    timer.start()
+    return timer
+
+
+class TestCancelToken:
+    """Tests for the CancelToken primitive."""
+
+    def test_callbacks_run_on_cancel(self):
+        token = CancelToken()
+        calls = []
+        token.add_callback(lambda: calls.append(1))
+        token.cancel()
+        token.cancel()
+        assert calls == [1]
+        assert token.cancelled
+
+    def test_callback_added_after_cancel_runs_immediately(self):
+        token = CancelToken()
+        token.cancel()
+        calls = []
+        token.add_callback(lambda: calls.append(1))
+        assert calls == [1]
+
+    def test_removed_callback_does_not_run(self):
+        token = CancelToken()
+        calls = []
+        remove = token.add_callback(lambda: calls.append(1))
+        remove()
+        token.cancel()
+        assert calls == []
+
+    def test_child_follows_parent(self):
+        parent = CancelToken()
+        child = parent.child()
+        parent.cancel()
+        assert child.cancelled
+
+    def test_child_does_not_cancel_parent(self):
+        parent = CancelToken()
+        parent.child().cancel()
+        assert not parent.cancelled
+
+    def test_raise_if_cancelled(self):
+        token = CancelToken()
+        token.raise_if_cancelled()
+        token.cancel()
+        with pytest.raises(CancelledError):
+            token.raise_if_cancelled()
+
+
+class TestProviderCancellation:
+    """Tests that cancelling aborts streaming provider requests."""
+
+    @pytest.mark.parametrize("provider_cls", [OpenAIProvider, OllamaProvider, GoogleProvider])
+    def test_cancel_mid_stream(self, server, provider_cls):
+        provider = provider_cls("key", "model", api_base=server)
+        token = CancelToken()
+        cancel_after(token, 0.3)
+
+        with pytest.raises(CancelledError):
+            provider.generate_text("sys", "prompt", cancel_token=token)
+
+        latency = token.latency_ms()
+        assert latency < MAX_CANCEL_LATENCY_MS, f"cancel took {latency:.1f} ms"
+        # The server notices the closed connection on its next write
+        assert SlowStreamHandler.disconnected.wait(2)
+
+    def test_cancel_before_headers(self, server):
+        SlowStreamHandler.stall_before_headers = True
+        provider = OpenAIProvider("key", "model", api_base=server)
+        token = CancelToken()
+        cancel_after(token, 0.2)
+
+        with pytest.raises(CancelledError):
+            provider.generate_text("sys", "prompt", cancel_token=token)
+        assert token.latency_ms() < MAX_CANCEL_LATENCY_MS
+
+    def test_gemini_cancel_closes_stream(self, server):
+        # After the first chunk the server goes quiet; only closing the stream ends the read
+        SlowStreamHandler.interval = 3
+        provider = GoogleProvider("key", "model", api_base=server)
+        token = CancelToken()
+        cancel_after(token, 0.3)
+
+        with pytest.raises(CancelledError):
+            provider.generate_text("sys", "prompt", cancel_token=token)
+
+        end = time.monotonic() + 1
+        while any(t.name == "GoogleProvider-call" for t in threading.enumerate()) and time.monotonic() < end:
+            time.sleep(0.01)
+        assert not any(t.name == "GoogleProvider-call" for t in threading.enumerate())
+
+    def test_already_cancelled_token_skips_request(self, server):
+        provider = OllamaProvider("", "model", api_base=server)
+        token = CancelToken()
+        token.cancel()
+        with pytest.raises(CancelledError):
+            provider.generate_text("sys", "prompt", cancel_token=token)
+
+
+class TestAIEngineCancellation:
+    """Tests that AIEngine propagates cancellation instead of wrapping it."""
+
+    def test_cancel_propagates_through_engine(self, server):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure('ollama', '', 'model')
+        ai.provider.api_base = server
+        token = CancelToken()
+        cancel_after(token, 0.2)
+
+        with pytest.raises(CancelledError):
+            ai.fix_latex_content("\\bad", "error", cancel_token=token)
+        assert token.latency_ms() < MAX_CANCEL_LATENCY_MS
+
+    def test_hedged_loser_is_cancelled(self, server):
+        from engine.ai import AIEngine
+
+        class Fast:
+            def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+                return "fixed"
+
+        ai = AIEngine()
+        ai.configure('ollama', '', 'model')
+        ai.provider.api_base = server
+        ai.secondary = Fast()
+        ai.hedger.initial_delay = 0.1
+
+        assert ai.fix_latex_content("\\bad", "error") == "fixed"
+        assert SlowStreamHandler.disconnected.wait(2)
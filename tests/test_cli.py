@@ -0,0 +1,132 @@
+"""
+Tests for the headless command line interface.
+"""
+import os
+import sys
+import io
+import json
+import logging
+import subprocess
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cli
+from engine.logs import ENV_LEVEL, shutdown_logging
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTENT = {
+    "name": "Jane Doe",
+    "summary": "Engineer.",
+    "skills": ["Python"],
+    "experience": [{"role": "Dev", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+    "education": [],
+}
+
+
+@pytest.fixture
+def settings():
+    with patch.object(cli, "SettingsManager") as manager:
+        manager.return_value.get_all.return_value = {}
+        yield manager
+
+
+def test_imports_without_gui():
+    """Neither the CLI nor the Bridge may pull in pywebview, the Gemini SDK or SciPy at import time."""
+    code = ("import sys, cli, api; "
+            "bad = [m for m in ('webview', 'google.genai', 'google.generativeai', 'scipy') if m in sys.modules]; "
+            "print(','.join(bad))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_generate_writes_tex(tmp_path, settings):
+    (tmp_path / "jd.txt").write_text("Python role")
+    (tmp_path / "me.json").write_text(json.dumps({"name": "Jane"}))
+
+    with patch("engine.ai.AIEngine.generate_resume_content", return_value=CONTENT) as generate:
+        code = cli.main(["generate", "--jd", str(tmp_path / "jd.txt"), "--profile", str(tmp_path / "me.json"),
+                         "--out", str(tmp_path / "resume.tex")])
+
+    assert code == 0
+    assert generate.call_args.args[:2] == ("Python role", {"name": "Jane"})
+    assert "Jane Doe" in (tmp_path / "resume.tex").read_text()
+
+
+def test_generate_json_to_stdout(tmp_path, settings, capsys):
+    (tmp_path / "jd.txt").write_text("Python role")
+    with patch("engine.ai.AIEngine.generate_resume_content", return_value=CONTENT):
+        code = cli.main(["generate", "--jd", str(tmp_path / "jd.txt"), "--json"])
+    assert code == 0
+    assert json.loads(capsys.readouterr().out) == CONTENT
+
+
+def test_render_from_stdin(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO(json.dumps(CONTENT)))
+    assert cli.main(["render", "--content", "-", "--template", "modern.tex"]) == 0
+    assert "Jane Doe" in capsys.readouterr().out
+
+
+def test_score_prints_match(tmp_path, capsys):
+    (tmp_path / "resume.json").write_text(json.dumps(CONTENT))
+    (tmp_path / "jd.txt").write_text("Python and Terraform engineer")
+
+    code = cli.main(["score", "--content", str(tmp_path / "resume.json"), "--jd", str(tmp_path / "jd.txt")])
+
+    assert code == 0
+    result = json.loads(capsys.readouterr().out)
+    assert "python" in result["matched"]
+    assert "terraform" in result["skills_missing"]
+
+
+def test_fix_uses_given_error_log(tmp_path, settings):
+    (tmp_path / "broken.tex").write_text("\\begin{document}")
+    (tmp_path / "error.log").write_text("! Missing \\end{document}")
+
+    with patch("engine.ai.AIEngine.fix_latex_content", return_value="\\begin{document}\\end{document}") as fix:
+        code = cli.main(["fix", str(tmp_path / "broken.tex"), "--error-log", str(tmp_path / "error.log"),
+                         "--out", str(tmp_path / "fixed.tex")])
+
+    assert code == 0
+    assert fix.call_args.args[1] == "! Missing \\end{document}"
+    assert (tmp_path / "fixed.tex").read_text().endswith("\\end{document}")
+
+
+def test_errors_exit_nonzero(tmp_path, settings, capsys):
+    (tmp_path / "jd.txt").write_text("Python role")
+    with patch("engine.ai.AIEngine.generate_resume_content", side_effect=RuntimeError("AI Provider Error: down")):
+        code = cli.main(["generate", "--jd", str(tmp_path / "jd.txt")])
+    assert code == 1
+    assert "AI Provider Error: down" in capsys.readouterr().err
+
+
+def test_batch_without_jobs_reports_to_stderr(tmp_path, settings, capsys):
+    (tmp_path / "jds").mkdir()
+    assert cli.main(["batch", "--jds", str(tmp_path / "jds"), "--out", str(tmp_path / "out")]) == 1
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "no job descriptions found" in err
+
+
+@pytest.mark.parametrize("env, argv, expected", [
+    ("WARNING", [], logging.WARNING),
+    (None, [], logging.INFO),
+    ("WARNING", ["-v"], logging.DEBUG),
+])
+def test_log_level(env, argv, expected, settings, monkeypatch, capsys):
+    """ATS_LOG_LEVEL applies unless -v asks for debug output; INFO when neither is given."""
+    if env:
+        monkeypatch.setenv(ENV_LEVEL, env)
+    else:
+        monkeypatch.delenv(ENV_LEVEL, raising=False)
+    monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(CONTENT)))
+    root_level = logging.getLogger().level
+    try:
+        assert cli.main(argv + ["render", "--content", "-", "--template", "modern.tex"]) == 0
+        assert logging.getLogger().level == expected
+    finally:
+        shutdown_logging()
+        logging.getLogger().setLevel(root_level)
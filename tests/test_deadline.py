@@ -0,0 +1,160 @@
+"""
+Tests for end-to-end deadline budgets.
+Verifies that each stage gets the remaining budget and fails fast with a
+stage-specific error once it is used up.
+"""
+import os
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.deadline import Deadline, DeadlineExceeded
+
+
+class HungHandler(BaseHTTPRequestHandler):
+    """Accepts the request and never answers, like a hung provider."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        time.sleep(5)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hung_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), HungHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestDeadline:
+    """Tests for the Deadline object."""
+
+    def test_remaining_decreases(self):
+        deadline = Deadline(10)
+        assert 9 < deadline.remaining() <= 10
+        assert not deadline.expired
+
+    def test_timeout_for_is_capped(self):
+        assert Deadline(100).timeout_for("stage", cap=30) == 30
+        assert Deadline(5).timeout_for("stage", cap=30) <= 5
+
+    def test_expired_raises_with_stage(self):
+        deadline = Deadline(0)
+        with pytest.raises(DeadlineExceeded) as exc:
+            deadline.timeout_for("PDF compilation (pass 2)")
+        assert exc.value.stage == "PDF compilation (pass 2)"
+        assert "PDF compilation (pass 2)" in str(exc.value)
+
+
+class TestProviderTimeouts:
+    """Tests that provider calls never outlive their timeout."""
+
+    def test_hung_provider_times_out(self, hung_server):
+        from engine.providers import OllamaProvider
+        provider = OllamaProvider("", "model", api_base=hung_server)
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            provider.generate_text("sys", "prompt", timeout=0.3)
+        assert time.monotonic() - start < 1.0
+
+    def test_engine_reports_stage(self, hung_server):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure('ollama', '', 'model')
+        ai.provider.api_base = hung_server
+
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded) as exc:
+            ai.generate_resume_content("JD", {}, deadline=Deadline(0.3))
+        assert exc.value.stage == "AI generation"
+        assert time.monotonic() - start < 1.0
+
+    def test_exhausted_budget_skips_call(self):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure('ollama', '', 'model')
+        with patch.object(ai.provider, 'generate_text') as call:
+            with pytest.raises(DeadlineExceeded) as exc:
+                ai.fix_latex_content("src", "log", deadline=Deadline(0))
+        call.assert_not_called()
+        assert exc.value.stage == "AI fix"
+
+
+class TestCompileDeadline:
+    """Tests that pdflatex passes get the remaining budget."""
+
+    def test_compile_fails_fast_when_budget_spent(self, tmp_path, monkeypatch):
+        from engine.latex import LatexEngine
+        monkeypatch.chdir(tmp_path)
+        latex = LatexEngine()
+        with patch.object(latex, '_ensure_pdflatex_path', return_value=True), \
+             patch('engine.latex.subprocess.Popen') as popen:
+            with pytest.raises(DeadlineExceeded) as exc:
+                latex.compile_pdf("\\documentclass{article}", deadline=Deadline(0))
+        popen.assert_not_called()
+        assert exc.value.stage == "PDF compilation (pass 1)"
+
+    def test_miktex_refresh_timeout_names_the_stage(self, tmp_path, monkeypatch):
+        import subprocess
+        from engine.latex import LatexEngine
+        monkeypatch.chdir(tmp_path)
+        latex = LatexEngine()
+        timeouts = []
+
+        def hung_refresh(command, timeout=None, **kwargs):
+            timeouts.append(timeout)
+            raise subprocess.TimeoutExpired(command, timeout)
+
+        with patch.object(latex, '_ensure_pdflatex_path', return_value=True), \
+             patch('engine.latex.subprocess.Popen') as popen, \
+             patch('engine.latex.shutil.which', return_value="/usr/bin/initexmf"), \
+             patch('engine.latex.subprocess.run', side_effect=hung_refresh):
+            # pdflatex fails, which triggers the MiKTeX refresh
+            popen.return_value.communicate.return_value = ("", "")
+            popen.return_value.returncode = 1
+            with pytest.raises(DeadlineExceeded) as exc:
+                latex.compile_pdf("\\documentclass{article}", deadline=Deadline(60))
+        assert exc.value.stage == "MiKTeX refresh (--update-fndb)"
+        assert len(timeouts) == 1 and 0 < timeouts[0] <= 60
+
+
+class TestBridgeDeadline:
+    """Tests that one user action shares one budget across its stages."""
+
+    def test_generate_and_compile_share_the_deadline(self, tmp_path):
+        import api
+        settings = {"provider": "openai", "apiKey": "sk-test"}
+        with patch.object(api, "SettingsManager") as manager:
+            manager.return_value.get_all.return_value = settings
+            manager.return_value.get.side_effect = lambda key, default=None: settings.get(key, default)
+            bridge = api.Bridge()
+        pdf = tmp_path / "resume.pdf"
+        pdf.write_bytes(b"%PDF")
+        deadlines = []
+
+        def generate(*args, deadline=None, **kwargs):
+            deadlines.append(deadline)
+            return {"name": "Jane Doe", "summary": "", "skills": [], "experience": [], "education": []}
+
+        def compile_pdf(tex, deadline=None, work_dir=None):
+            deadlines.append(deadline)
+            return str(pdf), str(tmp_path)
+
+        with patch.object(bridge.ai, "generate_resume_content", side_effect=generate), \
+             patch.object(bridge.latex, "compile_pdf", side_effect=compile_pdf):
+            result = bridge.generate_latex_source({"job_description": "Python", "template_name": "modern.tex",
+                                                   "user_data": "{}", "compile": True})
+
+        assert result["success"] and result["pdf_base64"]
+        assert len(deadlines) == 2 and deadlines[0] is deadlines[1]
@@ -0,0 +1,166 @@
+"""
+Tests for near-duplicate job description detection in batch runs.
+"""
+import os
+import sys
+import json
+import time
+from unittest.mock import MagicMock
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.dedup import DuplicateIndex, MinHasher, find_duplicates, jaccard, lsh_bands, shingles
+from engine.batch import BatchRunner, load_jobs
+from engine.latex import LatexEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POSTING = (
+    "Senior Backend Engineer at Acme. You will design and build streaming data pipelines with Kafka and "
+    "Python, run services on Kubernetes in AWS, and mentor engineers on the platform team. We are looking "
+    "for five or more years of backend experience, strong SQL skills, and a track record of shipping "
+    "reliable distributed systems. Experience with Terraform and observability tooling is a plus."
+)
+REPOST = POSTING.replace("Acme.", "Acme (via Talent Partners).") + " Apply today!"
+OTHER = (
+    "Pastry Chef at Cafe Lune. Prepare laminated doughs, croissants and seasonal tarts for a busy "
+    "morning service, manage ingredient orders, and train junior bakers on plating and food safety."
+)
+
+CONTENT = {
+    "name": "Jane Doe",
+    "summary": "Engineer.",
+    "skills": ["Python"],
+    "experience": [{"role": "Dev", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+    "education": [],
+}
+
+
+class TestMinHash:
+    """Tests for shingling, signatures and the LSH index."""
+
+    def test_shingles_ignore_case_and_punctuation(self):
+        assert shingles("Python, Kafka and AWS!") == shingles("python kafka AND aws")
+        assert shingles("two words") == {"two words"}
+        assert shingles("") == set()
+
+    def test_signature_estimates_jaccard(self):
+        a, b = shingles(POSTING), shingles(REPOST)
+        hasher = MinHasher(num_perm=256)
+        estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+        assert estimate == pytest.approx(jaccard(a, b), abs=0.1)
+
+    def test_band_cutoff_below_threshold(self):
+        bands, rows = lsh_bands(0.85)
+        assert bands * rows == 128
+        assert (1 / bands) ** (1 / rows) <= 0.85
+
+    def test_index_finds_only_near_duplicates(self):
+        index = DuplicateIndex(0.8)
+        index.add("posting", POSTING)
+        index.add("other", OTHER)
+        matches = index.query(REPOST)
+        assert [key for key, _ in matches] == ["posting"]
+        assert matches[0][1] >= 0.8
+        assert index.query("Data analyst with Tableau and Excel skills for a retail chain.") == []
+
+    def test_find_duplicates_prefers_generated(self):
+        texts = [("a", POSTING), ("b", REPOST), ("c", OTHER)]
+        assert set(find_duplicates(texts, 0.8)) == {"b"}
+        assert find_duplicates(texts, 0.8)["b"][0] == "a"
+        assert find_duplicates(texts, 0.8, preferred=["b"])["a"][0] == "b"
+        assert find_duplicates(texts, 0.99) == {}
+
+
+class TestBatchDedup:
+    """Tests for content reuse between near-duplicate JDs."""
+
+    @pytest.fixture
+    def latex(self):
+        return LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+
+    def make_jobs(self, tmp_path, texts):
+        jd_dir = tmp_path / "jds"
+        jd_dir.mkdir(exist_ok=True)
+        for name, text in texts.items():
+            (jd_dir / f"{name}.txt").write_text(text)
+        return load_jobs(str(jd_dir))
+
+    def test_duplicate_reuses_content(self, tmp_path, latex):
+        def generate(jd, *args, **kwargs):
+            time.sleep(0.2)  # the repost is claimed while the original is still generating
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+        jobs = self.make_jobs(tmp_path, {"a-posting": POSTING, "b-repost": REPOST, "c-other": OTHER})
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False, concurrency=3).run(jobs, {})
+
+        assert ai.generate_resume_content.call_count == 2
+        assert report["succeeded"] == 3
+        assert report["dedup"]["hits"] == 1
+        assert report["dedup"]["pairs"][0]["id"] == "b-repost"
+        assert report["dedup"]["pairs"][0]["duplicate_of"] == "a-posting"
+        assert report["dedup"]["tokens_saved"] > 0
+        assert json.loads((tmp_path / "out" / "b-repost.json").read_text()) == CONTENT
+
+    def test_later_run_reuses_earlier_content(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = str(tmp_path / "out")
+        BatchRunner(ai, latex, out, compile=False).run(self.make_jobs(tmp_path, {"b-posting": POSTING}), {})
+
+        jobs = self.make_jobs(tmp_path, {"a-repost": REPOST})
+        report = BatchRunner(ai, latex, out, compile=False).run(jobs, {})
+
+        assert ai.generate_resume_content.call_count == 1
+        pair = report["dedup"]["pairs"][0]
+        assert (pair["id"], pair["duplicate_of"]) == ("a-repost", "b-posting")
+
+    def test_failed_original_falls_back_to_generation(self, tmp_path, latex):
+        def generate(jd, *args, **kwargs):
+            if jd == POSTING:
+                raise RuntimeError("AI down")
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+        jobs = self.make_jobs(tmp_path, {"a-posting": POSTING, "b-repost": REPOST})
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False, concurrency=2).run(jobs, {})
+
+        assert report["succeeded"] == 1
+        assert report["dedup"]["hits"] == 0
+        assert ai.generate_resume_content.call_count == 2
+
+    def test_fallback_gets_its_own_time_budget(self, tmp_path, latex):
+        budgets = {}
+
+        def generate(jd, *args, deadline=None, **kwargs):
+            if jd == POSTING:
+                time.sleep(0.4)  # the original stalls, then fails
+                raise RuntimeError("AI down")
+            budgets[jd] = deadline.remaining()
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+        jobs = self.make_jobs(tmp_path, {"a-posting": POSTING, "b-repost": REPOST})
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False, concurrency=2,
+                             time_budget=0.6).run(jobs, {})
+
+        assert report["succeeded"] == 1
+        assert budgets[REPOST] > 0.5
+
+    def test_threshold_zero_disables(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        jobs = self.make_jobs(tmp_path, {"a-posting": POSTING, "b-repost": REPOST})
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False, dedup_threshold=0).run(jobs, {})
+
+        assert ai.generate_resume_content.call_count == 2
+        assert report["dedup"]["hits"] == 0
@@ -0,0 +1,89 @@
+"""
+Tests for the Gemini provider's client caching and system instructions.
+"""
+import os
+import sys
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import providers
+from engine.providers import GoogleProvider
+
+
+class FakeClient:
+    """Records generate_content_stream calls instead of reaching the API."""
+
+    created = []
+
+    def __init__(self, api_key=None, http_options=None):
+        self.api_key = api_key
+        self.http_options = http_options
+        self.calls = []
+        self.reply = "Hello"
+        self.models = SimpleNamespace(generate_content_stream=self.generate_content_stream)
+        FakeClient.created.append(self)
+
+    def generate_content_stream(self, model, contents, config):
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        half = len(self.reply) // 2
+        return iter([SimpleNamespace(text=self.reply[:half]), SimpleNamespace(text=None),
+                     SimpleNamespace(text=self.reply[half:])])
+
+
+@pytest.fixture(autouse=True)
+def fake_sdk(monkeypatch):
+    monkeypatch.setattr(providers, "_GEMINI_CLIENTS", {})
+    FakeClient.created = []
+    with patch("google.genai.Client", FakeClient):
+        yield
+
+
+def test_client_cached_per_key_and_model():
+    a = GoogleProvider("key-1", "gemini-2.0-flash")
+    b = GoogleProvider("key-1", "gemini-2.0-flash")
+    c = GoogleProvider("key-2", "gemini-2.0-flash")
+    d = GoogleProvider("key-1", "gemini-1.5-pro")
+
+    assert a.client is b.client
+    assert len({id(p.client) for p in (a, c, d)}) == 3
+    assert c.client.api_key == "key-2"
+
+
+def test_concurrent_construction_builds_one_client():
+    barrier = threading.Barrier(8)
+
+    def build():
+        barrier.wait()
+        GoogleProvider("key-1", "gemini-2.0-flash")
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(FakeClient.created) == 1
+
+
+def test_system_prompt_sent_as_system_instruction():
+    provider = GoogleProvider("key-1", "gemini-2.0-flash")
+    assert provider.generate_text("You write resumes.", "Job: Python dev") == "Hello"
+
+    call = provider.client.calls[0]
+    assert call["contents"] == "Job: Python dev"
+    assert call["config"].system_instruction == "You write resumes."
+    assert call["config"].response_mime_type is None
+
+
+def test_json_mode_and_timeout():
+    provider = GoogleProvider("key-1", "gemini-2.0-flash")
+    provider.client.reply = json.dumps({"name": "Jane"})
+
+    assert provider.generate_json("system", "prompt", timeout=12) == {"name": "Jane"}
+    config = provider.client.calls[0]["config"]
+    assert config.response_mime_type == "application/json"
+    assert config.http_options.timeout == 12000
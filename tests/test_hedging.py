@@ -0,0 +1,177 @@
+"""
+Tests for latency-based request hedging between AI providers.
+"""
+import os
+import sys
+import time
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.hedging import Hedger, LatencyTracker
+
+
+class StubProvider:
+    """Provider double that answers after a fixed delay."""
+
+    def __init__(self, reply, delay=0.0, error=None):
+        self.reply = reply
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.reply
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        return self.generate_text(system, prompt, cancel_token, timeout)
+
+
+class TestLatencyTracker:
+    """Tests for the rolling latency window."""
+
+    def test_percentile(self):
+        tracker = LatencyTracker(window=100)
+        for value in range(1, 101):
+            tracker.record(value / 100.0)
+        assert tracker.percentile(95) == pytest.approx(0.95)
+        assert tracker.percentile(50) == pytest.approx(0.50)
+
+    def test_empty_percentile(self):
+        assert LatencyTracker().percentile(95) is None
+
+    def test_tail_mean(self):
+        tracker = LatencyTracker()
+        for value in (1.0, 2.0, 4.0, 6.0):
+            tracker.record(value)
+        assert tracker.tail_mean(3.0) == pytest.approx(5.0)
+        assert tracker.tail_mean(10.0) is None
+
+
+class TestHedger:
+    """Tests for hedged provider calls."""
+
+    def test_fast_primary_wins_without_hedge(self):
+        hedger = Hedger(initial_delay=0.5)
+        primary, secondary = StubProvider("primary"), StubProvider("secondary")
+
+        assert hedger.call(primary, secondary, "generate_text", "sys", "prompt") == "primary"
+        assert secondary.calls == 0
+        stats = hedger.stats.snapshot()
+        assert stats["primary_wins"] == 1
+        assert stats["hedges_fired"] == 0
+
+    def test_slow_primary_is_hedged(self):
+        hedger = Hedger(initial_delay=0.05)
+        primary = StubProvider("primary", delay=1.0)
+        secondary = StubProvider("secondary", delay=0.01)
+
+        start = time.monotonic()
+        result = hedger.call(primary, secondary, "generate_text", "sys", "prompt")
+
+        assert result == "secondary"
+        assert time.monotonic() - start < 0.5
+        stats = hedger.stats.snapshot()
+        assert stats["hedged_wins"] == 1
+        assert stats["hedges_fired"] == 1
+
+    def test_losing_primary_is_recorded_as_lower_bound(self):
+        hedger = Hedger(initial_delay=0.05, min_samples=10)
+        primary = StubProvider("primary", delay=0.3)
+        secondary = StubProvider("secondary", delay=0.05)
+
+        assert hedger.call(primary, secondary, "generate_text", "sys", "prompt") == "secondary"
+        time.sleep(0.4)  # the cancelled primary finishes without adding a second sample
+
+        assert len(hedger.tracker) == 1
+        assert hedger.tracker.percentile(95) >= 0.09
+        # Later hedged wins measure their savings against the slow primaries
+        hedger.tracker.record(0.3)
+        assert hedger.call(primary, secondary, "generate_text", "sys", "prompt") == "secondary"
+        assert hedger.stats.snapshot()["latency_saved_s"] > 0
+
+    def test_failing_primary_fails_over_immediately(self):
+        hedger = Hedger(initial_delay=5.0)
+        primary = StubProvider(None, error=RuntimeError("boom"))
+        secondary = StubProvider("secondary")
+
+        start = time.monotonic()
+        assert hedger.call(primary, secondary, "generate_text", "sys", "prompt") == "secondary"
+        assert time.monotonic() - start < 1.0
+        assert hedger.stats.snapshot()["failovers"] == 1
+
+    def test_invalid_result_is_not_a_winner(self):
+        hedger = Hedger(initial_delay=0.01)
+        primary = StubProvider("not json", delay=0.0)
+        secondary = StubProvider({"name": "Jane"}, delay=0.05)
+
+        result = hedger.call(primary, secondary, "generate_json", "sys", "prompt",
+                             is_valid=lambda r: isinstance(r, dict))
+        assert result == {"name": "Jane"}
+
+    def test_both_failing_raises_primary_error(self):
+        hedger = Hedger(initial_delay=0.01)
+        primary = StubProvider(None, error=RuntimeError("primary down"))
+        secondary = StubProvider(None, error=RuntimeError("secondary down"))
+
+        with pytest.raises(RuntimeError, match="primary down"):
+            hedger.call(primary, secondary, "generate_text", "sys", "prompt")
+
+    def test_delay_follows_percentile_once_warm(self):
+        hedger = Hedger(percentile=90, initial_delay=8.0, min_samples=3)
+        assert hedger.hedge_delay() == 8.0
+        for value in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+            hedger.tracker.record(value)
+        assert hedger.hedge_delay() == pytest.approx(0.9)
+
+
+class TestAIEngineHedging:
+    """Tests for hedging configuration on AIEngine."""
+
+    def test_configure_from_settings(self):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure_from_settings({
+            'provider': 'openai', 'apiKey': 'key', 'model': 'gpt-4o-mini',
+            'hedge_enabled': True, 'hedge_provider': 'ollama', 'hedge_model': 'llama3', 'hedge_percentile': 90
+        })
+        assert ai.secondary is not None
+        assert ai.secondary.model == 'llama3'
+        assert ai.secondary.api_key == ''
+        assert ai.hedger.percentile == 90
+
+        ai.configure_from_settings({'provider': 'openai', 'apiKey': 'key'})
+        assert ai.secondary is None
+
+    def test_primary_key_stays_with_its_provider(self):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        settings = {'provider': 'openai', 'apiKey': 'sk-primary', 'model': 'gpt-4o-mini',
+                    'hedge_enabled': True, 'hedge_provider': 'google', 'hedge_model': 'gemini-2.0-flash'}
+        ai.configure_from_settings(settings)
+        assert ai.secondary is None
+
+        ai.configure_from_settings({**settings, 'hedge_api_key': 'g-key'})
+        assert ai.secondary.api_key == 'g-key'
+
+        ai.configure_from_settings({**settings, 'hedge_provider': 'openai', 'hedge_model': 'gpt-4o'})
+        assert ai.secondary.api_key == 'sk-primary'
+
+        ai.configure_from_settings({**settings, 'hedge_provider': 'openai', 'hedge_base_url': 'http://other/v1'})
+        assert ai.secondary is None
+
+    def test_generate_uses_secondary_when_primary_slow(self):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure('openai', 'key', 'gpt-4o-mini')
+        resume = {"summary": "s", "skills": ["Python"], "experience": [], "education": []}
+        ai.provider = StubProvider({**resume, "name": "slow"}, delay=1.0)
+        ai.secondary = StubProvider({**resume, "name": "fast"})
+        ai.hedger.initial_delay = 0.05
+
+        assert ai.generate_resume_content("JD", {})["name"] == "fast"
+        assert ai.get_hedge_stats()["hedged_wins"] == 1
@@ -0,0 +1,214 @@
+"""
+Tests for the durable SQLite job queue and resumable batch runs.
+"""
+import os
+import sys
+import time
+import sqlite3
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.batch import BatchJob, BatchRunner, QUEUE_FILENAME
+from engine.jobqueue import JobQueue, LeaseLostError
+from engine.latex import LatexEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTENT = {"name": "Jane Doe", "summary": "Engineer.", "skills": ["Python"], "experience": [], "education": []}
+
+
+def make_jobs(count):
+    return [BatchJob(f"jd{i:02d}", f"Job {i}") for i in range(count)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    q.add(make_jobs(3))
+    q.prepare_run("rendered")
+    yield q
+    q.close()
+
+
+class TestJobQueue:
+    """Tests for claiming, leases and stage tracking."""
+
+    def test_uses_wal(self, queue):
+        conn = sqlite3.connect(queue.path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    def test_claims_each_job_once(self, queue):
+        claimed = []
+        lock = threading.Lock()
+
+        def worker(owner):
+            while True:
+                job = queue.claim(owner)
+                if job is None:
+                    return
+                with lock:
+                    claimed.append(job.job_id)
+                queue.advance(job.job_id, owner, "rendered", done=True)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == ["jd00", "jd01", "jd02"]
+        assert queue.counts() == {"done": 3}
+
+    def test_stage_artifacts_are_persisted(self, queue):
+        job = queue.claim("w1")
+        queue.advance(job.job_id, "w1", "generated", content=CONTENT)
+
+        reopened = JobQueue(queue.path)
+        saved = reopened.get(job.job_id)
+        assert saved.stage == "generated"
+        assert saved.content == CONTENT
+        reopened.close()
+
+    def test_expired_lease_is_retried(self, queue):
+        queue.lease_seconds = 0.01
+        job = queue.claim("dead-worker")
+        time.sleep(0.02)
+
+        retried = queue.claim("w2")
+        assert retried.job_id == job.job_id
+        assert retried.attempts == 2
+        with pytest.raises(LeaseLostError):
+            queue.advance(job.job_id, "dead-worker", "generated")
+
+    def test_gives_up_after_max_attempts(self, queue):
+        queue.lease_seconds = 0.01
+        queue.max_attempts = 2
+        queue.claim("w1")
+        time.sleep(0.02)
+        queue.claim("w2")
+        time.sleep(0.02)
+
+        queue.claim("w3")
+        failed = queue.get("jd00")
+        assert failed.status == "failed"
+        assert failed.error_stage == "lease"
+
+    def test_changed_job_description_starts_over(self, queue):
+        for owner in ("w1", "w2"):
+            job = queue.claim(owner)
+            queue.advance(job.job_id, owner, "generated", content=CONTENT)
+
+        queue.add([BatchJob("jd00", "Job 0"), BatchJob("jd01", "A different posting")])
+        assert queue.get("jd00").stage == "generated"
+        changed = queue.get("jd01")
+        assert changed.stage == "queued"
+        assert changed.content is None
+
+    def test_changed_fingerprint_starts_over(self, queue):
+        job = queue.claim("w1")
+        queue.advance(job.job_id, "w1", "generated", content=CONTENT)
+
+        queue.add([BatchJob("jd00", "Job 0")], fingerprint="other-profile")
+        assert queue.get("jd00").stage == "queued"
+        assert queue.get("jd00").fingerprint == "other-profile"
+
+    def test_scoped_to_job_ids(self, queue):
+        queue.add([BatchJob("jd09", "Job 9")])
+        queue.prepare_run("rendered", ["jd09"])
+
+        job = queue.claim("w1", ["jd09"])
+        assert job.job_id == "jd09"
+        assert queue.claim("w1", ["jd09"]) is None
+        assert queue.counts(["jd09"]) == {"leased": 1}
+        assert [job.job_id for job in queue.all(["jd00", "jd09"])] == ["jd00", "jd09"]
+
+
+class TestResumableBatch:
+    """Tests that a restarted batch continues where it stopped."""
+
+    @pytest.fixture
+    def latex(self):
+        return LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+
+    def test_restart_does_not_repeat_ai_calls(self, tmp_path, latex):
+        def generate(jd, *args, **kwargs):
+            if jd == "Job 2":
+                raise RuntimeError("AI down")
+            return CONTENT
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+        out = str(tmp_path / "out")
+        first = BatchRunner(ai, latex, out, compile=False).run(make_jobs(3), {})
+        assert first["succeeded"] == 2
+        assert os.path.exists(os.path.join(out, QUEUE_FILENAME))
+
+        ai.generate_resume_content.reset_mock(side_effect=True)
+        ai.generate_resume_content.return_value = CONTENT
+        second = BatchRunner(ai, latex, out, compile=False).run(make_jobs(3), {})
+
+        assert second["succeeded"] == 3
+        assert second["already_done"] == 2
+        assert ai.generate_resume_content.call_count == 1
+
+    def test_compile_failure_resumes_without_generating(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = str(tmp_path / "out")
+
+        with patch.object(latex, "pdflatex_available", return_value=True), \
+             patch.object(latex, "compile_pdf", side_effect=RuntimeError("pdflatex crashed")):
+            first = BatchRunner(ai, latex, out).run(make_jobs(1), {})
+        assert first["failures"][0]["stage"] == "compile"
+
+        def fake_compile(tex, deadline=None, work_dir=None):
+            os.makedirs(work_dir, exist_ok=True)
+            pdf = os.path.join(work_dir, "resume.pdf")
+            with open(pdf, "wb") as f:
+                f.write(b"%PDF")
+            return pdf, work_dir
+
+        with patch.object(latex, "pdflatex_available", return_value=True), \
+             patch.object(latex, "compile_pdf", side_effect=fake_compile):
+            second = BatchRunner(ai, latex, out).run(make_jobs(1), {})
+
+        assert second["succeeded"] == 1
+        assert second["jobs"][0]["resumed_from"] == "rendered"
+        assert ai.generate_resume_content.call_count == 1
+
+    def test_changed_profile_or_prompt_regenerates(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = str(tmp_path / "out")
+        BatchRunner(ai, latex, out, compile=False).run(make_jobs(2), {"name": "Jane"})
+        BatchRunner(ai, latex, out, compile=False).run(make_jobs(2), {"name": "Jane"})
+        assert ai.generate_resume_content.call_count == 2
+
+        report = BatchRunner(ai, latex, out, compile=False).run(make_jobs(2), {"name": "Jane", "skills": ["Go"]})
+        assert report["already_done"] == 0
+        BatchRunner(ai, latex, out, compile=False, system_prompt="Be brief.").run(make_jobs(2), {"name": "Jane"})
+        assert ai.generate_resume_content.call_count == 6
+
+    def test_report_covers_only_this_run(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = str(tmp_path / "out")
+        jobs = make_jobs(3)
+        BatchRunner(ai, latex, out, compile=False).run(jobs[:2], {})
+
+        report = BatchRunner(ai, latex, out, compile=False).run(jobs[2:], {})
+
+        assert (report["total"], report["succeeded"], report["already_done"]) == (1, 1, 0)
+        assert [entry["id"] for entry in report["ranking"]] == ["jd02"]
+
+    def test_fresh_discards_progress(self, tmp_path, latex):
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = CONTENT
+        out = str(tmp_path / "out")
+        BatchRunner(ai, latex, out, compile=False).run(make_jobs(2), {})
+        BatchRunner(ai, latex, out, compile=False, fresh=True).run(make_jobs(2), {})
+        assert ai.generate_resume_content.call_count == 4
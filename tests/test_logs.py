@@ -0,0 +1,113 @@
+"""
+Tests for the queue-based logging pipeline.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import logging.handlers
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.logs import configure_logging, configure_logging_from_settings, shutdown_logging, default_level, ENV_LEVEL
+from engine.tracing import tracer
+
+
+@pytest.fixture(autouse=True)
+def restore_logging(monkeypatch):
+    monkeypatch.delenv(ENV_LEVEL, raising=False)
+    levels = {name: logging.getLogger(name).level for name in (None, "engine.latex", "urllib3")}
+    yield
+    shutdown_logging()
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestPipeline:
+    """Tests for JSON Lines output, levels and rotation."""
+
+    def test_json_lines_with_trace_and_exception(self, tmp_path):
+        path = tmp_path / "logs" / "app.jsonl"
+        configure_logging("INFO", log_file=str(path), console=False)
+        logger = logging.getLogger("engine.test")
+
+        logger.debug("hidden")
+        with tracer.span("compile_pdf") as span:
+            logger.info("compiling %s", "resume.tex")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+        shutdown_logging()
+
+        first, second = read_lines(path)
+        assert first["message"] == "compiling resume.tex"
+        assert first["logger"] == "engine.test" and first["level"] == "INFO"
+        assert first["trace_id"] == span.trace.trace_id and first["span"] == "compile_pdf"
+        assert "ValueError: boom" in second["exception"]
+
+    def test_per_module_levels(self, tmp_path):
+        path = tmp_path / "app.jsonl"
+        configure_logging("WARNING", {"engine.latex": "debug"}, log_file=str(path), console=False)
+        logging.getLogger("engine.latex").debug("Executing: pdflatex")
+        logging.getLogger("engine.ai").info("not written")
+        logging.getLogger("urllib3.connectionpool").info("not written either")
+        shutdown_logging()
+
+        assert [line["message"] for line in read_lines(path)] == ["Executing: pdflatex"]
+
+    def test_files_are_rotated(self, tmp_path):
+        path = tmp_path / "app.jsonl"
+        configure_logging("INFO", log_file=str(path), console=False, max_bytes=500, backups=2)
+        for i in range(50):
+            logging.getLogger("engine.test").info(f"line {i}")
+        shutdown_logging()
+
+        assert sorted(os.listdir(tmp_path)) == ["app.jsonl", "app.jsonl.1", "app.jsonl.2"]
+        assert read_lines(path)[-1]["message"] == "line 49"
+
+    def test_slow_output_does_not_block_callers(self, tmp_path, monkeypatch):
+        def slow_emit(handler, record):
+            time.sleep(0.05)
+        monkeypatch.setattr(logging.handlers.RotatingFileHandler, "emit", slow_emit)
+        configure_logging("INFO", log_file=str(tmp_path / "app.jsonl"), console=False)
+
+        started = time.perf_counter()
+        for i in range(10):
+            logging.getLogger("engine.test").info(f"line {i}")
+        assert time.perf_counter() - started < 0.05
+
+
+class TestSettings:
+    """Tests for choosing levels and files from settings."""
+
+    def test_frozen_builds_default_to_info(self, monkeypatch):
+        monkeypatch.setattr(sys, "frozen", True, raising=False)
+        assert default_level() == "INFO"
+        monkeypatch.setenv(ENV_LEVEL, "WARNING")
+        assert default_level() == "WARNING"
+        monkeypatch.delattr(sys, "frozen")
+        monkeypatch.delenv(ENV_LEVEL)
+        assert default_level() == "DEBUG"
+
+    def test_settings_and_overrides(self, tmp_path):
+        path = tmp_path / "settings.jsonl"
+        listener = configure_logging_from_settings({"log_level": "ERROR", "log_file": str(path)}, console=False)
+        assert logging.getLogger().level == logging.ERROR
+        assert [handler.baseFilename for handler in listener.handlers] == [str(path)]
+
+        other = tmp_path / "cli.jsonl"
+        listener = configure_logging_from_settings({"log_level": "ERROR", "log_file": str(path)}, level="DEBUG",
+                                                   log_file=str(other), console=False)
+        assert logging.getLogger().level == logging.DEBUG
+        assert [handler.baseFilename for handler in listener.handlers] == [str(other)]
+
+    def test_unknown_level_falls_back(self):
+        configure_logging_from_settings({"log_level": "LOUD", "log_file": ""}, console=False)
+        assert logging.getLogger().level == logging.DEBUG
@@ -0,0 +1,156 @@
+"""
+Tests for Ollama keep-alive, model options, warm-up and resident-model status.
+"""
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.ai import AIEngine
+from engine.providers import OllamaProvider, ProviderRegistry
+from config import DEFAULT_OLLAMA_KEEP_ALIVE
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Records request bodies; a prompt-less /api/generate "loads" the model."""
+    requests = []
+    loaded = set()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        data = (json.dumps(body) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        FakeOllamaHandler.requests.append(body)
+        FakeOllamaHandler.loaded.add(body["model"])
+        if "prompt" not in body:
+            return self._send({"model": body["model"], "response": "", "done": True, "done_reason": "load"})
+        return self._send({"response": '{"ok": true}', "done": True})
+
+    def do_GET(self):
+        models = [{"name": name, "model": name, "size_vram": 1024, "expires_at": "2030-01-01T00:00:00Z"}
+                  for name in sorted(FakeOllamaHandler.loaded)]
+        self._send({"models": models})
+
+
+@pytest.fixture
+def server():
+    FakeOllamaHandler.requests = []
+    FakeOllamaHandler.loaded = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestOllamaProvider:
+    """Tests for the request fields and helper endpoints."""
+
+    def test_requests_carry_keep_alive_and_options(self, server):
+        provider = OllamaProvider("", "llama3:latest", api_base=server)
+        provider.configure_runtime("1h", {"num_ctx": 8192, "temperature": 0.2})
+
+        assert provider.generate_json("system", "prompt") == {"ok": True}
+
+        body = FakeOllamaHandler.requests[0]
+        assert body["keep_alive"] == "1h"
+        assert body["options"] == {"num_ctx": 8192, "temperature": 0.2}
+        assert body["format"] == "json"
+
+    def test_defaults(self, server):
+        provider = OllamaProvider("", "llama3", api_base=server)
+        provider.generate_text("system", "prompt")
+        body = FakeOllamaHandler.requests[0]
+        assert body["keep_alive"] == DEFAULT_OLLAMA_KEEP_ALIVE
+        assert "options" not in body
+
+    def test_numeric_keep_alive_is_sent_as_number(self):
+        provider = OllamaProvider("", "llama3")
+        provider.configure_runtime("-1")
+        assert provider.keep_alive == -1
+        provider.configure_runtime("")
+        assert provider.keep_alive == DEFAULT_OLLAMA_KEEP_ALIVE
+
+    def test_warm_up_loads_without_prompt(self, server):
+        provider = OllamaProvider("", "llama3", api_base=server)
+        provider.configure_runtime("10m", {"num_ctx": 4096})
+
+        assert provider.status()["loaded"] is False
+        provider.warm_up()
+
+        body = FakeOllamaHandler.requests[0]
+        assert "prompt" not in body
+        assert body["keep_alive"] == "10m"
+        assert body["options"] == {"num_ctx": 4096}
+        status = provider.status()
+        assert status["reachable"] and status["loaded"]
+        assert status["expires_at"] == "2030-01-01T00:00:00Z"
+
+    def test_status_matches_implicit_latest_tag(self, server):
+        FakeOllamaHandler.loaded.add("llama3:latest")
+        assert OllamaProvider("", "llama3", api_base=server).status()["loaded"] is True
+
+    def test_status_when_server_is_down(self):
+        status = OllamaProvider("", "llama3", api_base="http://127.0.0.1:9").status(timeout=2)
+        assert status["reachable"] is False
+        assert status["loaded"] is False
+
+
+class TestEngineWarmUp:
+    """Tests for configuring Ollama from settings."""
+
+    def test_settings_configure_runtime_and_warm_up(self, server):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "ollama", "model": "llama3", "ollama_base_url": server,
+                                    "ollama_keep_alive": "2h",
+                                    "ollama_num_ctx": "16384", "ollama_options": {"temperature": 0.1}})
+        ai._warm_up_thread.join(5)
+
+        assert ai.provider.keep_alive == "2h"
+        assert ai.provider.options == {"temperature": 0.1, "num_ctx": 16384}
+        assert ai.last_warm_up["success"] is True
+        status = ai.get_model_status()
+        assert status["local"] and status["loaded"]
+        assert status["warm_up"]["model"] == "llama3"
+
+    def test_warm_up_can_be_disabled(self, server):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "ollama", "model": "llama3", "ollama_base_url": server,
+                                    "ollama_warm_up": False})
+        assert ai._warm_up_thread is None
+        assert FakeOllamaHandler.requests == []
+
+    def test_runtime_options_are_not_shared_between_engines(self, server):
+        registry = ProviderRegistry()
+        settings = {"provider": "ollama", "model": "llama3", "ollama_base_url": server, "ollama_warm_up": False}
+        first, second = AIEngine(registry=registry), AIEngine(registry=registry)
+        first.configure_from_settings({**settings, "ollama_keep_alive": "1h", "ollama_num_ctx": 8192})
+        second.configure_from_settings({**settings, "ollama_keep_alive": "5m"})
+
+        assert first.provider is not second.provider
+        assert (first.provider.keep_alive, first.provider.options) == ("1h", {"num_ctx": 8192})
+        assert (second.provider.keep_alive, second.provider.options) == ("5m", {})
+
+        third = AIEngine(registry=registry)
+        third.configure_from_settings({**settings, "ollama_keep_alive": "1h", "ollama_num_ctx": "8192"})
+        assert third.provider is first.provider
+
+    def test_cloud_provider_status(self):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure("openai", "sk-test", "gpt-4o-mini")
+        assert ai.get_model_status() == {"provider": "openai", "model": "gpt-4o-mini", "local": False}
+        assert ai.warm_up_model() is False
+
@@ -0,0 +1,153 @@
+"""
+Tests for the OpenAI-compatible provider and configurable base URLs.
+"""
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.ai import AIEngine
+from engine.providers import OpenAICompatibleProvider, OllamaProvider, ProviderRegistry
+
+RESUME = {"name": "Jane Doe", "summary": "Engineer.", "skills": ["Python"], "experience": [], "education": []}
+
+
+class CompatibleHandler(BaseHTTPRequestHandler):
+    """A vLLM-style server: streaming chat completions and a model list."""
+    seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        CompatibleHandler.seen.append((self.path, dict(self.headers), None))
+        body = json.dumps({"object": "list", "data": [{"id": "llama-3-8b"}, {"id": "qwen2.5-7b"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        CompatibleHandler.seen.append((self.path, dict(self.headers), request))
+        content = json.dumps(RESUME)
+        events = [{"choices": [{"delta": {"content": content[:10]}}]},
+                  {"choices": [{"delta": {"content": content[10:]}}]}]
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+
+@pytest.fixture
+def server():
+    CompatibleHandler.seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CompatibleHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestCompatibleProvider:
+    """Tests for requests to an OpenAI-compatible server."""
+
+    def test_headers_and_optional_key(self, server):
+        provider = OpenAICompatibleProvider("", "llama-3-8b", api_base=server + "/", headers={"X-Team": "resumes"})
+
+        assert provider.generate_json("system", "prompt") == RESUME
+
+        path, headers, request = CompatibleHandler.seen[0]
+        assert path == "/v1/chat/completions"
+        assert headers["X-Team"] == "resumes"
+        assert "Authorization" not in headers
+        assert request["model"] == "llama-3-8b"
+
+    def test_key_is_sent_when_set(self, server):
+        OpenAICompatibleProvider("secret", "m", api_base=server).generate_text("system", "prompt")
+        assert CompatibleHandler.seen[0][1]["Authorization"] == "Bearer secret"
+
+    def test_list_models(self, server):
+        assert OpenAICompatibleProvider("", "m", api_base=server).list_models() == ["llama-3-8b", "qwen2.5-7b"]
+
+
+class TestSettings:
+    """Tests for base URLs, headers and model lists from settings."""
+
+    def test_engine_uses_configured_endpoint(self, server):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({
+            "provider": "openai-compatible", "model": "llama-3-8b", "apiKey": "",
+            "compatible_base_url": server, "compatible_headers": {"X-Team": "resumes"},
+            "compatible_models": ["my-finetune"], "retrieval_top_k": 0,
+        })
+
+        assert isinstance(ai.provider, OpenAICompatibleProvider)
+        # No key needed: the request goes to the server instead of returning placeholder data
+        assert ai.generate_resume_content("Python role", {"name": "Jane Doe"})["name"] == "Jane Doe"
+        assert CompatibleHandler.seen[0][1]["X-Team"] == "resumes"
+        assert ai.list_models() == ["llama-3-8b", "my-finetune", "qwen2.5-7b"]
+
+    def test_cloud_key_is_not_sent_to_compatible_server(self, server):
+        settings = {"provider": "openai-compatible", "model": "m", "apiKey": "sk-openai",
+                    "compatible_base_url": server, "retrieval_top_k": 0}
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings(settings)
+        ai.generate_resume_content("Python role", {"name": "Jane Doe"})
+        assert "Authorization" not in CompatibleHandler.seen[-1][1]
+
+        ai.configure_from_settings({**settings, "compatible_api_key": "gateway-key"})
+        ai.generate_resume_content("Python role", {"name": "Jane Doe"})
+        assert CompatibleHandler.seen[-1][1]["Authorization"] == "Bearer gateway-key"
+
+    def test_configured_models_when_server_cannot_list(self):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "openai-compatible", "model": "a",
+                                    "compatible_base_url": "http://127.0.0.1:9/v1", "compatible_models": ["a", "b"]})
+        assert ai.list_models() == ["a", "b"]
+
+    def test_ollama_base_url(self):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "ollama", "model": "llama3", "ollama_warm_up": False,
+                                    "ollama_base_url": "http://gpu-box:11434/"})
+        assert isinstance(ai.provider, OllamaProvider)
+        assert ai.provider.api_base == "http://gpu-box:11434"
+
+    def test_base_url_of_other_provider_is_ignored(self):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "openai", "apiKey": "sk", "ollama_base_url": "http://gpu-box:11434"})
+        assert ai.provider.api_base == "https://api.openai.com/v1"
+
+    def test_headers_are_part_of_registry_key(self):
+        registry = ProviderRegistry()
+        a = registry.get("openai-compatible", "", "m", "http://x/v1", {"X-Team": "a"})
+        assert registry.get("openai-compatible", "", "m", "http://x/v1", {"X-Team": "a"}) is a
+        assert registry.get("openai-compatible", "", "m", "http://x/v1", {"X-Team": "b"}) is not a
+        assert "X-Team" not in repr(list(registry.providers.keys()))
+
+
+class TestCliOverrides:
+    """Tests for --provider/--model/--base-url."""
+
+    def test_batch_targets_local_server(self, tmp_path, server):
+        import cli
+        (tmp_path / "jds").mkdir()
+        (tmp_path / "jds" / "role.txt").write_text("Python role")
+
+        with patch.object(cli, "SettingsManager") as settings:
+            settings.return_value.get_all.return_value = {"provider": "openai", "apiKey": "sk-cloud"}
+            code = cli.main(["--provider", "openai-compatible", "--model", "llama-3-8b", "--base-url", server,
+                             "batch", "--jds", str(tmp_path / "jds"), "--out", str(tmp_path / "out"),
+                             "--no-compile"])
+
+        assert code == 0
+        assert CompatibleHandler.seen[0][2]["model"] == "llama-3-8b"
+        assert json.loads((tmp_path / "out" / "role.json").read_text())["name"] == "Jane Doe"
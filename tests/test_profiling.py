@@ -0,0 +1,124 @@
+"""
+Tests for opt-in profiling of Bridge calls.
+"""
+import os
+import sys
+import pstats
+import tracemalloc
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import api
+from engine.profiling import CallProfiler, profiling_enabled, ENV_FLAG, ENV_DIR
+
+
+def make_bridge(settings):
+    with patch.object(api, "SettingsManager") as manager:
+        manager.return_value.get_all.return_value = settings
+        manager.return_value.get.side_effect = lambda key, default=None: settings.get(key, default)
+        return api.Bridge()
+
+
+def profiled_calls(directory):
+    return sorted({name.split(".")[0] for name in os.listdir(directory)})
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    monkeypatch.delenv(ENV_FLAG, raising=False)
+    monkeypatch.delenv(ENV_DIR, raising=False)
+
+
+class TestSwitch:
+    """Tests for turning profiling on and off."""
+
+    def test_off_leaves_methods_untouched(self):
+        bridge = make_bridge({"provider": "openai", "apiKey": "sk-test"})
+        assert bridge.profiler is None
+        assert "generate_latex_source" not in vars(bridge)
+        assert bridge.generate_latex_source.__func__ is api.Bridge.generate_latex_source
+
+    def test_environment_overrides_setting(self, monkeypatch):
+        monkeypatch.setenv(ENV_FLAG, "0")
+        assert profiling_enabled({"profiling_enabled": True}) is False
+        monkeypatch.setenv(ENV_FLAG, "1")
+        assert profiling_enabled({}) is True
+        monkeypatch.delenv(ENV_FLAG)
+        assert profiling_enabled({"profiling_enabled": "yes"}) is True
+        assert profiling_enabled({"profiling_enabled": object()}) is False
+
+    def test_switching_off_removes_wrappers(self, tmp_path):
+        settings = {"provider": "openai", "apiKey": "sk-test", "profiling_enabled": True,
+                    "profiling_dir": str(tmp_path)}
+        bridge = make_bridge(settings)
+        assert "compile_pdf" in vars(bridge)
+        assert "get_model_status" not in vars(bridge) and "get_usage_stats" not in vars(bridge)
+        assert tracemalloc.is_tracing()
+
+        settings["profiling_enabled"] = False
+        bridge.apply_settings()
+        assert bridge.profiler is None
+        assert "compile_pdf" not in vars(bridge)
+        assert not tracemalloc.is_tracing()
+
+
+class TestOutput:
+    """Tests for the files written per call."""
+
+    def test_writes_profile_and_allocations(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(ENV_FLAG, "1")
+        monkeypatch.setenv(ENV_DIR, str(tmp_path))
+        bridge = make_bridge({"provider": "openai", "apiKey": "sk-test"})
+        try:
+            result = bridge.generate_latex_source({"user_data": "{invalid"})
+        finally:
+            bridge.profiler.stop()
+
+        assert result["success"] is False and "trace" in result
+        [call] = profiled_calls(tmp_path)
+        assert call.endswith("generate_latex_source")
+        stats = pstats.Stats(str(tmp_path / (call + ".prof")))
+        assert any(function[2] == "generate_latex_source" for function in stats.stats)
+        report = (tmp_path / (call + ".mem.txt")).read_text()
+        assert report.startswith("generate_latex_source:") and "allocations" in report
+
+    def test_status_polls_do_not_rotate_out_operations(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(ENV_FLAG, "1")
+        monkeypatch.setenv(ENV_DIR, str(tmp_path))
+        bridge = make_bridge({"provider": "openai", "apiKey": "sk-test", "profiling_keep": 2})
+        try:
+            bridge.generate_latex_source({"user_data": "{invalid"})
+            for _ in range(5):
+                bridge.get_model_status()
+                bridge.get_usage_stats()
+        finally:
+            bridge.profiler.stop()
+
+        [call] = profiled_calls(tmp_path)
+        assert call.endswith("generate_latex_source")
+
+    def test_rotation_keeps_newest_calls(self, tmp_path):
+        profiler = CallProfiler(str(tmp_path), keep=2)
+        profiler.start()
+        try:
+            for i in range(4):
+                assert profiler.profile(f"call{i}", lambda value: value * 2, i) == i * 2
+        finally:
+            profiler.stop()
+
+        calls = profiled_calls(tmp_path)
+        assert [call.rsplit("-", 1)[1] for call in calls] == ["call2", "call3"]
+        assert len(os.listdir(tmp_path)) == 4
+
+    def test_errors_are_profiled_and_raised(self, tmp_path):
+        profiler = CallProfiler(str(tmp_path))
+
+        def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            profiler.profile("failing", failing)
+        # tracemalloc was not started, so only the CPU profile is written
+        assert [name.rsplit("-", 1)[1] for name in os.listdir(tmp_path)] == ["failing.prof"]
@@ -0,0 +1,89 @@
+"""
+Tests for reusing provider instances and their connections.
+"""
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.ai import AIEngine
+from engine.providers import ProviderRegistry, OllamaProvider, OpenAIProvider
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Ollama-style endpoint that keeps connections open and records client ports."""
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        KeepAliveHandler.client_ports.append(self.client_address[1])
+        body = (json.dumps({"response": "ok", "done": True}) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    KeepAliveHandler.client_ports = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_same_settings_reuse_instance():
+    registry = ProviderRegistry()
+    ai = AIEngine(registry=registry)
+    ai.configure("openai", "sk-1", "gpt-4o-mini")
+    first = ai.provider
+
+    ai.configure("ollama", "", "llama3")
+    ai.configure("openai", "sk-1", "gpt-4o-mini")
+
+    assert ai.provider is first
+    assert registry.stats() == {"size": 2, "hits": 1, "misses": 2}
+
+
+def test_key_model_and_base_url_are_part_of_the_key():
+    registry = ProviderRegistry()
+    base = registry.get("openai", "sk-1", "gpt-4o-mini")
+    assert registry.get("openai", "sk-2", "gpt-4o-mini") is not base
+    assert registry.get("openai", "sk-1", "gpt-4o") is not base
+    assert registry.get("openai", "sk-1", "gpt-4o-mini", "http://localhost:8000/v1") is not base
+    assert isinstance(registry.get("unknown", "sk-1", "gpt-4o-mini"), OpenAIProvider)
+
+
+def test_raw_key_not_stored_in_registry_keys():
+    registry = ProviderRegistry()
+    registry.get("openai", "sk-secret", "gpt-4o-mini")
+    assert "sk-secret" not in repr(list(registry.providers.keys()))
+
+
+def test_least_recently_used_is_evicted():
+    registry = ProviderRegistry(max_size=2)
+    a = registry.get("ollama", "", "a")
+    registry.get("ollama", "", "b")
+    registry.get("ollama", "", "a")
+    registry.get("ollama", "", "c")
+    assert registry.get("ollama", "", "a") is a
+    assert registry.stats()["size"] == 2
+
+
+def test_connection_stays_warm(server):
+    provider = OllamaProvider("", "llama3", api_base=server)
+    assert provider.generate_text("system", "one") == "ok"
+    assert provider.generate_text("system", "two") == "ok"
+    assert len(KeepAliveHandler.client_ports) == 2
+    assert len(set(KeepAliveHandler.client_ports)) == 1
@@ -0,0 +1,175 @@
+"""
+Tests for recording provider calls to cassettes and replaying them offline.
+"""
+import os
+import sys
+import json
+import time
+from unittest.mock import patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.replay import Cassette, CassetteMiss, ReplayProvider, redact, request_key
+from engine.ai import AIEngine
+from engine.cancel import CancelToken, CancelledError
+from engine.providers import ProviderRegistry
+from bench.simulator import start_simulator
+
+USER_DATA = {"name": "Jane Doe", "email": "jane@example.com", "phone": "+1 (555) 123-4567",
+             "skills": ["Python"],
+             "experience": [{"role": "Developer", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+             "education": []}
+
+
+class StubProvider:
+    """Answers after `delay` seconds and counts its calls."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.model = "stub-model"
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"answer": prompt, "call": self.calls}
+
+    def generate_text(self, system, prompt, cancel_token=None, timeout=None):
+        self.calls += 1
+        return f"text {self.calls}"
+
+
+class TestRedaction:
+    """Tests for masking secrets and personal data."""
+
+    def test_masks_keys_emails_and_phones(self):
+        text = "key sk-abcdefghijklmnopqrstuvwx mail jane@example.com call +1 (555) 123-4567 in 2020-2024"
+        masked = redact(text, ["Jane Doe"])
+        assert "sk-abc" not in masked and "jane@" not in masked and "555" not in masked
+        assert "2020-2024" in masked
+        assert redact("Hi Jane Doe", ["Jane Doe"]) == "Hi [REDACTED]"
+
+    def test_cassette_stores_redacted_prompt(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        provider = ReplayProvider(StubProvider(), Cassette(str(path), ["Jane Doe"]), "record")
+        provider.generate_json("system", "Jane Doe <jane@example.com>")
+
+        entry = json.loads(path.read_text())
+        assert entry["prompt"] == "[REDACTED] <[REDACTED_EMAIL]>"
+        assert entry["key"] == request_key("StubProvider", "stub-model", "generate_json",
+                                           "system", "Jane Doe <jane@example.com>")
+
+
+class TestRecordReplay:
+    """Tests for the record and replay modes of ReplayProvider."""
+
+    def test_replay_returns_recorded_responses_in_order(self, tmp_path):
+        path = str(tmp_path / "run.jsonl")
+        recorder = ReplayProvider(StubProvider(), Cassette(path), "record")
+        first = recorder.generate_json("s", "p")
+        second = recorder.generate_json("s", "p")
+
+        stub = StubProvider()
+        player = ReplayProvider(stub, Cassette(path), "replay", latency="zero")
+        assert player.generate_json("s", "p") == first
+        assert player.generate_json("s", "p") == second
+        # The last recording repeats once they run out
+        assert player.generate_json("s", "p") == second
+        assert stub.calls == 0
+        with pytest.raises(CassetteMiss):
+            player.generate_json("s", "other prompt")
+
+    def test_recorded_latency(self, tmp_path):
+        path = str(tmp_path / "run.jsonl")
+        ReplayProvider(StubProvider(delay=0.2), Cassette(path), "record").generate_json("s", "p")
+
+        start = time.monotonic()
+        ReplayProvider(StubProvider(), Cassette(path), "replay").generate_json("s", "p")
+        assert time.monotonic() - start >= 0.2
+        start = time.monotonic()
+        ReplayProvider(StubProvider(), Cassette(path), "replay", latency="zero").generate_json("s", "p")
+        assert time.monotonic() - start < 0.1
+
+    def test_replay_honors_timeout_and_cancel(self, tmp_path):
+        path = str(tmp_path / "run.jsonl")
+        ReplayProvider(StubProvider(delay=0.3), Cassette(path), "record").generate_json("s", "p")
+        player = ReplayProvider(StubProvider(), Cassette(path), "replay")
+
+        with pytest.raises(TimeoutError):
+            player.generate_json("s", "p", timeout=0.05)
+        token = CancelToken()
+        token.cancel()
+        with pytest.raises(CancelledError):
+            player.generate_json("s", "p", cancel_token=token)
+
+    def test_errors_are_replayed(self, tmp_path):
+        path = str(tmp_path / "run.jsonl")
+        recorder = ReplayProvider(StubProvider(error=ValueError("429 Too Many Requests")), Cassette(path), "record")
+        with pytest.raises(ValueError):
+            recorder.generate_json("s", "p")
+        player = ReplayProvider(StubProvider(), Cassette(path), "replay", latency="zero")
+        with pytest.raises(RuntimeError, match="429"):
+            player.generate_json("s", "p")
+
+
+class TestPipeline:
+    """Tests for recording a Bridge run against the simulator and replaying it offline."""
+
+    def make_bridge(self, settings):
+        import api
+        with patch.object(api, "SettingsManager") as manager:
+            manager.return_value.get_all.return_value = settings
+            manager.return_value.get.side_effect = lambda key, default=None: settings.get(key, default)
+            return api.Bridge()
+
+    def test_generate_latex_source_offline(self, tmp_path):
+        cassette = str(tmp_path / "pipeline.jsonl")
+        payload = {"job_description": "Python developer", "template_name": "modern.tex",
+                   "user_data": json.dumps(USER_DATA)}
+        server = start_simulator("fast", seed=3)
+        try:
+            settings = {"provider": "openai-compatible", "model": "simulated", "replay_mode": "record",
+                        "compatible_base_url": server.url + "/v1", "replay_cassette": cassette}
+            recorded = self.make_bridge(settings).generate_latex_source(payload)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert recorded["success"], recorded
+
+        # The simulator is gone and no API key is set: every answer comes from the cassette
+        bridge = self.make_bridge({"provider": "openai", "apiKey": "", "model": "simulated",
+                                   "replay_mode": "replay", "replay_latency": "zero",
+                                   "replay_cassette": cassette})
+        bridge.ai.configure("openai-compatible", "", "simulated", api_base="http://127.0.0.1:9/v1")
+        replayed = bridge.generate_latex_source(payload)
+
+        assert replayed["success"], replayed
+        assert replayed["tex_content"] == recorded["tex_content"]
+        assert bridge.get_replay_stats()["replayed"] >= 1
+        assert "jane@example.com" not in open(cassette, encoding="utf-8").read()
+
+    def test_engine_without_cassette_is_unwrapped(self):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure("openai", "sk-test", "gpt-4o-mini")
+        assert not isinstance(ai.provider, ReplayProvider)
+        with pytest.raises(ValueError):
+            ai.configure_replay("record")
+
+    def test_settings_create_the_provider_once(self, tmp_path):
+        registry = ProviderRegistry()
+        ai = AIEngine(registry=registry)
+        ai.configure("openai", "sk-old", "gpt-4o-mini")
+        created = []
+        original = registry.get
+        registry.get = lambda *args, **kwargs: created.append(args[:3]) or original(*args, **kwargs)
+
+        ai.configure_from_settings({"provider": "openai", "apiKey": "sk-new", "model": "gpt-4o",
+                                    "replay_mode": "record", "replay_cassette": str(tmp_path / "c.jsonl")})
+
+        assert created == [("openai", "sk-new", "gpt-4o")]
+        assert isinstance(ai.provider, ReplayProvider)
+        assert ai.provider.provider.model == "gpt-4o"
@@ -0,0 +1,156 @@
+"""
+Tests for BM25 retrieval of the profile bullets sent to the model.
+"""
+import os
+import sys
+import json
+import threading
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.ai import AIEngine
+from engine.retrieval import ProfileIndex, profile_items
+
+PROFILE = {
+    "name": "Jane Doe",
+    "experience": [
+        {"role": "Senior Engineer", "company": "Acme", "dates": "2021-2024", "description": [
+            "Built Kafka streaming pipelines processing 2M events per day",
+            "Organized the office holiday party",
+            "Migrated services to Kubernetes on AWS",
+            "Mentored two junior developers",
+        ]},
+        {"role": "Engineer", "company": "Beta", "dates": "2018-2021", "description": [
+            "Maintained a PHP billing system",
+            "Wrote onboarding documentation",
+        ]},
+    ],
+    "projects": [
+        {"name": "kstream-tools", "description": "Open-source Kafka consumer lag monitor"},
+        "Recipe blog built with WordPress",
+    ],
+}
+
+JD = "Data platform engineer: Kafka, Kubernetes, AWS and streaming pipelines."
+
+
+class TestProfileIndex:
+    """Tests for the BM25 index."""
+
+    def test_items_cover_bullets_and_projects(self):
+        keys = [item.key for item in profile_items(PROFILE)]
+        assert keys[0] == "experience[0].description[0]"
+        assert "experience[1].description[1]" in keys
+        assert keys[-2:] == ["projects[0]", "projects[1]"]
+
+    def test_relevant_bullets_score_highest(self):
+        index = ProfileIndex()
+        index.update(PROFILE)
+        scores = index.scores(JD)
+        assert scores["experience[0].description[0]"] > scores["experience[0].description[1]"]
+        assert scores["projects[0]"] > scores["projects[1]"]
+        assert scores["experience[0].description[1]"] == 0
+
+    def test_select_keeps_top_k_and_every_role(self):
+        data, report = ProfileIndex().select(JD, PROFILE, top_k=3)
+
+        bullets = data["experience"][0]["description"]
+        assert bullets == ["Built Kafka streaming pipelines processing 2M events per day",
+                           "Migrated services to Kubernetes on AWS"]
+        # The second role keeps its header and one bullet even though nothing matched
+        assert data["experience"][1]["company"] == "Beta"
+        assert len(data["experience"][1]["description"]) == 1
+        assert data["projects"] == [PROFILE["projects"][0]]
+        assert report.items_total == 8
+        assert report.items_kept == 4
+        assert "experience[0].description[1]" in report.dropped
+        # The caller's profile is not modified
+        assert len(PROFILE["experience"][0]["description"]) == 4
+
+    def test_small_profile_is_untouched(self):
+        data, report = ProfileIndex().select(JD, PROFILE, top_k=20)
+        assert data is PROFILE
+        assert report.dropped == []
+
+    def test_zero_top_k_disables(self):
+        data, _ = ProfileIndex().select(JD, PROFILE, top_k=0)
+        assert data is PROFILE
+
+    def test_update_only_tokenizes_new_text(self):
+        index = ProfileIndex()
+        index.update(PROFILE)
+        assert index.last_update == {"tokenized": 8, "reused": 0}
+
+        edited = json.loads(json.dumps(PROFILE))
+        edited["experience"][0]["description"].insert(0, "Tuned PostgreSQL queries")
+        index.update(edited)
+        assert index.last_update == {"tokenized": 1, "reused": 8}
+        assert index.scores("postgresql")["experience[0].description[0]"] > 0
+        assert index.scores("kafka")["experience[0].description[1]"] > 0
+
+    def test_concurrent_selects_of_different_profiles(self):
+        index = ProfileIndex()
+        other = {"experience": [{"role": "Analyst", "description": [f"Kafka report {i}" for i in range(6)]}]}
+        errors = []
+
+        def run(profile):
+            try:
+                for _ in range(200):
+                    index.select(JD, profile, top_k=2)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(profile,)) for profile in (PROFILE, other)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        self.prompts.append(prompt)
+        return {"name": "Jane Doe", "summary": "Engineer.", "skills": ["Kafka"],
+                "experience": [{"role": "Senior Engineer", "company": "Acme", "dates": "2021-2024",
+                                "description": ["Built pipelines"]}],
+                "education": []}
+
+
+class TestEngineRetrieval:
+    """Tests for retrieval in AIEngine prompts."""
+
+    @pytest.fixture
+    def engine(self):
+        engine = AIEngine()
+        engine.api_key = "test"
+        engine.provider = RecordingProvider()
+        return engine
+
+    def test_prompt_contains_only_retrieved_bullets(self, engine):
+        engine.retrieval_top_k = 3
+        engine.generate_resume_content(JD, PROFILE)
+
+        prompt = engine.provider.prompts[0]
+        assert "Kafka streaming pipelines" in prompt
+        assert "holiday party" not in prompt
+        assert engine.last_retrieval_report["items_kept"] == 4
+
+    def test_setting_disables_retrieval(self, engine):
+        engine.configure_from_settings({"apiKey": "test", "retrieval_top_k": 0})
+        engine.provider = RecordingProvider()
+        engine.generate_resume_content(JD, PROFILE)
+        assert "holiday party" in engine.provider.prompts[0]
+
+    def test_sections_mode_does_not_return_a_previous_report(self, engine):
+        engine.retrieval_top_k = 3
+        engine.generate_resume_content(JD, PROFILE)
+        assert engine.last_retrieval_report is not None
+
+        engine.generation_mode = "sections"
+        engine.generate_resume_content(JD, PROFILE)
+        assert engine.last_retrieval_report is None
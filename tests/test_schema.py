@@ -0,0 +1,135 @@
+"""
+Tests for resume JSON validation, local repair and field re-asks.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import MagicMock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.schema import validate, parse_json, complete_json, repair_resume
+
+VALID = {
+    "name": "Jane Doe",
+    "summary": "Engineer.",
+    "skills": ["Python"],
+    "experience": [{"role": "Dev", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+    "education": [{"degree": "BSc", "institution": "MIT", "dates": "2015"}],
+}
+
+
+class TestValidation:
+    """Tests for schema checks."""
+
+    def test_valid_resume(self):
+        assert validate(VALID) == []
+
+    def test_reports_paths(self):
+        data = dict(VALID, skills="Python, Go", experience=[{"role": "Dev"}])
+        paths = [issue.path for issue in validate(data)]
+        assert "skills" in paths
+        assert "experience[0].description" in paths
+        assert "education" not in paths
+
+
+class TestJsonRecovery:
+    """Tests for parsing imperfect model output."""
+
+    def test_code_fence_and_surrounding_text(self):
+        assert parse_json('```json\n{"a": 1}\n```') == {"a": 1}
+        assert parse_json('Sure! {"a": [1, 2]} Hope this helps.') == {"a": [1, 2]}
+
+    def test_truncated_output_is_completed(self):
+        text = json.dumps(VALID)
+        truncated = text[:text.index("Built") + 3]
+        data = parse_json(truncated)
+        assert data["name"] == "Jane Doe"
+        assert data["experience"][0]["role"] == "Dev"
+        assert data["experience"][0]["description"] == []
+
+    @pytest.mark.parametrize("text", ['{"a": "x", "b', '{"a": "x", "b":', '{"a": "x", "b": "y', '{"a": ["x", "y'])
+    def test_partial_members_are_dropped(self, text):
+        assert json.loads(complete_json(text))["a"] in ("x", ["x"])
+
+    def test_escaped_quotes(self):
+        assert json.loads(complete_json('{"a": "say \\"hi\\"", "b": [')) == {"a": 'say "hi"', "b": []}
+
+    def test_unrecoverable_raises(self):
+        with pytest.raises(ValueError):
+            parse_json("no json here")
+
+
+class TestRepair:
+    """Tests for local coercion and defaults."""
+
+    def test_valid_resume_untouched(self):
+        data, report = repair_resume(VALID)
+        assert data == VALID
+        assert report.fixes == []
+        assert report.missing == []
+
+    def test_type_coercion(self):
+        data, report = repair_resume({
+            "name": "Jane",
+            "summary": ["Line one.", "Line two."],
+            "skills": "Python, Go; SQL",
+            "experience": {"role": "Dev", "company": "Acme", "dates": 2020, "description": "- Built it\n- Ran it"},
+            "education": [{"degree": "BSc", "institution": "MIT", "year": 2015}],
+        })
+        assert validate(data) == []
+        assert data["summary"] == "Line one. Line two."
+        assert data["skills"] == ["Python", "Go", "SQL"]
+        assert data["experience"][0]["dates"] == "2020"
+        assert data["experience"][0]["description"] == ["Built it", "Ran it"]
+        assert data["education"][0]["dates"] == "2015"
+        assert report.missing == []
+        assert any(fix.startswith("skills") for fix in report.fixes)
+
+    def test_missing_content_fields_reported(self):
+        data, report = repair_resume({"summary": "Engineer."}, {"name": "Jane", "experience": [{"role": "Dev"}]})
+        assert data["name"] == "Jane"
+        assert data["education"] == []
+        assert report.missing == ["skills", "experience"]
+
+    def test_empty_experience_ok_without_user_experience(self):
+        _, report = repair_resume({"summary": "s", "skills": ["x"], "experience": []}, {"name": "Jane"})
+        assert report.missing == []
+
+
+class TestAIEngineRepair:
+    """Tests that AIEngine repairs locally and re-asks only for missing fields."""
+
+    @pytest.fixture
+    def ai(self):
+        from engine.ai import AIEngine
+        ai = AIEngine()
+        ai.configure('openai', 'key', 'gpt-4o-mini')
+        ai.provider = MagicMock()
+        return ai
+
+    def test_repairable_output_needs_one_call(self, ai):
+        ai.provider.generate_json.return_value = dict(VALID, skills="Python, Go")
+        content = ai.generate_resume_content("JD", {})
+        assert content["skills"] == ["Python", "Go"]
+        assert ai.provider.generate_json.call_count == 1
+
+    def test_reasks_only_invalid_fields(self, ai):
+        broken = {key: value for key, value in VALID.items() if key != "summary"}
+        ai.provider.generate_json.side_effect = [broken, {"summary": "Tailored.", "name": "Ignored"}]
+
+        content = ai.generate_resume_content("JD", {})
+
+        assert content["summary"] == "Tailored."
+        assert content["name"] == "Jane Doe"
+        reask = ai.provider.generate_json.call_args_list[1].args[1]
+        assert "summary" in reask
+        assert ai.last_repair_report["reasked"] == ["summary"]
+
+    def test_failed_reask_keeps_repaired_content(self, ai):
+        broken = {key: value for key, value in VALID.items() if key != "summary"}
+        ai.provider.generate_json.side_effect = [broken, RuntimeError("rate limited")]
+        content = ai.generate_resume_content("JD", {})
+        assert content["summary"] == ""
+        assert content["skills"] == ["Python"]
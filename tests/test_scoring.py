@@ -0,0 +1,148 @@
+"""
+Tests for local TF-IDF keyword extraction and ATS match scoring.
+"""
+import os
+import sys
+import json
+import time
+from unittest.mock import MagicMock
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.scoring import KeywordScorer, score_resume, terms, resume_text
+from engine.batch import BatchRunner, load_jobs
+from engine.latex import LatexEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JD = ("Senior Backend Engineer. We need strong Python and Kafka experience, "
+      "machine learning pipelines on AWS, and Kubernetes in production.")
+
+MATCHING = {
+    "name": "Jane Doe",
+    "summary": "Backend engineer building machine learning pipelines in Python.",
+    "skills": ["Python", "Kafka", "AWS", "Kubernetes"],
+    "experience": [{"role": "Senior Engineer", "company": "Acme", "dates": "2021-2024",
+                    "description": ["Ran Kafka and Kubernetes in production"]}],
+    "education": [],
+}
+
+UNRELATED = {
+    "name": "John Roe",
+    "summary": "Pastry chef.",
+    "skills": ["Baking", "Plating"],
+    "experience": [{"role": "Chef", "company": "Cafe", "dates": "2020", "description": ["Made croissants"]}],
+    "education": [],
+}
+
+
+class TestTerms:
+    """Tests for term extraction."""
+
+    def test_unigrams_and_bigrams(self):
+        extracted = terms("Machine learning with Python")
+        assert "machine learning" in extracted
+        assert "python" in extracted
+        assert "with" not in extracted
+
+    def test_bigrams_stop_at_punctuation(self):
+        assert "python kafka" not in terms("Python, Kafka")
+        assert "node.js" in terms("Node.js.")
+
+    def test_resume_text_flattens_json(self):
+        text = resume_text(MATCHING)
+        assert "Kafka" in text and "Acme" in text
+        assert resume_text("plain text") == "plain text"
+
+    def test_dotted_names(self):
+        assert ".net" in terms("Experience with .NET and C#.")
+        assert "and" not in terms("...and more")
+
+
+class TestMatch:
+    """Tests for single-pair scoring."""
+
+    def test_matched_and_missing_terms(self):
+        result = score_resume(MATCHING, JD + " Terraform required.")
+        assert "kafka" in result.matched
+        assert "terraform" in result.missing
+        assert "terraform" in result.skills_missing
+        assert "python" in result.skills_matched
+        assert 0 < result.score <= 100
+
+    def test_relevant_resume_scores_higher(self):
+        assert score_resume(MATCHING, JD).score > score_resume(UNRELATED, JD).score + 30
+
+    def test_user_skills_count_as_keywords(self):
+        jd = "Looking for someone who knows Figma and Python."
+        assert "figma" not in score_resume(MATCHING, jd).skills_missing
+        assert "figma" in score_resume(MATCHING, jd, skills=["Figma"]).skills_missing
+
+    def test_scores_rendered_text(self):
+        result = score_resume(r"\section{Skills} Python, Kafka, AWS, Kubernetes", JD)
+        assert {"python", "kafka", "aws", "kubernetes"} <= set(result.matched)
+
+    def test_escaped_content_matches(self):
+        content = {"skills": ["C\\#", ".NET", "SQL"], "summary": "Cut costs by 30\\% in R\\&D"}
+        result = score_resume(content, "We need C# and .NET developers to cut costs.")
+        assert result.skills_matched == [".net", "c#"] and result.skills_missing == []
+        assert "cut costs" in result.matched
+
+    def test_scores_latex_source(self):
+        source = (r"\documentclass{article}\usepackage{enumitem}\begin{document}"
+                  r"\section*{Skills} % generated" "\n"
+                  r"\textbf{Languages:} C\#, Python \\ \begin{itemize}\item .NET services\end{itemize}"
+                  r"\end{document}")
+        result = score_resume(source, "C# and .NET, Python")
+        assert result.skills_missing == []
+        assert "itemize" not in terms(resume_text(source))
+
+    def test_empty_inputs(self):
+        result = score_resume({}, "")
+        assert result.score == 0
+        assert result.matched == [] and result.missing == []
+
+
+class TestScoreMany:
+    """Tests for vectorized scoring of many pairs."""
+
+    def test_agrees_with_match(self):
+        jds = [JD, "Pastry chef for a busy cafe. Baking and plating.", JD]
+        resumes = [MATCHING, UNRELATED, UNRELATED]
+        scorer = KeywordScorer().fit(jds)
+        scores, _, _ = scorer.score_many(resumes, jds)
+        for resume, jd, score in zip(resumes, jds, scores):
+            assert scorer.match(resume, jd).score == pytest.approx(score)
+        assert scores[0] > scores[2] and scores[1] > scores[2]
+
+    def test_throughput(self):
+        jds = [JD + f" Team {i} uses Terraform, Airflow and Spark." for i in range(500)]
+        resumes = [MATCHING, UNRELATED] * 250
+        started = time.perf_counter()
+        scores, _, _ = KeywordScorer().score_many(resumes, jds)
+        elapsed = time.perf_counter() - started
+        assert len(scores) == 500
+        # Thousands of pairs per second on a normal machine; generous bound for CI
+        assert elapsed < 5
+
+
+class TestBatchRanking:
+    """Tests for ranking batch outputs by ATS score."""
+
+    def test_report_ranks_jobs(self, tmp_path):
+        jd_dir = tmp_path / "jds"
+        jd_dir.mkdir()
+        (jd_dir / "backend.txt").write_text(JD)
+        (jd_dir / "chef.txt").write_text("Senior Backend Engineer with Go, Rust and Terraform.")
+        ai = MagicMock()
+        ai.generate_resume_content.return_value = MATCHING
+        latex = LatexEngine(os.path.join(PROJECT_ROOT, "templates"))
+
+        report = BatchRunner(ai, latex, str(tmp_path / "out"), compile=False).run(load_jobs(str(jd_dir)), {})
+
+        assert [entry["id"] for entry in report["ranking"]] == ["backend", "chef"]
+        scores = {job["id"]: job["ats_score"] for job in report["jobs"]}
+        assert scores["backend"] > scores["chef"]
+        saved = json.loads((tmp_path / "out" / "batch_report.json").read_text())
+        assert saved["ranking"] == report["ranking"]
@@ -0,0 +1,182 @@
+"""
+Tests for section-parallel resume generation.
+"""
+import os
+import sys
+import time
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.ai import AIEngine
+from engine.sections import plan_sections, merge_sections
+from engine.schema import validate
+from config import DEFAULT_SECTION_PROMPT
+
+PROFILE = {
+    "name": "Jane Doe",
+    "email": "jane@example.com",
+    "summary": "Backend engineer.",
+    "skills": ["Python", "Kafka", "Excel"],
+    "experience": [
+        {"role": "Senior Engineer", "company": "Acme", "dates": "2021-2024", "description": ["Built APIs"]},
+        {"role": "Engineer", "company": "Beta", "dates": "2018-2021", "description": ["Wrote scripts"]},
+    ],
+    "education": [{"degree": "BSc", "institution": "MIT", "dates": "2018"}],
+}
+
+
+class SectionProvider:
+    """Answers each section prompt after `delay` seconds."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.prompts = []
+        self.systems = set()
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        self.prompts.append(prompt)
+        self.systems.add(system)
+        time.sleep(self.delay)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("model error")
+        if '"summary": "..."' in prompt:
+            return {"summary": "Tailored summary."}
+        if '"skills": [' in prompt:
+            return {"skills": ["Python", "Kafka"]}
+        return {"role": "Changed", "description": ["Tailored bullet"]}
+
+
+@pytest.fixture
+def ai():
+    engine = AIEngine()
+    engine.configure('openai', 'key', 'gpt-4o-mini')
+    engine.generation_mode = "sections"
+    return engine
+
+
+def test_plan_has_one_section_per_experience_entry():
+    keys = [section.key for section in plan_sections(PROFILE)]
+    assert keys == ["summary", "skills", "experience[0]", "experience[1]"]
+
+
+def test_merge_uses_fallback_for_missing_sections():
+    sections = plan_sections(PROFILE)
+    content = merge_sections(PROFILE, sections, {"summary": "New.", "experience[1]": None})
+    assert content["summary"] == "New."
+    assert content["skills"] == PROFILE["skills"]
+    assert content["experience"][1] == PROFILE["experience"][1]
+    assert content["email"] == "jane@example.com"
+
+
+def test_merge_escapes_copied_text():
+    profile = dict(PROFILE, name="Jane_Doe", education=[{"degree": "BSc R&D", "institution": "MIT"}])
+    sections = plan_sections(profile)
+    content = merge_sections(profile, sections, {"skills": ["C\\#"], "experience[0]": None})
+    assert content["name"] == "Jane\\_Doe"
+    assert content["education"][0]["degree"] == "BSc R\\&D"
+    assert content["skills"] == ["C\\#"]
+
+
+def test_sections_run_concurrently(ai):
+    ai.provider = SectionProvider(delay=0.2)
+
+    started = time.monotonic()
+    content = ai.generate_resume_content("Python Kafka role", PROFILE)
+    elapsed = time.monotonic() - started
+
+    assert len(ai.provider.prompts) == 4
+    assert elapsed < 0.5
+    assert set(ai.last_section_timings) == {"summary", "skills", "experience[0]", "experience[1]"}
+    assert validate(content) == []
+    assert content["summary"] == "Tailored summary."
+    assert content["skills"] == ["Python", "Kafka"]
+    # Facts come from the user's data, only the bullets from the model
+    assert content["experience"][0]["role"] == "Senior Engineer"
+    assert content["experience"][0]["description"] == ["Tailored bullet"]
+    assert content["education"] == PROFILE["education"]
+
+
+def test_each_prompt_only_carries_its_own_entry(ai):
+    ai.provider = SectionProvider()
+    ai.generate_resume_content("Python role", PROFILE)
+    acme = [prompt for prompt in ai.provider.prompts if "Built APIs" in prompt]
+    assert len(acme) == 1
+    assert "Wrote scripts" not in acme[0]
+
+
+def test_failed_section_falls_back(ai):
+    ai.provider = SectionProvider(fail_on="Wrote scripts")
+    content = ai.generate_resume_content("Python role", PROFILE)
+    assert content["experience"][1] == PROFILE["experience"][1]
+    assert content["experience"][0]["description"] == ["Tailored bullet"]
+
+
+def test_resume_prompt_is_not_used_for_sections(ai):
+    ai.provider = SectionProvider()
+    ai.generate_resume_content("Python role", PROFILE, system_prompt_override="Return the whole resume JSON.")
+    assert ai.provider.systems == {DEFAULT_SECTION_PROMPT}
+
+    ai.section_prompt = "Write one section."
+    ai.generate_resume_content("Go role", PROFILE, system_prompt_override="Return the whole resume JSON.")
+    assert ai.provider.systems == {DEFAULT_SECTION_PROMPT, "Write one section."}
+
+
+def test_settings_select_mode():
+    engine = AIEngine()
+    engine.configure_from_settings({"provider": "ollama", "model": "llama3", "generation_mode": "sections"})
+    assert engine.generation_mode == "sections"
+    engine.configure_from_settings({"provider": "ollama", "model": "llama3"})
+    assert engine.generation_mode == "single"
+    engine.configure_from_settings({"provider": "ollama", "model": "llama3", "system_prompt_sections": "Custom."})
+    assert engine.section_prompt == "Custom."
+
+
+class TestSectionCache:
+    """Tests for incremental regeneration when the JD changes."""
+
+    JD = "Python engineer to build APIs."
+
+    def test_unchanged_inputs_are_reused(self, ai):
+        ai.provider = SectionProvider()
+        first = ai.generate_resume_content(self.JD, PROFILE)
+        second = ai.generate_resume_content(self.JD, PROFILE)
+
+        assert len(ai.provider.prompts) == 4
+        assert second == first
+        assert ai.last_section_cache["regenerated"] == []
+
+    def test_jd_edit_regenerates_only_affected_sections(self, ai):
+        ai.provider = SectionProvider()
+        ai.generate_resume_content(self.JD, PROFILE)
+
+        # "scripts" only appears in the Beta entry
+        ai.generate_resume_content(self.JD + " Some scripts.", PROFILE)
+
+        assert ai.last_section_cache["regenerated"] == ["summary", "experience[1]"]
+        assert ai.last_section_cache["reused"] == ["skills", "experience[0]"]
+        assert len(ai.provider.prompts) == 6
+
+    def test_profile_edit_regenerates_that_entry(self, ai):
+        ai.provider = SectionProvider()
+        ai.generate_resume_content(self.JD, PROFILE)
+        edited = dict(PROFILE, experience=[PROFILE["experience"][0],
+                                           dict(PROFILE["experience"][1], dates="2017-2021")])
+
+        ai.generate_resume_content(self.JD, edited)
+        assert ai.last_section_cache["regenerated"] == ["experience[1]"]
+
+    def test_failed_sections_are_not_cached(self, ai):
+        ai.provider = SectionProvider(fail_on="Wrote scripts")
+        ai.generate_resume_content(self.JD, PROFILE)
+        ai.provider.fail_on = None
+        ai.generate_resume_content(self.JD, PROFILE)
+        assert ai.last_section_cache["regenerated"] == ["experience[1]"]
+
+    def test_model_change_invalidates(self, ai):
+        ai.provider = SectionProvider()
+        ai.generate_resume_content(self.JD, PROFILE)
+        ai.model = "gpt-4o"
+        ai.generate_resume_content(self.JD, PROFILE)
+        assert len(ai.last_section_cache["regenerated"]) == 4
@@ -0,0 +1,180 @@
+"""
+Tests for the local HTTP service mode.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service import JobService, QueueFullError, create_server, run_operation
+
+
+class FakeBridge:
+    """Stands in for api.Bridge; generate blocks until released or cancelled."""
+
+    def __init__(self, work_dir=None):
+        self.work_dir = work_dir
+        self.cancelled = False
+        self.release = threading.Event()
+        self.payloads = []
+        self.on_start = None
+
+    def generate_latex_source(self, payload, cancel_token=None):
+        if self.on_start:
+            self.on_start()
+        # Like Bridge._start_operation: state is reset, except what the job's token says
+        self.cancelled = bool(cancel_token and cancel_token.cancelled)
+        self.payloads.append(payload)
+        self.release.wait(5)
+        if self.cancelled:
+            return {"success": False, "error": "Cancelled"}
+        return {"success": True, "tex_content": "\\documentclass{article}"}
+
+    def compile_pdf(self, tex_content):
+        return {"success": False, "error": "pdflatex not found"}
+
+    def fix_latex(self, payload, cancel_token=None):
+        return {"success": True, "fixed_content": payload["source"] + "%fixed"}
+
+    def cancel_generation(self):
+        self.cancelled = True
+        self.release.set()
+
+
+def wait_for(job, status, timeout=5):
+    end = time.monotonic() + timeout
+    while job.status != status and time.monotonic() < end:
+        time.sleep(0.01)
+    assert job.status == status
+
+
+@pytest.fixture
+def bridges():
+    return []
+
+
+@pytest.fixture
+def service(tmp_path, bridges):
+    def factory(work_dir=None):
+        bridge = FakeBridge(work_dir)
+        bridges.append(bridge)
+        return bridge
+
+    svc = JobService(workers=1, queue_size=2, work_root=str(tmp_path), bridge_factory=factory)
+    svc.start()
+    yield svc
+    for bridge in bridges:
+        bridge.release.set()
+    svc.stop()
+
+
+class TestJobService:
+    """Tests for the worker pool and queue."""
+
+    def test_jobs_run_and_report_results(self, service):
+        job = service.submit("fix", {"source": "x", "error": "e"})
+        wait_for(job, "succeeded")
+        assert job.result == {"success": True, "fixed_content": "x%fixed"}
+
+        failed = service.submit("compile", {"tex_content": "x"})
+        wait_for(failed, "failed")
+
+    def test_workers_get_separate_work_dirs(self, tmp_path):
+        work_dirs = []
+
+        def factory(work_dir=None):
+            work_dirs.append(work_dir)
+            return FakeBridge(work_dir)
+
+        svc = JobService(workers=3, work_root=str(tmp_path), bridge_factory=factory)
+        svc.start()
+        svc.stop()
+        assert len(set(work_dirs)) == 3
+
+    def test_full_queue_pushes_back(self, service, bridges):
+        running = service.submit("generate", {})
+        wait_for(running, "running")
+        service.submit("generate", {})
+        service.submit("generate", {})
+        with pytest.raises(QueueFullError):
+            service.submit("generate", {})
+        assert service.stats()["queued"] == 2
+
+    def test_cancel_queued_and_running(self, service, bridges):
+        running = service.submit("generate", {})
+        wait_for(running, "running")
+        queued = service.submit("generate", {})
+
+        service.cancel(queued.job_id)
+        assert queued.status == "cancelled"
+        service.cancel(running.job_id)
+        wait_for(running, "cancelled")
+        # The cancelled queued job is skipped, not run
+        time.sleep(0.05)
+        assert len(bridges[0].payloads) == 1
+
+    def test_cancel_before_operation_starts(self, service, bridges):
+        # The job is assigned to the worker's Bridge, which has not started the operation yet
+        bridges[0].on_start = lambda: service.cancel(next(iter(service.jobs)))
+        running = service.submit("generate", {})
+        wait_for(running, "cancelled")
+        assert running.result == {"success": False, "error": "Cancelled"}
+
+    def test_user_data_object_is_sent_as_json_text(self):
+        bridge = FakeBridge()
+        bridge.release.set()
+        run_operation(bridge, "generate", {"user_data": {"name": "Jane"}})
+        assert bridge.payloads[0]["user_data"] == '{"name": "Jane"}'
+
+
+class TestHttpApi:
+    """Tests for the REST endpoints."""
+
+    @pytest.fixture
+    def base_url(self, service):
+        server = create_server("127.0.0.1", 0, service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def request(self, method, url, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                return resp.status, json.loads(resp.read()), resp.headers
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read()), e.headers
+
+    def test_submit_and_poll(self, base_url):
+        status, body, _ = self.request("POST", base_url + "/jobs/fix", {"source": "x", "error": "e"})
+        assert status == 202
+        for _ in range(100):
+            status, job, _ = self.request("GET", base_url + body["poll"])
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.02)
+        assert job["result"]["fixed_content"] == "x%fixed"
+
+    def test_429_when_full(self, base_url, service):
+        first = self.request("POST", base_url + "/jobs/generate", {})[1]
+        wait_for(service.get(first["job_id"]), "running")
+        self.request("POST", base_url + "/jobs/generate", {})
+        self.request("POST", base_url + "/jobs/generate", {})
+
+        status, body, headers = self.request("POST", base_url + "/jobs/generate", {})
+        assert status == 429
+        assert headers["Retry-After"]
+
+    def test_errors(self, base_url):
+        assert self.request("POST", base_url + "/jobs/delete-everything", {})[0] == 404
+        assert self.request("GET", base_url + "/jobs/" + "0" * 32)[0] == 404
+        assert self.request("POST", base_url + "/jobs/fix", [1, 2])[0] == 400
+        assert self.request("GET", base_url + "/health")[1]["workers"] == 1
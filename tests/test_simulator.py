@@ -0,0 +1,146 @@
+"""
+Tests for the local provider simulator (bench/simulator.py).
+"""
+import os
+import sys
+import json
+import random
+import time
+import pytest
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.simulator import LatencyProfile, PROFILES, resume_answer, latex_answer, start_simulator
+from engine.ai import AIEngine, DEFAULT_RESUME_PROMPT
+from engine.providers import GoogleProvider, OllamaProvider, OpenAICompatibleProvider, ProviderRegistry
+from engine.schema import validate
+
+USER_DATA = {
+    "name": "Jane Doe",
+    "email": "jane@example.com",
+    "skills": ["Python", "SQL"],
+    "experience": [{"role": "Developer", "company": "Acme", "dates": "2020-2024",
+                    "description": ["Built the billing service"]}],
+    "education": [{"degree": "BSc", "institution": "State U", "year": "2019"}],
+}
+PROMPT = f"JOB DESCRIPTION:\nPython engineer for Kafka pipelines\n\nUSER'S RAW DATA (JSON):\n{json.dumps(USER_DATA)}\n"
+
+
+@pytest.fixture
+def simulator():
+    server = start_simulator("instant", seed=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestContent:
+    """Tests for the answers built from app prompts."""
+
+    def test_resume_uses_user_data(self):
+        resume = resume_answer(PROMPT)
+        assert validate(resume) == []
+        assert resume["name"] == "Jane Doe"
+        assert resume["experience"][0]["company"] == "Acme"
+        assert resume["skills"] == ["Python", "SQL"]
+
+    def test_latex_fix_echoes_source(self):
+        prompt = "BROKEN LATEX SOURCE:\n\\documentclass{article}\n\nERROR LOG:\n! Undefined"
+        assert latex_answer(prompt) == "\\documentclass{article}"
+        assert latex_answer("anything").startswith("\\documentclass")
+
+
+class TestLatencyProfile:
+    """Tests for the latency and error draws."""
+
+    def test_first_token_percentiles(self):
+        profile = LatencyProfile(first_token_median=0.5, first_token_p95=2.0)
+        rng = random.Random(0)
+        delays = sorted(profile.first_token_delay(rng) for _ in range(4000))
+        assert delays[2000] == pytest.approx(0.5, rel=0.1)
+        assert delays[3800] == pytest.approx(2.0, rel=0.15)
+
+    def test_error_rates(self):
+        profile = LatencyProfile(error_429=0.2, error_5xx=0.1)
+        rng = random.Random(0)
+        draws = [profile.draw_error(rng) for _ in range(5000)]
+        assert draws.count(429) / 5000 == pytest.approx(0.2, abs=0.03)
+        assert sum(1 for d in draws if d and d >= 500) / 5000 == pytest.approx(0.1, abs=0.03)
+
+    def test_instant_profile_has_no_delay(self):
+        assert PROFILES["instant"].first_token_delay(random.Random(0)) == 0
+        assert PROFILES["instant"].chunk_delay() == 0
+
+
+class TestWireFormats:
+    """Tests that the real providers can talk to the simulator."""
+
+    def test_openai(self, simulator):
+        provider = OpenAICompatibleProvider("", "simulated", api_base=simulator.url + "/v1")
+        assert validate(provider.generate_json(DEFAULT_RESUME_PROMPT, PROMPT)) == []
+        assert provider.generate_text("system", "anything").startswith("\\documentclass")
+        assert provider.list_models() == ["simulated"]
+
+    def test_ollama(self, simulator):
+        provider = OllamaProvider("", "simulated", api_base=simulator.url)
+        assert provider.generate_json(DEFAULT_RESUME_PROMPT, PROMPT)["name"] == "Jane Doe"
+        assert provider.status()["loaded"] is True
+        assert provider.list_models() == ["simulated"]
+
+    def test_gemini(self, simulator):
+        pytest.importorskip("google.genai")
+        provider = GoogleProvider("sim-key", "simulated", api_base=simulator.url)
+        assert provider.generate_json(DEFAULT_RESUME_PROMPT, PROMPT)["name"] == "Jane Doe"
+        assert simulator.stats()["gemini"] == 1
+
+    def test_engine_end_to_end(self, simulator):
+        ai = AIEngine(registry=ProviderRegistry())
+        ai.configure_from_settings({"provider": "openai-compatible", "model": "simulated",
+                                    "compatible_base_url": simulator.url + "/v1"})
+        resume = ai.generate_resume_content("Python engineer", USER_DATA)
+        assert validate(resume) == []
+        assert resume["experience"][0]["role"] == "Developer"
+
+
+class TestErrors:
+    """Tests for injected failures and streaming timing."""
+
+    def test_429_carries_retry_after(self):
+        server = start_simulator(LatencyProfile(0, 0, 0, error_429=1.0, retry_after=3))
+        try:
+            response = requests.post(server.url + "/v1/chat/completions", json={"messages": []}, timeout=5)
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == "3"
+            assert response.json()["error"]["type"] == "rate_limit_error"
+            assert server.stats()["errors_429"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_5xx_raises_in_provider(self):
+        server = start_simulator(LatencyProfile(0, 0, 0, error_5xx=1.0))
+        try:
+            provider = OllamaProvider("", "simulated", api_base=server.url)
+            with pytest.raises(Exception):
+                provider.generate_text("system", "prompt")
+            assert server.stats()["errors_5xx"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_chunks_are_paced(self):
+        # 16 chars per chunk at 40 tokens/s: 0.1 s between chunks
+        server = start_simulator(LatencyProfile(0, 0, tokens_per_second=40, chunk_tokens=4))
+        try:
+            start = time.perf_counter()
+            response = requests.post(server.url + "/api/generate",
+                                     json={"model": "m", "prompt": "x"}, stream=True, timeout=10)
+            lines = [line for line in response.iter_lines() if line]
+            elapsed = time.perf_counter() - start
+            chunks = len(lines) - 1
+            assert chunks > 1
+            assert elapsed >= 0.1 * (chunks - 1) * 0.9
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,170 @@
+"""
+Tests for prompt token budgeting and trimming.
+"""
+import os
+import sys
+import json
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import tokens
+from engine.tokens import estimate_tokens, context_window, input_budget, strip_boilerplate, fit_inputs, truncate_to_tokens
+from config import MIN_JD_TOKENS
+
+
+def long_profile(roles=10, bullets=10):
+    return {
+        "name": "Jane Doe",
+        "experience": [
+            {
+                "role": f"Engineer {i}",
+                "company": f"Company {i}",
+                "dates": f"{2020 - i}",
+                "description": [f"Built system {i}.{j} handling many requests with Python and Kafka" for j in range(bullets)]
+            }
+            for i in range(roles)
+        ]
+    }
+
+
+JD = """Senior Python Engineer
+We need someone with Python, Kafka and AWS experience.
+
+Benefits:
+Medical insurance and dental insurance coverage
+Paid time off and paid parental leave
+We are an equal opportunity employer and value diversity.
+"""
+
+
+class TwoCharEncoding:
+    """Stand-in for a tiktoken encoding where every two characters are one token."""
+
+    def encode(self, text, disallowed_special=()):
+        return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+    def decode_with_offsets(self, tokens):
+        return "".join(tokens), [2 * i for i in range(len(tokens))]
+
+
+class TestEstimation:
+    """Tests for token estimation and model limits."""
+
+    def test_estimate_scales_with_length(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("word " * 400) > estimate_tokens("word " * 100)
+
+    def test_heuristic_without_tiktoken(self, monkeypatch):
+        monkeypatch.setattr(tokens, "_ENCODING", None)
+        assert estimate_tokens("a" * 400) == 100
+
+    def test_context_window_prefix_match(self):
+        assert context_window("gpt-4o-mini") == 128000
+        assert context_window("gpt-4") == 8192
+        assert context_window("llama3.1:8b") == 131072
+        assert context_window("llama3:latest") == 8192
+        assert context_window("unknown-model") == 8192
+
+    def test_budget_never_exceeds_model(self):
+        assert input_budget("llama3:latest", 100000) < 8192
+        assert input_budget("gpt-4o-mini", 5000) == 5000
+
+
+class TestTrimming:
+    """Tests for the trimming strategy."""
+
+    def test_strip_boilerplate(self):
+        cleaned = strip_boilerplate(JD)
+        assert "Python, Kafka and AWS" in cleaned
+        assert "equal opportunity" not in cleaned
+        assert "dental" not in cleaned
+
+    def test_small_prompt_untouched(self):
+        data = long_profile(roles=1, bullets=2)
+        jd, trimmed, report = fit_inputs("Python engineer", data, 10000)
+        assert trimmed == data
+        assert jd == "Python engineer"
+        assert report.tokens_saved == 0
+        assert report.steps == []
+
+    def test_caps_bullets_and_summarizes_old_roles(self):
+        data = long_profile()
+        budget = estimate_tokens(json.dumps(data)) // 2
+        _, trimmed, report = fit_inputs(JD, data, budget)
+
+        assert report.within_budget
+        assert report.tokens_saved > 0
+        assert "cap_bullets_6" in report.steps
+        assert all(len(role["description"]) <= 6 for role in trimmed["experience"])
+        assert len(trimmed["experience"][-1]["description"]) == 1
+        # The caller's data is not modified
+        assert len(data["experience"][0]["description"]) == 10
+
+    def test_truncates_jd_as_last_resort(self):
+        jd = "Python requirement line\n" * 2000
+        _, _, report = fit_inputs(jd, {}, 500)
+        assert "truncate_jd" in report.steps
+        assert report.final_tokens <= 500
+
+    def test_jd_keeps_a_minimum_size(self):
+        jd = "Python requirement line\n" * 2000
+        trimmed, _, report = fit_inputs(jd, long_profile(roles=3, bullets=3), 100)
+        assert estimate_tokens(trimmed) >= MIN_JD_TOKENS - 10
+        assert not report.within_budget
+
+        short = "Python engineer"
+        assert fit_inputs(short, long_profile(roles=3, bullets=3), 10)[0] == short
+
+    def test_truncation_uses_encoder_offsets(self, monkeypatch):
+        monkeypatch.setattr(tokens, "_ENCODING", TwoCharEncoding())
+        cut = truncate_to_tokens("abcdefgh" * 50, 10)
+        assert cut == "abcdefgh" * 2 + "abcd"
+        assert estimate_tokens(cut) == 10
+
+    def test_fixed_text_counts_against_budget(self):
+        data = long_profile(roles=2, bullets=8)
+        _, _, loose = fit_inputs("JD", data, 2000)
+        _, _, tight = fit_inputs("JD", data, 2000, fixed_text="lorem ipsum " * 1200)
+        assert loose.steps == []
+        assert tight.steps != []
+
+
+class TestAIEngineBudget:
+    """Tests that AIEngine trims prompts before calling the provider."""
+
+    def test_prompt_stays_under_budget(self):
+        from engine.ai import AIEngine
+        from unittest.mock import MagicMock
+
+        ai = AIEngine()
+        ai.configure('ollama', '', 'llama3')
+        ai.input_token_budget = 1500
+        ai.provider = MagicMock()
+        ai.provider.generate_json.return_value = {"name": "Jane"}
+
+        ai.generate_resume_content(JD, long_profile())
+
+        system, prompt = ai.provider.generate_json.call_args.args
+        assert estimate_tokens(system) + estimate_tokens(prompt) < 1500 * 1.1
+        stats = ai.get_token_stats()
+        assert stats["tokens_saved_total"] > 0
+        assert stats["last"]["final_tokens"] <= 1500
+
+    def test_ollama_num_ctx_caps_the_budget(self):
+        from engine.ai import AIEngine
+        from unittest.mock import MagicMock
+
+        def fitted_tokens(settings):
+            ai = AIEngine()
+            ai.configure_from_settings({"provider": "ollama", "model": "llama3.1", "ollama_warm_up": False,
+                                        "retrieval_top_k": 0, **settings})
+            ai.provider = MagicMock()
+            ai.provider.generate_json.return_value = {"name": "Jane"}
+            ai.generate_resume_content(JD, long_profile())
+            return ai.get_token_stats()["last"]
+
+        large, small = fitted_tokens({"ollama_num_ctx": 32768}), fitted_tokens({"ollama_num_ctx": 3072})
+        assert large["budget"] == 12000
+        assert small["budget"] == 3072 - 1536
+        assert small["final_tokens"] <= small["budget"] < large["final_tokens"]
+        assert fitted_tokens({})["budget"] == 4096 - 2048
@@ -0,0 +1,158 @@
+"""
+Tests for per-stage tracing spans and their exporters.
+"""
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.tracing import Tracer, OtlpExporter, tracer, traced, current_span
+from engine.ai import AIEngine
+
+PROFILE = {
+    "name": "Jane Doe",
+    "summary": "Backend engineer.",
+    "skills": ["Python"],
+    "experience": [
+        {"role": "Engineer", "company": "Acme", "dates": "2021-2024", "description": ["Built APIs"]},
+        {"role": "Intern", "company": "Beta", "dates": "2020", "description": ["Wrote scripts"]},
+    ],
+    "education": [],
+}
+
+
+class StubProvider:
+    """Returns the user's profile unchanged."""
+
+    def generate_json(self, system, prompt, cancel_token=None, timeout=None):
+        if '"summary": "..."' in prompt:
+            return {"summary": "Tailored."}
+        if '"skills": [' in prompt:
+            return {"skills": ["Python"]}
+        if "USER DATA FOR THIS SECTION" in prompt:
+            return {"role": "Engineer", "description": ["Tailored"]}
+        return dict(PROFILE)
+
+
+@pytest.fixture
+def ai():
+    engine = AIEngine()
+    engine.configure('openai', 'key', 'gpt-4o-mini')
+    engine.provider = StubProvider()
+    return engine
+
+
+class TestSpans:
+    """Tests for span nesting and the response breakdown."""
+
+    def test_nesting_and_summary(self):
+        local = Tracer()
+        with local.span("root") as root:
+            with local.span("child", size=3) as child:
+                assert current_span() is child
+            with local.span("sibling"):
+                pass
+        assert current_span() is None
+
+        summary = root.trace.summary()
+        assert [(row["name"], row["depth"]) for row in summary["spans"]] == [
+            ("root", 0), ("child", 1), ("sibling", 1)]
+        assert child.parent_id == root.span_id
+        assert child.attributes == {"size": 3}
+        assert summary["total_ms"] >= summary["spans"][2]["start_ms"]
+
+    def test_errors_are_recorded(self):
+        with pytest.raises(ValueError):
+            with tracer.span("operation") as root:
+                with tracer.span("stage"):
+                    raise ValueError("boom")
+        assert root.trace.summary()["spans"][1]["error"] == "ValueError: boom"
+
+    def test_traced_attaches_breakdown(self):
+        @traced("operation")
+        def answering():
+            return {"success": False}
+
+        assert answering()["trace"]["spans"][0]["name"] == "operation"
+
+    def test_engine_stages_nest_under_the_operation(self, ai):
+        with tracer.span("generate_latex_source") as root:
+            ai.generate_resume_content("Python role", PROFILE)
+        names = [row["name"] for row in root.trace.summary()["spans"]]
+        assert names[0] == "generate_latex_source"
+        assert {"retrieval", "prompt fitting", "AI generation"} <= set(names)
+        stage = next(span for span in root.trace.spans if span.name == "AI generation")
+        assert stage.attributes["model"] == "gpt-4o-mini"
+        assert stage.parent_id == root.span_id
+
+    def test_section_spans_cross_threads(self, ai):
+        ai.generation_mode = "sections"
+        with tracer.span("generate_latex_source") as root:
+            ai.generate_resume_content("Python role", PROFILE)
+        sections = [span for span in root.trace.spans if span.name.startswith("AI section")]
+        assert len(sections) == 4
+        assert all(span.parent_id == root.span_id for span in sections)
+        assert any(span.thread != threading.current_thread().name for span in sections)
+
+
+class TestExporters:
+    """Tests for writing traces to a file and to an OTLP collector."""
+
+    def test_jsonl_file(self, tmp_path):
+        path = tmp_path / "traces" / "spans.jsonl"
+        local = Tracer()
+        local.configure(trace_file=str(path))
+        with local.span("root"):
+            with local.span("child"):
+                pass
+        local.flush()
+
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        assert {span["name"] for span in spans} == {"root", "child"}
+        assert len({span["trace_id"] for span in spans}) == 1
+
+    def test_otlp_collector(self):
+        received = []
+
+        class Collector(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                received.append((self.path, json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            local = Tracer()
+            local.configure(otlp_endpoint=f"http://127.0.0.1:{server.server_address[1]}")
+            with local.span("root", model="m"):
+                pass
+            local.flush()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        path, payload = received[0]
+        assert path == "/v1/traces"
+        resource = payload["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0]["value"]["stringValue"] == "ats-resume-genius"
+        span = resource["scopeSpans"][0]["spans"][0]
+        assert span["name"] == "root" and len(span["traceId"]) == 32
+        assert {"key": "model", "value": {"stringValue": "m"}} in span["attributes"]
+
+    def test_otlp_endpoint_path(self):
+        assert OtlpExporter("http://collector:4318/").endpoint == "http://collector:4318/v1/traces"
+        assert OtlpExporter("http://c/v1/traces").endpoint == "http://c/v1/traces"
+
+    def test_configure_ignores_unset_values(self):
+        local = Tracer()
+        local.configure(trace_file=None, otlp_endpoint=object())
+        assert local.exporters == []
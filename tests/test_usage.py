@@ -0,0 +1,156 @@
+"""
+Tests for token usage and cost accounting.
+"""
+import os
+import sys
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.usage import (Pricing, UsageMeter, metering, report_usage,
+                          openai_usage, ollama_usage, gemini_usage)
+from engine.providers import OpenAICompatibleProvider, OllamaProvider
+from engine.batch import BatchRunner, load_jobs
+from engine.latex import LatexEngine
+from bench.simulator import start_simulator
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USER_DATA = {"name": "Jane Doe", "skills": ["Python"],
+             "experience": [{"role": "Developer", "company": "Acme", "dates": "2020", "description": ["Built it"]}],
+             "education": []}
+
+
+@pytest.fixture(scope="module")
+def simulator():
+    server = start_simulator("instant", seed=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestNormalization:
+    """Tests for reading each provider's usage format."""
+
+    def test_openai(self):
+        usage = openai_usage({"prompt_tokens": 1200, "completion_tokens": 300, "total_tokens": 1500,
+                              "prompt_tokens_details": {"cached_tokens": 1024}}, "850")
+        assert usage == {"prompt_tokens": 1200, "completion_tokens": 300, "cached_tokens": 1024,
+                         "total_tokens": 1500, "server_ms": 850.0}
+
+    def test_ollama(self):
+        usage = ollama_usage({"done": True, "prompt_eval_count": 40, "eval_count": 10,
+                              "total_duration": 2_500_000_000, "load_duration": 1_000_000_000,
+                              "prompt_eval_duration": 200_000_000, "eval_duration": 1_200_000_000})
+        assert usage["total_tokens"] == 50
+        assert (usage["server_ms"], usage["load_ms"], usage["eval_ms"]) == (2500.0, 1000.0, 1200.0)
+
+    def test_gemini(self):
+        metadata = SimpleNamespace(prompt_token_count=100, candidates_token_count=20, thoughts_token_count=5,
+                                   cached_content_token_count=64, total_token_count=125)
+        usage = gemini_usage(metadata)
+        assert (usage["completion_tokens"], usage["cached_tokens"], usage["total_tokens"]) == (25, 64, 125)
+
+
+class TestPricing:
+    """Tests for per-model prices."""
+
+    def test_cached_tokens_are_cheaper(self):
+        prices = Pricing()
+        usage = {"prompt_tokens": 1_000_000, "cached_tokens": 0, "completion_tokens": 1_000_000}
+        assert prices.cost("gpt-4o-mini-2024-07-18", usage) == pytest.approx(0.15 + 0.60)
+        usage["cached_tokens"] = 1_000_000
+        assert prices.cost("gpt-4o-mini", usage) == pytest.approx(0.075 + 0.60)
+
+    def test_overrides_and_unknown_models(self):
+        prices = Pricing()
+        assert prices.cost("my-model", {"prompt_tokens": 10}) is None
+        prices.configure({"my-model": {"input": 1.0, "output": 2.0}})
+        assert prices.cost("my-model", {"prompt_tokens": 1_000_000, "cached_tokens": 500_000}) == pytest.approx(1.0)
+        prices.configure(None)
+        assert prices.price("my-model") is None and prices.price("gpt-4o") is not None
+
+
+class TestMeters:
+    """Tests for running totals."""
+
+    def test_nested_meters_and_totals(self):
+        session = UsageMeter()
+        with metering(session), metering() as request:
+            report_usage("gpt-4o-mini", {"prompt_tokens": 100, "cached_tokens": 50, "completion_tokens": 10,
+                                         "total_tokens": 110, "server_ms": 20.0})
+            report_usage("unpriced", {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+        report_usage("gpt-4o-mini", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2})
+
+        summary = request.summary()
+        assert summary["calls"] == 2 and summary["total_tokens"] == 125
+        assert summary["cache_hit_rate"] == pytest.approx(50 / 110, abs=1e-3)
+        assert summary["unpriced_calls"] == 1 and summary["cost_usd"] > 0
+        assert summary["models"]["gpt-4o-mini"]["server_ms"] == 20.0
+        assert session.calls == 2
+
+
+class TestProviders:
+    """Tests for capturing usage from streamed responses."""
+
+    def test_openai_compatible_stream(self, simulator):
+        provider = OpenAICompatibleProvider("", "gpt-4o-mini", simulator.url + "/v1")
+        with metering() as meter:
+            provider.generate_text("system", "Write a sentence about Python.")
+        summary = meter.summary()
+        assert summary["calls"] == 1
+        assert summary["prompt_tokens"] > 0 and summary["completion_tokens"] > 0
+        assert summary["cost_usd"] > 0
+
+    def test_ollama_is_free(self, simulator):
+        provider = OllamaProvider("", "llama3", simulator.url)
+        with metering() as meter:
+            provider.generate_text("system", "Write a sentence about Python.")
+        assert meter.calls == 1
+        assert meter.summary()["cost_usd"] == 0 and meter.summary()["unpriced_calls"] == 0
+
+
+class TestResults:
+    """Tests for usage in Bridge responses and batch reports."""
+
+    def test_bridge_response_and_session_totals(self, simulator):
+        import api
+        settings = {"provider": "openai-compatible", "model": "gpt-4o-mini",
+                    "compatible_base_url": simulator.url + "/v1"}
+        with patch.object(api, "SettingsManager") as manager:
+            manager.return_value.get_all.return_value = settings
+            manager.return_value.get.side_effect = lambda key, default=None: settings.get(key, default)
+            bridge = api.Bridge()
+        payload = {"job_description": "Python developer", "template_name": "modern.tex",
+                   "user_data": json.dumps(USER_DATA)}
+
+        first = bridge.generate_latex_source(payload)
+        second = bridge.generate_latex_source(payload)
+
+        assert first["success"], first
+        assert first["usage"]["calls"] >= 1 and first["usage"]["prompt_tokens"] > 0
+        session = bridge.get_usage_stats()
+        assert session["calls"] == first["usage"]["calls"] + second["usage"]["calls"]
+        assert session["models"]["gpt-4o-mini"]["total_tokens"] == session["total_tokens"]
+
+    def test_batch_report(self, tmp_path):
+        def generate(jd, *args, **kwargs):
+            report_usage("gpt-4o-mini", {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120})
+            return dict(USER_DATA)
+
+        ai = MagicMock()
+        ai.generate_resume_content.side_effect = generate
+        jd_dir = tmp_path / "jds"
+        jd_dir.mkdir()
+        for i in range(3):
+            (jd_dir / f"jd{i}.txt").write_text(f"Job {i} needs Python")
+
+        runner = BatchRunner(ai, LatexEngine(os.path.join(PROJECT_ROOT, "templates")), str(tmp_path / "out"),
+                             compile=False, concurrency=2, dedup_threshold=0)
+        report = runner.run(load_jobs(str(jd_dir)), USER_DATA)
+
+        assert report["usage"]["calls"] == 3 and report["usage"]["total_tokens"] == 360
+        assert [job["usage"]["total_tokens"] for job in report["jobs"]] == [120, 120, 120]